@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from scripts.recommendation.cache import EXPLANATION_CACHE, canonical
 from scripts.recommendation.predict import predict
 from scripts.llm.llm_client import generate_explanations
 from scripts.api.currency_utils import convert_currency
@@ -42,10 +43,13 @@ def recommend(inp: RecommendationRequest):
             to_currency="AUD"
         )
 
-    explanations = generate_explanations(
-        user_input=inp.data,
-        prediction=result,
-        knowledge="Graph RAG knowledge if available",
+    explanations = EXPLANATION_CACHE.get_or_compute(
+        ("explanations", canonical(inp.data), canonical(result)),
+        lambda: generate_explanations(
+            user_input=inp.data,
+            prediction=result,
+            knowledge="Graph RAG knowledge if available",
+        ),
     )
     
     return {
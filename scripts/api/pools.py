@@ -0,0 +1,96 @@
+# scripts/api/pools.py
+"""Executors that keep blocking work off the FastAPI event loop.
+
+``INFERENCE_POOL`` runs predict() and friends; ``LLM_POOL`` runs the blocking
+Gemini client. Both are bounded: at most ``max_pending`` calls are queued or
+running per pool, further callers wait (asynchronously) for a slot instead of
+piling up unbounded work.
+
+Configuration (per gunicorn worker):
+
+    INFERENCE_EXECUTOR   "thread" (default) or "process"
+    INFERENCE_WORKERS    pool size, default min(4, CPU count)
+    INFERENCE_PENDING    max queued + running calls, default 4 x workers
+    LLM_WORKERS          threads for LLM calls, default 8
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+from scripts.recommendation.registry import REGISTRY
+
+
+def _warm_worker() -> None:
+    """Process-pool initializer: load every model bundle before the first call."""
+    try:
+        REGISTRY.preload()
+    except Exception as e:
+        print(f"Worker model preload failed: {str(e)}")
+
+
+def _ready() -> bool:
+    return True
+
+
+class BlockingPool:
+    """A bounded thread or process pool awaited from async handlers."""
+
+    def __init__(self, name: str, kind: str = "thread", workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, warm: bool = False):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or 4 * self.workers
+        self.warm = warm
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        """Create the executor and, if ``warm``, load models in every worker."""
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_warm_worker if self.warm else None,
+            )
+        else:
+            if self.warm:
+                _warm_worker()  # threads share this process's registry
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        # spin every worker up now rather than on the first requests
+        wait([self._executor.submit(_ready) for _ in range(self.workers)])
+        self._slots = asyncio.Semaphore(self.max_pending)
+        print(f"Started {self.name} pool: {self.workers} {self.kind} workers, {self.max_pending} max pending")
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` on the pool without blocking the loop."""
+        if self._executor is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        async with self._slots:
+            return await loop.run_in_executor(self._executor, call)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
+
+
+INFERENCE_POOL = BlockingPool(
+    "inference",
+    kind=os.getenv("INFERENCE_EXECUTOR", "thread"),
+    workers=int(os.getenv("INFERENCE_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("INFERENCE_PENDING", "0")) or None,
+    warm=True,
+)
+
+LLM_POOL = BlockingPool("llm", kind="thread", workers=int(os.getenv("LLM_WORKERS", "8")))
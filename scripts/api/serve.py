@@ -1,18 +1,43 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import tempfile
+from typing import List, Dict, Any, Optional, Union
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, root_validator
 
-from scripts.recommendation.predict import predict
+from scripts.api.pools import INFERENCE_POOL, LLM_POOL
+from scripts.recommendation.cache import EXPLANATION_CACHE, PREDICTION_CACHE, RESULT_STORE, canonical
+from scripts.recommendation.cascade import CASCADE
+from scripts.recommendation.counterfactual import COUNTERFACTUAL_BUDGET_MS, find_counterfactuals
+from scripts.recommendation.predict import predict, predict_many, predict_sweep
+from scripts.recommendation.registry import REGISTRY
 from scripts.llm.llm_client import explain_recommendation
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException
 
+# Max concurrent LLM explanations per /recommend_multiple request
+MULTI_EXPLAIN_CONCURRENCY = int(os.getenv("MULTI_EXPLAIN_CONCURRENCY", "3"))
+
+# /recommend_stream: uploads above this size spool to disk; longer lines are rejected;
+# larger uploads get 413
+STREAM_SPOOL_BYTES = 8 * 1024 * 1024
+STREAM_MAX_LINE_BYTES = 64 * 1024
+STREAM_MAX_UPLOAD_BYTES = int(os.getenv("STREAM_MAX_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+
+# /what_if: most variants scored per request
+WHAT_IF_MAX_POINTS = int(os.getenv("WHAT_IF_MAX_POINTS", "2500"))
+
+# fields predict() truncates to whole numbers
+INTEGER_FIELDS = {"age", "ageofvehicle", "propertyage", "tripdurationdays"}
+
 app = FastAPI(
     title="Insurance Bot API",
     version="0.3.2",
@@ -63,6 +88,24 @@ async def general_exception_handler(request, exc):
         content={"detail": "Internal server error occurred"},
     )
 
+@app.on_event("startup")
+def preload_models():
+    # Load every (country, policy) bundle and start the (warm) worker pools
+    # before the first request arrives
+    try:
+        REGISTRY.preload()
+    except Exception as e:
+        print(f"Model preload failed: {str(e)}")
+    INFERENCE_POOL.start()
+    LLM_POOL.start()
+
+@app.on_event("shutdown")
+def stop_pools():
+    INFERENCE_POOL.shutdown()
+    LLM_POOL.shutdown()
+    if RESULT_STORE is not None:
+        RESULT_STORE.flush()
+
 # -----------------------------
 # Models
 # -----------------------------
@@ -259,6 +302,33 @@ class MultiRecommendRequest(BaseModel):
 class MultiRecommendResponse(BaseModel):
     results: List[RecommendResponse]
 
+class SweepAxis(BaseModel):
+    feature: str = Field(..., description="Request field to vary, e.g. age or sumassured")
+    values: Optional[List[Union[float, str]]] = Field(None, description="Explicit values to try")
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = Field(None, ge=2, description="Evenly spaced values from start to stop")
+
+    @root_validator(skip_on_failure=True)
+    def check_range(cls, values):
+        if values.get("values") is None and None in (values.get("start"), values.get("stop"), values.get("steps")):
+            raise ValueError("Give either values or start, stop and steps")
+        return values
+
+class WhatIfRequest(BaseModel):
+    profile: RecommendRequest
+    vary: List[SweepAxis] = Field(..., min_items=1, max_items=2)
+
+class CounterfactualRequest(BaseModel):
+    profile: RecommendRequest
+    goal: str = Field("tier", pattern="^(tier|premium)$",
+                      description="tier: reach a cheaper tier; premium: cut the premium by min_saving")
+    target_tier: Optional[str] = Field(None, description="Tier to reach (default: one below the current)")
+    min_saving: float = Field(0.05, gt=0, lt=1, description="Premium cut to reach, as a fraction")
+    max_changes: int = Field(3, ge=1, le=5)
+    max_results: int = Field(3, ge=1, le=10)
+    budget_ms: float = Field(COUNTERFACTUAL_BUDGET_MS, gt=0, le=2000)
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -266,6 +336,60 @@ def to_dict_safe(model: BaseModel) -> Dict[str, Any]:
     dump = getattr(model, "model_dump", None)
     return dump() if callable(dump) else model.dict()
 
+def prepare_recommend_input(data: Dict[str, Any]) -> tuple:
+    """Validate a RecommendRequest dump; returns (country, policytype, data).
+
+    Raises ValueError for an unknown country / policy type or missing
+    house fields.
+    """
+    # Get and normalize country
+    country = data.get("country", "").upper()
+    if not country:
+        raise ValueError("Country is required")
+
+    # Handle country codes
+    country_mapping = {
+        "IN": "INDIA",
+        "AU": "AUSTRALIA",
+        "INDIA": "INDIA",
+        "AUSTRALIA": "AUSTRALIA"
+    }
+
+    country = country_mapping.get(country)
+    if not country:
+        raise ValueError(f"Invalid country. Must be one of: IN, AU, INDIA, AUSTRALIA")
+
+    # Get and validate policy type
+    policytype = data.get("policytype", "").upper()
+    if not policytype:
+        raise ValueError("Policy type is required")
+    if policytype not in ["HEALTH", "LIFE", "TRAVEL", "HOUSE", "VEHICLE"]:
+        raise ValueError(f"Invalid policy type: {policytype}")
+
+    data.pop("policy", None)  # Remove extra field if present
+
+    # Policy-specific validation
+    if policytype == "HOUSE":
+        if not data.get("propertyvalue"):
+            raise ValueError("Property value is required for house insurance")
+        if "propertyage" not in data:
+            raise ValueError("Property age is required for house insurance")
+        if not data.get("propertytype"):
+            raise ValueError("Property type is required for house insurance")
+    return country, policytype, data
+
+def explain_cached(user_input: Dict[str, Any], prediction: Dict[str, Any]) -> Dict[str, Any]:
+    """Blocking LLM explanation, memoized on the input and the prediction."""
+    return EXPLANATION_CACHE.get_or_compute(
+        ("recommend", canonical(user_input), canonical(prediction)),
+        lambda: explain_recommendation(
+            user_input=user_input,
+            prediction=prediction,
+            ranked_policies=None,
+            rag_knowledge="GraphRAG knowledge goes here",
+        ),
+    )
+
 # -----------------------------
 # Endpoints
 # -----------------------------
@@ -273,60 +397,26 @@ def to_dict_safe(model: BaseModel) -> Dict[str, Any]:
 def health():
     return {"status": "ok"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    grids = {f"{b.country}-{b.policy}": b.grid.stats() for b in REGISTRY.loaded() if b.grid is not None}
+    return {"predictions": PREDICTION_CACHE.stats(), "explanations": EXPLANATION_CACHE.stats(), "grids": grids,
+            "cascade": CASCADE.stats()}
+
 @app.post("/recommend", response_model=RecommendResponse)
 async def recommend(req: RecommendRequest):
     try:
         print(f"\n=== Starting recommendation request ===")
         print(f"Request data: {req}")
         
-        data = to_dict_safe(req)
-        # Get and normalize country
-        country = data.get("country", "").upper()
-        if not country:
-            raise ValueError("Country is required")
-            
-        # Handle country codes
-        country_mapping = {
-            "IN": "INDIA",
-            "AU": "AUSTRALIA",
-            "INDIA": "INDIA",
-            "AUSTRALIA": "AUSTRALIA"
-        }
-        
-        country = country_mapping.get(country)
-        if not country:
-            raise ValueError(f"Invalid country. Must be one of: IN, AU, INDIA, AUSTRALIA")
-            
-        # Get and validate policy type
-        policytype = data.get("policytype", "").upper()
-        if not policytype:
-            raise ValueError("Policy type is required")
-        if policytype not in ["HEALTH", "LIFE", "TRAVEL", "HOUSE", "VEHICLE"]:
-            raise ValueError(f"Invalid policy type: {policytype}")
-        
-        data.pop("policy", None)  # Remove extra field if present
-        
+        country, policytype, data = prepare_recommend_input(to_dict_safe(req))
         print(f"Processing request for {country} - {policytype}")
         print(f"Input data: {data}")
         
-        # Policy-specific validation
-        if policytype == "HOUSE":
-            if not data.get("propertyvalue"):
-                raise ValueError("Property value is required for house insurance")
-            if "propertyage" not in data:
-                raise ValueError("Property age is required for house insurance")
-            if not data.get("propertytype"):
-                raise ValueError("Property type is required for house insurance")
-        
-        prediction = predict(country, policytype, data)
+        prediction = await INFERENCE_POOL.run(predict, country, policytype, data)
         print(f"Prediction result: {prediction}")
 
-        explanation = explain_recommendation(
-            user_input=data,
-            prediction=prediction,
-            ranked_policies=None,
-            rag_knowledge="GraphRAG knowledge goes here",
-        )
+        explanation = await LLM_POOL.run(explain_cached, data, prediction)
         print(f"Generated explanation: {explanation}")
         
         return {"prediction": prediction, "explanation": explanation}
@@ -346,64 +436,242 @@ async def recommend(req: RecommendRequest):
             content={"detail": "An internal server error occurred. Please try again later."}
         )
 
+@app.post("/what_if")
+async def what_if(req: WhatIfRequest):
+    """Tier and premium curves for one profile with one or two fields swept."""
+    try:
+        country, policytype, data = prepare_recommend_input(to_dict_safe(req.profile))
+        axes = [(axis.feature.lower(), _axis_values(axis)) for axis in req.vary]
+        points = 1
+        for _, values in axes:
+            points *= len(values)
+        if points > WHAT_IF_MAX_POINTS:
+            raise ValueError(f"Sweep has {points} points; the limit is {WHAT_IF_MAX_POINTS}")
+        return await INFERENCE_POOL.run(predict_sweep, country, policytype, data, axes)
+    except ValueError as ve:
+        print(f"Validation error: {str(ve)}")
+        return JSONResponse(status_code=400, content={"detail": str(ve)})
+
+def _axis_values(axis: SweepAxis) -> List[Any]:
+    if axis.values is not None:
+        return list(axis.values)
+    if axis.steps > WHAT_IF_MAX_POINTS:
+        raise ValueError(f"{axis.feature}: at most {WHAT_IF_MAX_POINTS} steps")
+    step = (axis.stop - axis.start) / (axis.steps - 1)
+    values = [axis.start + i * step for i in range(axis.steps)]
+    if axis.feature.lower() in INTEGER_FIELDS:
+        values = list(dict.fromkeys(int(round(v)) for v in values))
+    return values
+
+@app.post("/counterfactual")
+async def counterfactual(req: CounterfactualRequest):
+    """Smallest profile changes that lead to a cheaper tier or premium."""
+    try:
+        country, policytype, data = prepare_recommend_input(to_dict_safe(req.profile))
+        return await INFERENCE_POOL.run(
+            find_counterfactuals, country, policytype, data,
+            goal=req.goal, target_tier=req.target_tier, min_saving=req.min_saving,
+            max_changes=req.max_changes, max_results=req.max_results, budget_ms=req.budget_ms,
+        )
+    except ValueError as ve:
+        print(f"Validation error: {str(ve)}")
+        return JSONResponse(status_code=400, content={"detail": str(ve)})
+
 @app.post("/recommend_multiple", response_model=MultiRecommendResponse)
 async def recommend_multiple(req: MultiRecommendRequest):
     print("Processing multiple recommendations request")
     print(f"Number of policies: {len(req.policies)}")
-    results = []
-    
+
+    # 1. Parse items; each keeps its position so results stay in request order
+    items = []  # (idx, country, policytype, policy_dict)
     for idx, policy in enumerate(req.policies):
         try:
-            print(f"\nProcessing policy {idx + 1}:")
-            # Convert policy to dict and make prediction
             policy_dict = to_dict_safe(policy)
-            print(f"Policy data: {policy_dict}")
-            
             country = policy_dict.pop("country", "").upper()
             policytype = policy_dict.pop("policytype", "").upper()
-            print(f"Country: {country}, Policy Type: {policytype}")
-            
             if not country or not policytype:
                 print(f"Skipping policy {idx + 1}: Missing country or policytype")
                 continue
-                
             # Remove None values to avoid prediction issues
             policy_dict = {k: v for k, v in policy_dict.items() if v is not None}
-            
-            try:
-                prediction = predict(
-                    country=country,
-                    policy=policytype,
-                    data=policy_dict
-                )
-                print(f"Prediction result: {prediction}")
-                
-                explanation = explain_recommendation(
-                    user_input=policy_dict,
-                    prediction=prediction,
-                    ranked_policies=None,
-                    rag_knowledge="GraphRAG knowledge goes here"
-                )
-                
-                results.append({
-                    "prediction": prediction,
-                    "explanation": explanation
-                })
-                print(f"Successfully processed policy {idx + 1}")
-            except ValueError as ve:
-                print(f"Validation error in policy {idx + 1}: {str(ve)}")
-                continue
-            except Exception as e:
-                import traceback
-                print(f"Error processing policy {idx + 1}: {str(e)}")
-                print(traceback.format_exc())
-                continue
-                
+            items.append((idx, country, policytype, policy_dict))
         except Exception as e:
             print(f"Error parsing policy {idx + 1}: {str(e)}")
+
+    # 2. One batched scoring call per (country, policytype); identical
+    #    profiles are scored once inside predict_many
+    predictions = await _score_grouped(items)
+
+    # 3. Explanations run concurrently (capped per request); identical
+    #    (input, prediction) pairs share one LLM call
+    explanations = await _explain_items(items, predictions, MULTI_EXPLAIN_CONCURRENCY)
+
+    results = []
+    for idx, *_ in items:
+        prediction, explanation = predictions[idx], explanations.get(idx)
+        if isinstance(prediction, Exception):
+            print(f"Error processing policy {idx + 1}: {str(prediction)}")
             continue
-    
-    if not results:
-        return {"results": []}  # Return empty results instead of raising error
-        
-    return {"results": results}
+        if isinstance(explanation, Exception):
+            print(f"Error explaining policy {idx + 1}: {str(explanation)}")
+            continue
+        results.append({"prediction": prediction, "explanation": explanation})
+        print(f"Successfully processed policy {idx + 1}")
+
+    return {"results": results}  # empty when every item failed
+
+async def _score_grouped(items: List[tuple]) -> Dict[int, Any]:
+    """Score (idx, country, policytype, data) items with one predict_many call
+    per (country, policytype), groups running concurrently.
+
+    Returns idx -> prediction dict or the exception raised for that item.
+    """
+    groups: Dict[tuple, List[tuple]] = {}
+    for item in items:
+        groups.setdefault((item[1], item[2]), []).append(item)
+
+    async def score_group(key, members):
+        return await INFERENCE_POOL.run(predict_many, key[0], key[1], [m[3] for m in members])
+
+    keys = list(groups)
+    outcomes = await asyncio.gather(*(score_group(k, groups[k]) for k in keys), return_exceptions=True)
+
+    predictions: Dict[int, Any] = {}
+    for key, outcome in zip(keys, outcomes):
+        for n, (idx, *_) in enumerate(groups[key]):
+            predictions[idx] = outcome if isinstance(outcome, Exception) else outcome[n]
+    return predictions
+
+async def _explain_items(items: List[tuple], predictions: Dict[int, Any], limit: int) -> Dict[int, Any]:
+    """Explain every successfully scored item, at most ``limit`` LLM calls at a time.
+
+    Returns idx -> explanation dict or the exception raised for that item.
+    """
+    slots = asyncio.Semaphore(limit)
+    tasks: Dict[tuple, asyncio.Future] = {}
+    by_item: Dict[int, asyncio.Future] = {}
+    for idx, _, _, data in items:
+        prediction = predictions.get(idx)
+        if prediction is None or isinstance(prediction, Exception):
+            continue
+        key = (canonical(data), canonical(prediction))
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(_explain_limited(slots, data, prediction))
+        by_item[idx] = tasks[key]
+
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return {idx: task.exception() or task.result() for idx, task in by_item.items()}
+
+async def _explain_limited(slots: asyncio.Semaphore, user_input: Dict[str, Any],
+                           prediction: Dict[str, Any]) -> Dict[str, Any]:
+    async with slots:
+        return await LLM_POOL.run(explain_cached, user_input, prediction)
+
+@app.post("/recommend_stream")
+async def recommend_stream(
+    request: Request,
+    explain: bool = Query(False, description="Add an LLM explanation to every result"),
+    batch_size: int = Query(256, ge=1, le=2000, description="Profiles scored per micro-batch"),
+):
+    """Score an NDJSON upload of RecommendRequest profiles, streaming NDJSON back.
+
+    Each output line is ``{"line": n, "prediction": ..., ["explanation": ...]}``
+    or ``{"line": n, "error": "..."}`` for the n-th (1-based) input line, in
+    input order. Blank lines are skipped. Uploads larger than
+    STREAM_MAX_UPLOAD_BYTES are rejected with 413.
+    """
+    too_large = JSONResponse(status_code=413,
+                             content={"detail": f"Upload larger than {STREAM_MAX_UPLOAD_BYTES} bytes"})
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > STREAM_MAX_UPLOAD_BYTES:
+        return too_large
+
+    # Spool the upload first (memory holds at most STREAM_SPOOL_BYTES), then
+    # read it back one micro-batch at a time while results stream out. Past
+    # the memory limit spool writes are disk I/O, so they run off the event loop.
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > STREAM_MAX_UPLOAD_BYTES:
+                spool.close()
+                return too_large
+            await run_in_threadpool(spool.write, chunk)
+        await run_in_threadpool(spool.seek, 0)
+    except BaseException:
+        spool.close()
+        raise
+
+    return StreamingResponse(_stream_results(spool, explain, batch_size), media_type="application/x-ndjson")
+
+def _read_ndjson(spool, batch_size: int):
+    """Yield lists of up to batch_size (line_no, text or exception) from the spool."""
+    batch = []
+    for line_no, raw in enumerate(iter(lambda: spool.readline(STREAM_MAX_LINE_BYTES + 1), b""), start=1):
+        if len(raw) > STREAM_MAX_LINE_BYTES:
+            # drop the rest of the oversized line
+            while raw and not raw.endswith(b"\n"):
+                raw = spool.readline(STREAM_MAX_LINE_BYTES + 1)
+            batch.append((line_no, ValueError(f"Line longer than {STREAM_MAX_LINE_BYTES} bytes")))
+        elif raw.strip():
+            batch.append((line_no, raw))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _next_parsed_batch(batches):
+    """Read and validate the next micro-batch: (batch, items, errors), or None at the end.
+
+    Blocking (spool reads and pydantic validation); called through run_in_threadpool.
+    """
+    batch = next(batches, None)
+    if batch is None:
+        return None
+    items, errors = [], {}
+    for line_no, raw in batch:
+        try:
+            country, policytype, data = _parse_stream_line(raw)
+            items.append((line_no, country, policytype, data))
+        except Exception as e:
+            errors[line_no] = e
+    return batch, items, errors
+
+def _parse_stream_line(raw) -> tuple:
+    """(country, policytype, data) for one NDJSON line, via RecommendRequest validation."""
+    if isinstance(raw, Exception):
+        raise raw
+    req = RecommendRequest(**json.loads(raw))
+    return prepare_recommend_input(to_dict_safe(req))
+
+async def _stream_results(spool, explain: bool, batch_size: int):
+    try:
+        batches = _read_ndjson(spool, batch_size)
+        while True:
+            parsed = await run_in_threadpool(_next_parsed_batch, batches)
+            if parsed is None:
+                break
+            batch, items, errors = parsed
+
+            predictions = await _score_grouped(items)
+            explanations = await _explain_items(items, predictions, MULTI_EXPLAIN_CONCURRENCY) if explain else {}
+
+            out = []
+            for line_no, _ in batch:
+                outcome = errors.get(line_no) or predictions.get(line_no)
+                if isinstance(outcome, Exception):
+                    out.append({"line": line_no, "error": str(outcome)})
+                    continue
+                record = {"line": line_no, "prediction": outcome}
+                if explain:
+                    explanation = explanations.get(line_no)
+                    if isinstance(explanation, Exception):
+                        record["explanation_error"] = str(explanation)
+                    else:
+                        record["explanation"] = explanation
+                out.append(record)
+            yield "".join(json.dumps(r, default=str) + "\n" for r in out)
+    finally:
+        spool.close()
@@ -0,0 +1,106 @@
+# scripts/api/warm_store.py
+"""Fill the persistent result store from a replay of historical requests.
+
+Reads /recommend request bodies, one JSON object per line, and counts how
+often each validated profile occurs. The ``--top`` most frequent profiles
+are then scored, so their predictions are in the store before the new
+deployment takes traffic. Profiles of one (country, policy) are scored in
+one predict_many call. With ``--explain``, their LLM explanations are
+generated and stored too. Only profiles the store does not have yet cost
+an LLM call.
+
+Usage::
+
+    RESULT_STORE=/app/cache/results.sqlite python -m scripts.api.warm_store history.jsonl --top 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from scripts.recommendation.cache import EXPLANATION_CACHE, PREDICTION_CACHE, RESULT_STORE, canonical
+from scripts.recommendation.predict import predict_many
+from scripts.recommendation.store import open_store
+
+
+def read_history(paths: List[str]) -> Tuple[Counter, Dict, int]:
+    """(profile counts, profile -> (country, policytype, data), rejected lines)."""
+    # imported here: serve builds the FastAPI app on import
+    from scripts.api.serve import RecommendRequest, prepare_recommend_input, to_dict_safe
+
+    counts: Counter = Counter()
+    profiles: Dict = {}
+    rejected = 0
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    body = json.loads(line)
+                    prepared = prepare_recommend_input(to_dict_safe(RecommendRequest(**body)))
+                except Exception:
+                    rejected += 1
+                    continue
+                key = canonical(prepared)
+                counts[key] += 1
+                profiles.setdefault(key, prepared)
+    return counts, profiles, rejected
+
+
+def warm(paths: List[str], top: int, explain: bool = False, log=print) -> Dict[str, int]:
+    """Score (and optionally explain) the ``top`` most frequent profiles in ``paths``."""
+    store = PREDICTION_CACHE.store
+    if store is None:
+        raise ValueError("No result store configured; set RESULT_STORE or pass --store")
+
+    counts, profiles, rejected = read_history(paths)
+    hottest = [profiles[key] for key, _ in counts.most_common(top)]
+    by_segment = defaultdict(list)
+    for country, policytype, data in hottest:
+        by_segment[(country, policytype)].append(data)
+
+    scored = failed = explained = 0
+    for (country, policytype), items in sorted(by_segment.items()):
+        predictions = predict_many(country, policytype, items)
+        for data, prediction in zip(items, predictions):
+            if isinstance(prediction, Exception):
+                failed += 1
+                continue
+            scored += 1
+            if explain:
+                # imported here: serve builds the FastAPI app on import
+                from scripts.api.serve import explain_cached
+                explain_cached(data, prediction)
+                explained += 1
+        log(f"{country}-{policytype}: {len(items)} profiles")
+
+    store.flush()
+    return {"requests": sum(counts.values()) + rejected, "rejected": rejected, "profiles": len(counts),
+            "scored": scored, "failed": failed, "explained": explained}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Warm the persistent result store from historical requests")
+    ap.add_argument("history", nargs="+", help="JSON-lines files of /recommend request bodies")
+    ap.add_argument("--top", type=int, default=5000, help="most frequent profiles to score (default 5000)")
+    ap.add_argument("--explain", action="store_true", help="also generate and store LLM explanations")
+    ap.add_argument("--store", help="SQLite file (default: $RESULT_STORE)")
+    args = ap.parse_args(argv)
+
+    if args.store:
+        PREDICTION_CACHE.store = EXPLANATION_CACHE.store = open_store(args.store)
+    elif RESULT_STORE is None:
+        ap.error("set RESULT_STORE or pass --store")
+
+    started = time.perf_counter()
+    summary = warm(args.history, args.top, args.explain)
+    print(f"{summary} in {time.perf_counter() - started:.1f}s -> {PREDICTION_CACHE.store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
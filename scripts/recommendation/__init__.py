@@ -1,6 +1,6 @@
 # recommendation/__init__.py
 from .predict import predict
 
-from .rule_engine import apply_rules
+from .rule_engine import apply_rules, apply_rules_frame
 
-__all__ = ["recommend", "apply_rules"]
+__all__ = ["recommend", "apply_rules", "apply_rules_frame"]
@@ -0,0 +1,103 @@
+# scripts/recommendation/bundle.py
+"""Single-file, memory-mappable artifact bundle for one (country, policy).
+
+Layout::
+
+    MAGIC (8 bytes) | header length (uint64, little endian) | JSON header
+    | padding | array 0 | padding | array 1 | ...
+
+The JSON header holds small metadata plus, for every array, its dtype, shape
+and byte offset. Arrays start on 64-byte boundaries and are read back as
+read-only NumPy views over one ``mmap`` of the file, so every gunicorn worker
+that opens the same bundle shares the same physical pages.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b"MUFGBNDL"
+FORMAT_VERSION = 1
+ALIGN = 64
+BUNDLE_NAME = "model.bundle"
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def write_bundle(path: Path, arrays: Dict[str, np.ndarray], meta: Dict) -> str:
+    """Write arrays + metadata to ``path`` atomically; returns the content version."""
+    arrays = {k: np.asarray(v, order="C") for k, v in arrays.items()}
+    for k, v in arrays.items():
+        if v.dtype.hasobject:
+            raise TypeError(f"Array {k!r} has object dtype and cannot be memory-mapped")
+
+    digest = hashlib.sha1(json.dumps(meta, sort_keys=True).encode("utf-8"))
+    for k in sorted(arrays):
+        digest.update(k.encode("utf-8"))
+        digest.update(arrays[k].dtype.str.encode("ascii"))
+        digest.update(repr(arrays[k].shape).encode("ascii"))
+        digest.update(arrays[k].tobytes())
+    version = digest.hexdigest()[:12]
+
+    # offsets are relative to the start of the data section
+    specs, offset = {}, 0
+    for k, v in arrays.items():
+        offset += _pad(offset)
+        specs[k] = {"dtype": v.dtype.str, "shape": list(v.shape), "offset": offset}
+        offset += v.nbytes
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "version": version,
+        "meta": meta,
+        "arrays": specs,
+    }).encode("utf-8")
+    prefix = len(MAGIC) + 8 + len(header)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * _pad(prefix))
+        written = 0
+        for k, v in arrays.items():
+            f.write(b"\0" * (specs[k]["offset"] - written))
+            f.write(v.tobytes())
+            written = specs[k]["offset"] + v.nbytes
+    os.replace(tmp, path)
+    return version
+
+
+def read_bundle(path: Path) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Map ``path`` and return (header, arrays) with arrays as read-only views."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a model bundle")
+    (header_len,) = struct.unpack_from("<Q", mm, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(mm[start:start + header_len]).decode("utf-8"))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {header.get('format')} in {path}")
+
+    prefix = start + header_len
+    base = prefix + _pad(prefix)
+    arrays = {}
+    for k, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        arr = np.frombuffer(mm, dtype=dtype, count=count, offset=base + spec["offset"])
+        arrays[k] = arr.reshape(shape)
+    return header, arrays
@@ -0,0 +1,168 @@
+# scripts/recommendation/cache.py
+"""Small in-process result cache with TTL expiry and LRU eviction.
+
+Used in front of predict() (keyed on the encoded feature rows plus the
+artifact version) and by the API layers for LLM explanations. Values are
+deep-copied on the way in and out so callers may mutate what they get back.
+
+With ``RESULT_STORE`` set, both caches also read through to and write
+behind a persistent SQLite store shared by all workers (see store.py).
+"""
+from __future__ import annotations
+
+import copy
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .store import ResultStore, open_store
+
+_MISSING = object()
+
+
+def canonical(value: Any) -> Hashable:
+    """Hashable, order-independent form of a JSON-like value.
+
+    Dict keys are sorted, lists become tuples, ints and floats compare equal
+    (30 == 30.0) and NaN collapses to None.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), canonical(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical(v) for v in value)
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        return None if math.isnan(value) else value
+    return repr(value)
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU cache with hit/miss counters.
+
+    ttl <= 0 or max_entries <= 0 disables the cache (every get is a miss and
+    put is a no-op). With a ``store``, memory misses are looked up there
+    under ``namespace`` and puts are also written to it.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 4096,
+                 clock: Callable[[], float] = time.monotonic,
+                 store: Optional[ResultStore] = None, namespace: str = ""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self.store = store
+        self.namespace = namespace
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self._clock() >= entry[0]:
+                del self._entries[key]
+                self.expirations += 1
+                entry = _MISSING
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+        if self.store is None or not self.enabled:
+            return default
+        value = self.store.get(self.namespace, key)
+        if value is None:
+            return default
+        self._remember(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        if self.store is not None:
+            self.store.put(self.namespace, key, value)
+        self._remember(key, value)
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        """Keep a private copy of ``value`` in memory."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for ``key``, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry (or those whose key matches ``predicate``); returns the count."""
+        with self._lock:
+            if predicate is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            stale = [k for k in self._entries if predicate(k)]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                **({"store": self.store.stats()} if self.store is not None else {}),
+            }
+
+
+# Shared by both caches below; None unless RESULT_STORE names a file.
+RESULT_STORE = open_store()
+
+# Scored predictions (see predict.predict); dropped per (country, policy)
+# whenever the model registry swaps in a retrained bundle. Stored entries
+# need no dropping: their keys carry the artifact version.
+PREDICTION_CACHE = ResultCache(
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")),
+    store=RESULT_STORE,
+    namespace="predictions",
+)
+
+# LLM explanations keyed on the user input and the prediction they explain.
+EXPLANATION_CACHE = ResultCache(
+    ttl=float(os.getenv("EXPLANATION_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("EXPLANATION_CACHE_SIZE", "1024")),
+    store=RESULT_STORE,
+    namespace="explanations",
+)
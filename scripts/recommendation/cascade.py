@@ -0,0 +1,264 @@
+# scripts/recommendation/cascade.py
+"""Rule-first cascade in front of the tier classifier.
+
+The rule tables in rules.json cost microseconds per row. For some rule
+branches the model picks the same tier as the rule almost every time. For
+example, most India vehicle branches agree with the model on 98-100% of the
+training rows. Other branches of the same segment agree only about half the
+time. Trust is therefore decided per (country, policy, rule branch):
+
+* ``python -m scripts.recommendation.cascade`` scores the standardized
+  training CSVs with both the rules and the model. It writes, per artifact
+  directory, ``rule_agreement.json`` with each branch's row count and
+  agreement. The file is tied to the rules digest it was measured with.
+* With ``PREDICT_CASCADE=1``, predict() and predict_many() evaluate the rules
+  first. A row whose branch returns a tier and agreed on at least
+  ``CASCADE_MIN_AGREEMENT`` of at least ``CASCADE_MIN_ROWS`` rows takes the
+  rule's tier. For that row the classifier is not called; confidence is 1.0
+  for that tier and ``decided_by`` is "rules". The regressor still prices
+  every tier.
+
+Nothing is trusted when the table is missing, was measured against other
+rules, or is older than the models. ``CASCADE.stats()`` reports the
+short-circuit rate per segment and the classifier time it saved.
+Offline scoring (predict_batch, score_book) always uses the model.
+
+Usage::
+
+    python -m scripts.recommendation.cascade                  # all segments
+    python -m scripts.recommendation.cascade --country india --policy vehicle
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .registry import REGISTRY, get_bundle
+from .rule_engine import RULES, TIER_LABELS, RulePlan
+
+AGREEMENT_NAME = "rule_agreement.json"
+CASCADE_ENABLED = os.getenv("PREDICT_CASCADE", "0") == "1"
+CASCADE_MIN_AGREEMENT = float(os.getenv("CASCADE_MIN_AGREEMENT", "0.98"))
+CASCADE_MIN_ROWS = int(os.getenv("CASCADE_MIN_ROWS", "50"))
+
+# model feature -> rules.json column
+RULE_COLUMNS = {
+    "age": "Age",
+    "country": "Country",
+    "policytype": "ProductType",
+    "sumassured": "SumInsured",
+    "smokerdrinker": "SmokerDrinker",
+    "diseases": "HealthIssues",
+    "annualpremium": "AnnualPremium",
+    "priceofvehicle": "PriceOfVehicle",
+    "ageofvehicle": "AgeOfVehicle",
+    "typeofvehicle": "TypeOfVehicle",
+    "propertyvalue": "PropertyValue",
+    "propertyage": "PropertyAge",
+    "propertytype": "PropertyType",
+    "propertysize": "PropertySizeSqFeet",
+    "existingmedicalcondition": "ExistingMedicalCondition",
+    "healthcoverage": "HealthCoverage",
+    "baggagecoverage": "BaggageCoverage",
+    "tripcancellationcoverage": "TripCancellationCoverage",
+    "accidentcoverage": "AccidentCoverage",
+}
+
+
+def rule_row(data_norm: dict) -> dict:
+    """A normalized model row keyed by rules.json column names."""
+    return {RULE_COLUMNS.get(k, k): v for k, v in data_norm.items()}
+
+
+# ---------------------
+# Calibration
+# ---------------------
+def calibrate(country: str, policy: str, df: pd.DataFrame, plan: Optional[RulePlan] = None) -> Dict:
+    """Rows and model agreement per rule branch of ``df`` (one segment's rows)."""
+    # imported here: predict imports this module
+    from .predict import _normalize_frame, _score_frame
+
+    plan = plan or RULES.get()
+    rule = plan.rules.get((country, policy))
+    if rule is None:
+        raise ValueError(f"No rules for {country}/{policy}")
+
+    X = _normalize_frame(country, policy, df)
+    classes, probs, _ = _score_frame(get_bundle(country, policy), X)
+    model = np.array([str(c).lower() for c in classes])[probs.argmax(axis=1)]
+    branch = rule.branch_frame(X.rename(columns=RULE_COLUMNS))
+    tier = TIER_LABELS[rule.branch_tiers[branch]]
+
+    branches = {}
+    for b in np.unique(branch):
+        rows = branch == b
+        label = tier[rows][0]
+        agree = 0 if label is None else int((model[rows] == label.lower()).sum())
+        branches[str(int(b))] = {"tier": label, "rows": int(rows.sum()), "agree": agree}
+    return {"rules_digest": plan.digest, "rules_version": plan.version, "branches": branches}
+
+
+def save_agreement(path: Path, table: Dict) -> Path:
+    """Write ``table`` to ``path / AGREEMENT_NAME`` atomically."""
+    target = path / AGREEMENT_NAME
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(table, indent=2))
+    os.replace(tmp, target)
+    return target
+
+
+def load_agreement(path: Path) -> Optional[Dict]:
+    """The agreement table in artifact directory ``path`` unless missing or older than the models."""
+    table_path = path / AGREEMENT_NAME
+    if not table_path.exists():
+        return None
+    mtime = table_path.stat().st_mtime_ns
+    for model in ("clf.pkl", "reg.pkl"):
+        if (path / model).exists() and (path / model).stat().st_mtime_ns > mtime:
+            print(f"Ignoring stale {table_path}; rebuild it with python -m scripts.recommendation.cascade")
+            return None
+    try:
+        return json.loads(table_path.read_text())
+    except Exception as e:
+        print(f"Could not load {table_path}: {e}")
+        return None
+
+
+# ---------------------
+# Serving
+# ---------------------
+class RuleCascade:
+    """Decides rows by trusted rule branches and counts what that saved."""
+
+    def __init__(self, enabled: bool = CASCADE_ENABLED, min_agreement: float = CASCADE_MIN_AGREEMENT,
+                 min_rows: int = CASCADE_MIN_ROWS):
+        self.enabled = enabled
+        self.min_agreement = min_agreement
+        self.min_rows = min_rows
+        # (country, policy) -> (model version, rules digest, branch -> class label)
+        self._trusted: Dict[Tuple[str, str], Tuple[str, str, Dict[int, str]]] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def trusted_branches(self, bundle, plan: RulePlan) -> Dict[int, str]:
+        """Branch index -> model class label for the branches of bundle's segment that may answer."""
+        key = (bundle.country, bundle.policy)
+        entry = self._trusted.get(key)
+        if entry is not None and entry[:2] == (bundle.version, plan.digest):
+            return entry[2]
+
+        trusted: Dict[int, str] = {}
+        table = load_agreement(REGISTRY.path_for(*key))
+        if table is not None and table.get("rules_digest") == plan.digest:
+            classes = {str(c).lower(): c for c in bundle.clf.classes_}
+            for b, row in table["branches"].items():
+                tier = row["tier"]
+                if tier is None or tier.lower() not in classes or row["rows"] < self.min_rows:
+                    continue
+                if row["agree"] / row["rows"] >= self.min_agreement:
+                    trusted[int(b)] = classes[tier.lower()]
+        self._trusted[key] = (bundle.version, plan.digest, trusted)
+        return trusted
+
+    def decide(self, bundle, rows: List[dict]) -> List[Optional[str]]:
+        """Per row, the class label the rules settle it with, or None when the model must run."""
+        started = time.perf_counter()
+        plan = RULES.get()
+        rule = plan.rules.get((bundle.country, bundle.policy))
+        trusted = self.trusted_branches(bundle, plan) if rule is not None else {}
+        decided = [trusted.get(rule.branch(rule_row(r))) for r in rows] if trusted else [None] * len(rows)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            s = self._segment(bundle)
+            s["requests"] += len(rows)
+            s["short_circuits"] += sum(d is not None for d in decided)
+            s["rule_seconds"] += elapsed
+        return decided
+
+    def record_model(self, bundle, rows: int, seconds: float) -> None:
+        """Classifier time spent on ``rows`` rows the rules did not settle."""
+        with self._lock:
+            s = self._segment(bundle)
+            s["model_rows"] += rows
+            s["model_seconds"] += seconds
+
+    def _segment(self, bundle) -> Dict[str, float]:
+        key = (bundle.country, bundle.policy)
+        if key not in self._stats:
+            self._stats[key] = dict.fromkeys(
+                ("requests", "short_circuits", "rule_seconds", "model_rows", "model_seconds"), 0)
+        return self._stats[key]
+
+    def stats(self) -> Dict:
+        """Per segment: short-circuit rate and classifier time saved (net of rule time)."""
+        out = {}
+        with self._lock:
+            for (country, policy), s in sorted(self._stats.items()):
+                per_row = s["model_seconds"] / s["model_rows"] if s["model_rows"] else None
+                entry = self._trusted.get((country, policy))
+                out[f"{country}-{policy}"] = {
+                    "requests": s["requests"],
+                    "short_circuits": s["short_circuits"],
+                    "short_circuit_rate": round(s["short_circuits"] / s["requests"], 4) if s["requests"] else 0.0,
+                    "trusted_branches": sorted(entry[2]) if entry is not None else [],
+                    "classifier_ms_per_row": round(1000 * per_row, 3) if per_row is not None else None,
+                    "rule_ms": round(1000 * s["rule_seconds"], 3),
+                    "saved_ms": (round(1000 * (s["short_circuits"] * per_row - s["rule_seconds"]), 3)
+                                 if per_row is not None else None),
+                }
+        return {"enabled": self.enabled, "min_agreement": self.min_agreement,
+                "min_rows": self.min_rows, "segments": out}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trusted.clear()
+            self._stats.clear()
+
+
+CASCADE = RuleCascade()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .common import ARTIFACTS
+    from .score_book import standardize_columns
+    from .train_cache import load_dataset, segment
+
+    ap = argparse.ArgumentParser(description="Measure rule/model agreement per rule branch")
+    ap.add_argument("--country", action="append", help="only these countries (repeatable)")
+    ap.add_argument("--policy", action="append", help="only these policies (repeatable)")
+    args = ap.parse_args(argv)
+
+    plan = RULES.get()
+    processed = ARTIFACTS.parent / "processed"
+    for path in sorted(p for p in ARTIFACTS.iterdir() if p.is_dir() and "_" in p.name):
+        country, policy = path.name.split("_", 1)
+        if (args.policy and policy not in args.policy) or (args.country and country not in args.country):
+            continue
+        csv = processed / f"standardized_{country}.csv"
+        if (country, policy) not in plan.rules or not csv.exists():
+            continue
+
+        df = standardize_columns(segment(load_dataset(csv), country, policy).copy())
+        table = calibrate(country, policy, df, plan)
+        save_agreement(path, table)
+
+        rows = sum(b["rows"] for b in table["branches"].values())
+        trusted = sum(b["rows"] for b in table["branches"].values()
+                      if b["tier"] is not None and b["rows"] >= CASCADE_MIN_ROWS
+                      and b["agree"] / b["rows"] >= CASCADE_MIN_AGREEMENT)
+        detail = ", ".join(f"#{k} {b['tier']} {b['agree']}/{b['rows']}" for k, b in table["branches"].items())
+        print(f"{country}-{policy}: {trusted}/{rows} rows in trusted branches ({detail})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,8 @@
 # scripts/recommendation/common.py
+import json
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import OneHotEncoder
 from pathlib import Path
 
 # -----------------
@@ -61,16 +61,22 @@ def save_artifacts(path: Path, obj, name: str):
 def load_artifacts(path: Path, name: str):
     return joblib.load(path / f"{name}.pkl")
 
+def load_feature_list(path: Path, name: str):
+    p = path / name
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
 # -----------------
 # Preprocessing
 # -----------------
-def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None, features_list=None):
+def preprocess(X: pd.DataFrame, encoder: "OneHotEncoder" = None, features_list=None):
     """Return numeric + one-hot encoded categorical features.
 
     NaNs are preserved for numeric columns (HGB supports them).
     features_list: Optional list of features to use instead of default FEATURES
     """
-    print(f"Input DataFrame:\n{X}")
     X = X.copy()
 
     # Use provided features list or default to FEATURES
@@ -83,13 +89,14 @@ def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None, features_list=Non
             X[col] = np.nan
 
     X = X[features_to_use]
-    print(f"Preprocessed DataFrame:\n{X}")
 
     cat_cols = X.select_dtypes(include=["object"]).columns
     num_cols = X.select_dtypes(exclude=["object"]).columns
 
     # OneHotEncoder (only categorical)
     if encoder is None:
+        # imported here so serving, which never fits encoders, doesn't load sklearn
+        from sklearn.preprocessing import OneHotEncoder
         encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=False)
         if len(cat_cols):
             encoder.fit(X[cat_cols])
@@ -100,3 +107,98 @@ def preprocess(X: pd.DataFrame, encoder: OneHotEncoder = None, features_list=Non
     X_cat = encoder.transform(X[cat_cols]) if len(cat_cols) else np.zeros((len(X), 0))
 
     return np.concatenate([X_num, X_cat], axis=1), encoder
+
+
+# -----------------
+# Compiled row encoding
+# -----------------
+class RowEncoder:
+    """Encoding plan compiled from a fitted OneHotEncoder and a feature list.
+
+    Produces the same matrix as ``preprocess(X, encoder, features)`` for rows
+    given as plain dicts, without building a DataFrame: numeric features are
+    copied in feature order, then each categorical feature sets one column
+    found by dictionary lookup (unknown values leave the block all zeros,
+    matching ``handle_unknown="ignore"``).
+
+    dtype defaults to float64 because HistGradientBoosting bins its input in
+    float64; a float32 row would round large sums and break exact parity.
+    """
+
+    def __init__(self, features, enc_features, categories, dtype=np.float64):
+        self.features = tuple(features)
+        self.dtype = dtype
+
+        enc_features = [str(f) for f in enc_features]
+        cat_features = [f for f in self.features if f in enc_features]
+        if cat_features and cat_features != enc_features:
+            raise ValueError(f"Encoder columns {enc_features} do not match features {cat_features}")
+
+        self.num_features = tuple(f for f in self.features if f not in cat_features)
+        self.cat_features = tuple(cat_features)
+
+        offset = len(self.num_features)
+        plan = []
+        for f, cats in zip(enc_features, categories if cat_features else []):
+            lookup = {c: offset + j for j, c in enumerate(np.asarray(cats).tolist())}
+            plan.append((f, lookup))
+            offset += len(cats)
+        self.cat_plan = tuple(plan)
+        self.width = offset
+
+    def encode(self, row: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode one dict into a (1, width) matrix, optionally into ``out``."""
+        if out is None:
+            out = np.zeros((1, self.width), dtype=self.dtype)
+        else:
+            out[...] = 0
+        self._fill(row, out[0])
+        return out
+
+    def encode_many(self, rows) -> np.ndarray:
+        """Encode a sequence of dicts into an (n, width) matrix."""
+        out = np.zeros((len(rows), self.width), dtype=self.dtype)
+        for i, row in enumerate(rows):
+            self._fill(row, out[i])
+        return out
+
+    def encode_frame(self, X: pd.DataFrame) -> np.ndarray:
+        """Encode a DataFrame column-wise into an (n, width) matrix.
+
+        Missing columns are treated like missing keys in encode().
+        """
+        n = len(X)
+        out = np.zeros((n, self.width), dtype=self.dtype)
+        for i, f in enumerate(self.num_features):
+            if f in X.columns:
+                out[:, i] = pd.to_numeric(X[f], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            else:
+                out[:, i] = np.nan
+        rows = np.arange(n)
+        for f, lookup in self.cat_plan:
+            if f not in X.columns:
+                continue
+            j = X[f].map(lookup).to_numpy(dtype=float, na_value=np.nan)
+            hit = ~np.isnan(j)
+            out[rows[hit], j[hit].astype(np.intp)] = 1.0
+        return out
+
+    def _fill(self, row: dict, dst: np.ndarray) -> None:
+        for i, f in enumerate(self.num_features):
+            v = row.get(f)
+            dst[i] = np.nan if v is None or v is pd.NA else v
+        for f, lookup in self.cat_plan:
+            try:
+                j = lookup.get(row.get(f))
+            except TypeError:  # unhashable value is never a known category
+                j = None
+            if j is not None:
+                dst[j] = 1.0
+
+
+def compile_encoder(encoder: "OneHotEncoder", features, dtype=np.float64) -> RowEncoder:
+    """Compile a fitted OneHotEncoder into a RowEncoder for ``features``."""
+    if getattr(encoder, "drop_idx_", None) is not None:
+        raise ValueError("RowEncoder does not support OneHotEncoder(drop=...)")
+    enc_features = list(getattr(encoder, "feature_names_in_", []))
+    return RowEncoder(features, enc_features, encoder.categories_, dtype=dtype)
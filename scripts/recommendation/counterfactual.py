@@ -0,0 +1,188 @@
+# scripts/recommendation/counterfactual.py
+""""What would I need to change?" search over the per-(country, policy) models.
+
+Starting from a customer's profile, ``find_counterfactuals`` tries edits to
+the fields a customer can actually change (listed in ``ACTIONS``). Examples
+are a lower sum assured, lighter travel coverage, or a different vehicle
+type. It returns the cheapest edit sets that reach the goal:
+
+* ``goal="tier"``: the recommended tier drops below the current one, or
+  reaches ``target_tier``, and the premium falls;
+* ``goal="premium"``: the premium of the recommended tier falls by at least
+  ``min_saving`` (a fraction).
+
+The search is a beam search by number of changed fields. Depth d extends
+each of the ``beam_width`` most promising (d-1)-edit profiles by one more
+field. Every candidate at a depth is scored in one predict_many call, so all
+uncached variants share one classifier and one regressor call. The first
+depth that reaches the goal ends the search, so results change as few fields
+as possible. They are ordered by edit cost. The search also stops when the
+time budget runs out and then reports ``complete: False``.
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .predict import TIERS, predict_many
+
+COUNTERFACTUAL_BUDGET_MS = float(os.getenv("COUNTERFACTUAL_BUDGET_MS", "300"))
+
+# model classes are lowercase tier names; premiums are keyed by TIERS
+TIER_RANK = {t.lower(): i for i, t in enumerate(TIERS)}
+COVERAGE_LEVELS = ("basic", "standard", "gold", "premium")
+# cheapest first, as in pricing.VEHICLE_BASE_PREMIUM
+VEHICLE_TYPES = ("2wheeler", "car", "luxury", "commercial")
+
+
+@dataclass(frozen=True)
+class Action:
+    """One field a customer can change and the values worth trying.
+
+    kind is "scale" (multiply a number by each factor in options; cost is
+    weight x the fraction removed), "levels" (move down an ordered list;
+    weight per level) or "choice" (any other option; weight each).
+    """
+    field: str
+    kind: str
+    options: Tuple = ()
+    weight: float = 1.0
+    default: Any = None
+
+    def edits(self, value) -> List[Tuple[Any, float]]:
+        """(new value, cost) pairs reachable from ``value`` in one edit."""
+        value = self.default if value is None else value
+        if self.kind == "scale":
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return []
+            if number <= 0:
+                return []
+            return [(round(number * f, 2), self.weight * (1 - f)) for f in self.options]
+
+        current = str(value).lower()
+        if self.kind == "levels":
+            if current not in self.options:
+                return []
+            i = self.options.index(current)
+            return [(self.options[j], self.weight * (i - j)) for j in range(i)]
+        return [(o, self.weight) for o in self.options if o != current]
+
+
+_SUM_ASSURED = Action("sumassured", "scale", (0.9, 0.75, 0.5, 0.25), default=0)
+
+ACTIONS: Dict[str, Tuple[Action, ...]] = {
+    "health": (_SUM_ASSURED,),
+    "life": (_SUM_ASSURED,),
+    "vehicle": (Action("typeofvehicle", "levels", VEHICLE_TYPES, default="car"),),
+    "house": (),
+    "travel": (
+        _SUM_ASSURED,
+        Action("healthcoverage", "levels", COVERAGE_LEVELS, 0.5, "basic"),
+        Action("baggagecoverage", "levels", COVERAGE_LEVELS, 0.5, "basic"),
+        Action("accidentcoverage", "levels", COVERAGE_LEVELS, 0.5, "basic"),
+        Action("tripcancellationcoverage", "levels", ("no", "yes"), 0.5, "no"),
+    ),
+}
+
+
+def _rank(tier: str) -> int:
+    return TIER_RANK.get(str(tier).lower(), len(TIERS))
+
+
+def _premium(prediction: Dict) -> float:
+    return prediction["all_tiers"][TIERS[_rank(prediction["recommended_tier"])]]
+
+
+def find_counterfactuals(country: str, policy: str, data: dict, goal: str = "tier",
+                         target_tier: Optional[str] = None, min_saving: float = 0.05,
+                         max_changes: int = 3, beam_width: int = 8, max_results: int = 3,
+                         budget_ms: float = COUNTERFACTUAL_BUDGET_MS) -> Dict:
+    """Smallest sets of edits to ``data`` that reach a cheaper tier or premium."""
+    started = time.monotonic()
+    deadline = started + budget_ms / 1000.0
+    policytype = policy.lower()
+    if goal not in ("tier", "premium"):
+        raise ValueError(f"Unknown goal: {goal}")
+    if target_tier is not None and str(target_tier).lower() not in TIER_RANK:
+        raise ValueError(f"Unknown tier: {target_tier}. Must be one of {TIERS}")
+
+    base = predict_many(country, policytype, [data])[0]
+    if isinstance(base, Exception):
+        raise base
+    base_tier, base_premium = base["recommended_tier"], _premium(base)
+    wanted = _rank(target_tier) if target_tier is not None else _rank(base_tier) - 1
+
+    def reached(prediction: Dict) -> bool:
+        if _premium(prediction) >= base_premium:
+            return False  # a cheaper tier that costs more is no saving
+        if goal == "tier":
+            return _rank(prediction["recommended_tier"]) <= wanted
+        return _premium(prediction) <= base_premium * (1 - min_saving)
+
+    def progress(prediction: Dict) -> float:
+        if goal == "tier":
+            return sum(p for t, p in prediction["confidence"].items() if _rank(t) <= wanted)
+        return (base_premium - _premium(prediction)) / base_premium if base_premium else 0.0
+
+    # nothing to search for when already there (or already on the cheapest tier)
+    actions = ACTIONS.get(policytype, ()) if wanted >= 0 and not reached(base) else ()
+    beam: List[Tuple[Dict, float]] = [({}, 0.0)]
+    seen = set()
+    solutions: List[Tuple[float, Dict, Dict]] = []
+    evaluated, complete = 0, True
+
+    for _ in range(max_changes):
+        candidates = []
+        for edits, cost in beam:
+            for action in actions:
+                if action.field in edits:
+                    continue
+                for value, step in action.edits(data.get(action.field)):
+                    changed = dict(edits, **{action.field: value})
+                    key = tuple(sorted(changed.items()))
+                    if key not in seen:
+                        seen.add(key)
+                        candidates.append((changed, cost + step))
+        if not candidates:
+            break
+        if time.monotonic() > deadline:
+            complete = False
+            break
+
+        predictions = predict_many(country, policytype, [dict(data, **edits) for edits, _ in candidates])
+        evaluated += len(candidates)
+
+        frontier = []
+        for (edits, cost), prediction in zip(candidates, predictions):
+            if isinstance(prediction, Exception):
+                continue
+            if reached(prediction):
+                solutions.append((cost, edits, prediction))
+            else:
+                frontier.append((-progress(prediction), cost, edits))
+        if solutions:
+            break  # fewest changed fields first
+        frontier.sort(key=lambda f: (f[0], f[1]))
+        beam = [(edits, cost) for _, cost, edits in frontier[:beam_width]]
+
+    solutions.sort(key=lambda s: (s[0], _premium(s[2])))
+    return {
+        "current": {"recommended_tier": base_tier, "premium": base_premium},
+        "counterfactuals": [
+            {
+                "changes": {f: {"from": data.get(f), "to": v} for f, v in edits.items()},
+                "cost": round(cost, 4),
+                "recommended_tier": prediction["recommended_tier"],
+                "premium": _premium(prediction),
+                "saving": round(base_premium - _premium(prediction), 2),
+            }
+            for cost, edits, prediction in solutions[:max_results]
+        ],
+        "evaluated": evaluated,
+        "complete": complete,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
@@ -0,0 +1,154 @@
+# scripts/recommendation/feature_store.py
+"""Encoded training matrices, materialized once per data version.
+
+Each prepared ``train.Segment`` (one (country, policy) train/test split) is
+encoded by one OneHotEncoder fitted on its training rows. The result is
+written to::
+
+    processed/features/<country>_<policy>/<version>/
+        Mtr.npy  Mte.npy               encoded train / test matrices
+        yct.npy  yce.npy               tier labels
+        yrt.npy  yre.npy               premium targets
+        encoder.pkl  meta.json
+
+The version is a digest of the segment's data, so changed data gets a new
+directory and unchanged data is never re-encoded. Matrices are opened as
+read-only memmaps. The classifier and the regressor train from the same
+matrices (they used to fit two identical encoders), and offline evaluation
+reads the stored test matrices. Only the newest ``keep`` versions of a
+segment are kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+FEATURE_ROOT = Path(__file__).resolve().parents[2] / "processed" / "features"
+STORE_FORMAT = 1
+ARRAYS = ("Mtr", "Mte", "yct", "yce", "yrt", "yre")
+
+
+def data_version(seg) -> str:
+    """Digest of a segment's features, split and targets."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([STORE_FORMAT, seg.features]).encode("utf-8"))
+    for part in (seg.Xtr, seg.Xte, seg.yct, seg.yce, seg.yrt, seg.yre):
+        h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class EncodedSegment:
+    """One materialized version; arrays are memory-mapped on first use in each process."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.country: str = self.meta["country"]
+        self.policy: str = self.meta["policy"]
+        self.version: str = self.meta["version"]
+        self.features = self.meta["features"]
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._encoder = None
+
+    def __getstate__(self):
+        # ship the path, not the mapped arrays, to other processes
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _array(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            arr = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            self._arrays[name] = arr.astype(object) if arr.dtype.kind == "U" else arr
+        return self._arrays[name]
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = joblib.load(self.path / "encoder.pkl")
+        return self._encoder
+
+    Mtr = property(lambda self: self._array("Mtr"))
+    Mte = property(lambda self: self._array("Mte"))
+    yct = property(lambda self: self._array("yct"))
+    yce = property(lambda self: self._array("yce"))
+    yrt = property(lambda self: self._array("yrt"))
+    yre = property(lambda self: self._array("yre"))
+
+
+class FeatureStore:
+    """Versioned, memory-mapped encoded matrices per (country, policy)."""
+
+    def __init__(self, root: Path = FEATURE_ROOT, keep: int = 2):
+        self.root = Path(root)
+        self.keep = keep
+
+    def path_for(self, country: str, policy: str, version: str) -> Path:
+        return self.root / f"{country.lower()}_{policy.lower()}" / version
+
+    def get(self, country: str, policy: str, version: str) -> Optional[EncodedSegment]:
+        path = self.path_for(country, policy, version)
+        return EncodedSegment(path) if (path / "meta.json").exists() else None
+
+    def encoded(self, seg) -> EncodedSegment:
+        """The stored encoding of ``seg``, materializing it on first use."""
+        version = data_version(seg)
+        found = self.get(seg.country, seg.policy, version)
+        if found is not None:
+            return found
+        return self._materialize(seg, version)
+
+    def _materialize(self, seg, version: str) -> EncodedSegment:
+        # imported here: train imports this module
+        from .train import _encode, _fit_encoder
+
+        target = self.path_for(seg.country, seg.policy, version)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=target.parent))
+        try:
+            enc = _fit_encoder(seg.Xtr)
+            arrays = {
+                "Mtr": _encode(seg.Xtr, enc),
+                "Mte": _encode(seg.Xte, enc),
+                "yct": seg.yct.to_numpy().astype(str),
+                "yce": seg.yce.to_numpy().astype(str),
+                "yrt": seg.yrt.to_numpy(dtype=np.float64),
+                "yre": seg.yre.to_numpy(dtype=np.float64),
+            }
+            for name, arr in arrays.items():
+                np.save(tmp / f"{name}.npy", arr)
+            joblib.dump(enc, tmp / "encoder.pkl")
+            meta = {"format": STORE_FORMAT, "country": seg.country.lower(), "policy": seg.policy.lower(),
+                    "version": version, "features": seg.features,
+                    "shapes": {name: list(arr.shape) for name, arr in arrays.items()}}
+            (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+            try:
+                os.rename(tmp, target)
+            except OSError:
+                if not (target / "meta.json").exists():  # not just a concurrent writer winning
+                    raise
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._prune(target.parent, version)
+        return EncodedSegment(target)
+
+    def _prune(self, directory: Path, current: str) -> None:
+        versions = sorted((p for p in directory.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                          key=lambda p: p.stat().st_mtime_ns, reverse=True)
+        for old in [p for p in versions if p.name != current][max(self.keep - 1, 0):]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+FEATURE_STORE = FeatureStore()
@@ -0,0 +1,323 @@
+# scripts/recommendation/grid.py
+"""Precomputed scoring grids for low-dimensional policies (health, life).
+
+The health and life models see two numbers (age, sumassured) and a handful
+of categoricals. ``build_grid`` scores every combination of
+
+* the configured ages and sums assured, and
+* every categorical value the trees can tell apart,
+
+and saves the raw model outputs to ``score_grid.npz`` in the artifact
+directory. The registry loads the file next to the models. predict() then
+answers from the grid and calls the models only on a miss.
+
+Grid cells are keyed by *split interval*, not by value. Two inputs that fall
+between the same pair of split thresholds of every tree get bit-identical
+predictions (see ``tree_eval.score_unique``). A grid age of 30 therefore also
+answers 30.4 when no tree splits between them. Within that exact region, a hit
+agrees with the model. An optional per-feature absolute ``tolerance`` also
+snaps near-misses to the closest grid value. That trades exactness for a
+higher hit rate, and ``agreement_report`` measures the cost.
+
+Usage::
+
+    python -m scripts.recommendation.grid                # all health/life segments
+    python -m scripts.recommendation.grid --spec grid.json --country india
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .tree_eval import split_points
+
+GRID_NAME = "score_grid.npz"
+GRID_POLICIES = ("health", "life")
+GRID_ENABLED = os.getenv("SCORE_GRID", "1") != "0"
+
+# values for every numeric model feature; "tolerance" is optional
+DEFAULT_SPEC = {
+    "age": list(range(18, 81)),
+    "sumassured": list(range(500_000, 7_500_001, 250_000)),
+    "tolerance": {},
+}
+
+_UNKNOWN = "\x00unknown"  # a category value no encoder knows
+
+
+class ScoreGrid:
+    """Grid of raw (probabilities, premiums) with O(features) lookup."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        meta = json.loads(str(arrays["meta"]))
+        self.meta = meta
+        self.classes = [str(c) for c in arrays["classes"]]
+        self.probs = arrays["probs"]
+        self.premiums = arrays["premiums"]
+        self.shape = tuple(meta["shape"])
+        self.strides = [int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape))]
+        self.hits = 0
+        self.misses = 0
+
+        # numeric axes: interval of x among the split points -> axis index
+        self._numeric = []
+        for f in meta["numeric"]:
+            points = arrays[f"points/{f}"].tolist()
+            values = arrays[f"values/{f}"]
+            keys = [bisect_left(points, v) for v in values.tolist()]
+            tol = float(meta["tolerance"].get(f, 0.0))
+            self._numeric.append((f, points, dict(zip(keys, range(len(keys)))), values, tol))
+
+        # categorical axes: value -> code; values not listed share code 0
+        self._categorical = []
+        for f in meta["categorical"]:
+            values = arrays[f"values/{f}"].tolist()
+            codes = arrays[f"codes/{f}"].tolist()
+            self._categorical.append((f, dict(zip(values, codes))))
+
+    @classmethod
+    def load(cls, path: Path) -> "ScoreGrid":
+        with np.load(path, allow_pickle=False) as f:
+            return cls({k: f[k] for k in f.files})
+
+    def cell(self, row: dict) -> Optional[int]:
+        """Flat cell index for a normalized feature dict, or None on a miss."""
+        index, axis = 0, 0
+        for f, points, by_interval, values, tol in self._numeric:
+            x = row.get(f)
+            if x is None or x != x:
+                return None
+            i = by_interval.get(bisect_left(points, x))
+            if i is None:
+                if not tol:
+                    return None
+                i = int(np.abs(values - x).argmin())
+                if abs(values[i] - x) > tol:
+                    return None
+            index += i * self.strides[axis]
+            axis += 1
+        for f, codes in self._categorical:
+            try:
+                code = codes.get(row.get(f), 0)
+            except TypeError:  # unhashable value is never a known category
+                code = 0
+            index += code * self.strides[axis]
+            axis += 1
+        return index
+
+    def lookup(self, row: dict):
+        """(classes, probabilities[k], premiums[len(TIERS)]) or None on a miss."""
+        i = self.cell(row)
+        if i is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.classes, self.probs[i], self.premiums[i]
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "cells": len(self.probs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "agreement": self.meta.get("agreement"),
+        }
+
+
+def load_grid(path: Path) -> Optional[ScoreGrid]:
+    """The grid in artifact directory ``path`` when enabled and not older than the models."""
+    grid_path = path / GRID_NAME
+    if not GRID_ENABLED or not grid_path.exists():
+        return None
+    mtime = grid_path.stat().st_mtime_ns
+    for model in ("clf.pkl", "reg.pkl"):
+        if (path / model).exists() and (path / model).stat().st_mtime_ns > mtime:
+            print(f"Ignoring stale {grid_path}; rebuild it with python -m scripts.recommendation.grid")
+            return None
+    try:
+        return ScoreGrid.load(grid_path)
+    except Exception as e:
+        print(f"Could not load {grid_path}: {e}")
+        return None
+
+
+# ---------------------
+# Building
+# ---------------------
+def _model_columns(bundle) -> List[Tuple]:
+    """(encoder, split points) for the classifier and the regressor."""
+    return [(bundle.row_cls, split_points(bundle.clf)), (bundle.row_reg, split_points(bundle.reg))]
+
+
+def _numeric_points(bundle, feature: str) -> np.ndarray:
+    """Union of every split threshold the models place on ``feature``."""
+    points = [np.empty(0)]
+    for enc, model_points in _model_columns(bundle):
+        if feature in enc.num_features:
+            points.append(model_points[enc.num_features.index(feature)])
+    return np.unique(np.concatenate(points))
+
+
+def _category_codes(bundle, feature: str) -> Tuple[List[str], List[int], List[str]]:
+    """Group a categorical feature's values by the columns the trees actually split on.
+
+    Returns (values, codes, representatives): ``codes[i]`` is the code of
+    ``values[i]``, ``representatives[c]`` a value with code ``c``. Code 0 is
+    "no split column set", shared by unknown and never-split values.
+    """
+    lookups = []
+    for enc, model_points in _model_columns(bundle):
+        lookup = dict(enc.cat_plan).get(feature, {})
+        lookups.append({v: j for v, j in lookup.items() if len(model_points[j])})
+
+    signature_codes = {(None,) * len(lookups): 0}
+    representatives = [_UNKNOWN]
+    values, codes = [], []
+    for v in sorted({v for lookup in lookups for v in lookup}):
+        signature = tuple(lookup.get(v) for lookup in lookups)
+        if signature not in signature_codes:
+            signature_codes[signature] = len(representatives)
+            representatives.append(v)
+        values.append(v)
+        codes.append(signature_codes[signature])
+    return values, codes, representatives
+
+
+def build_grid(country: str, policy: str, spec: Dict = None) -> Dict[str, np.ndarray]:
+    """Score the full grid for one (country, policy); returns the arrays to save."""
+    from .predict import POLICY_FEATURES, _score_frame
+    from .registry import get_bundle
+
+    spec = dict(DEFAULT_SPEC if spec is None else spec)
+    policy = policy.lower()
+    bundle = get_bundle(country, policy)
+    if policy not in GRID_POLICIES:
+        raise ValueError(f"Grids are only built for {GRID_POLICIES}, not {policy}")
+
+    features = list(dict.fromkeys(bundle.row_cls.features + bundle.row_reg.features))
+    numeric = [f for f in features if f in bundle.row_cls.num_features + bundle.row_reg.num_features]
+    categorical = [f for f in features if f not in numeric and f != bundle.reg_tier_col]
+    missing = [f for f in numeric if f not in spec]
+    if missing:
+        raise ValueError(f"Grid spec has no values for numeric features {missing}")
+
+    arrays: Dict[str, np.ndarray] = {}
+    axes = []
+    for f in numeric:
+        points = _numeric_points(bundle, f)
+        values = np.asarray(sorted(float(v) for v in spec[f]))
+        # one value per split interval is enough
+        _, first = np.unique(np.searchsorted(points, values, side="left"), return_index=True)
+        values = values[first]
+        arrays[f"points/{f}"] = points
+        arrays[f"values/{f}"] = values
+        axes.append(values.tolist())
+    for f in categorical:
+        values, codes, representatives = _category_codes(bundle, f)
+        arrays[f"values/{f}"] = np.asarray(values, dtype=str)
+        arrays[f"codes/{f}"] = np.asarray(codes, dtype=np.int64)
+        axes.append(representatives)
+
+    X = pd.DataFrame(list(itertools.product(*axes)), columns=numeric + categorical)
+    for f in POLICY_FEATURES[policy]:
+        if f not in X.columns:
+            X[f] = None
+    classes, probs, premiums = _score_frame(bundle, X)
+
+    meta = {
+        "country": country.lower(),
+        "policy": policy,
+        "model_version": bundle.version,
+        "numeric": numeric,
+        "categorical": categorical,
+        "shape": [len(a) for a in axes],
+        "tolerance": {k: float(v) for k, v in spec.get("tolerance", {}).items()},
+    }
+    arrays.update(classes=np.asarray(classes, dtype=str), probs=probs, premiums=premiums)
+    arrays["meta"] = np.asarray(json.dumps(meta))
+    return arrays
+
+
+def agreement_report(grid: ScoreGrid, country: str, policy: str, df: pd.DataFrame) -> Dict:
+    """Hit rate of ``grid`` on the profiles in ``df`` and how often hits agree with the models.
+
+    ``agreement`` counts hits whose formatted result (tier, rounded confidences
+    and premiums) equals the model's; ``tier_agreement`` only the tier.
+    """
+    from .predict import _format_result, _normalize_frame, _score_frame
+    from .registry import get_bundle
+
+    bundle = get_bundle(country, policy)
+    X = _normalize_frame(country, policy, df)
+    classes, probs, premiums = _score_frame(bundle, X)
+
+    hits = agree = same_tier = 0
+    for i, row in enumerate(X.to_dict("records")):
+        found = grid.lookup(row)
+        if found is None:
+            continue
+        hits += 1
+        got = _format_result(country, *found)
+        expected = _format_result(country, classes, probs[i], premiums[i])
+        agree += got == expected
+        same_tier += got["recommended_tier"] == expected["recommended_tier"]
+    return {
+        "rows": len(X),
+        "hit_rate": round(hits / len(X), 4) if len(X) else 0.0,
+        "agreement": round(agree / hits, 4) if hits else None,
+        "tier_agreement": round(same_tier / hits, 4) if hits else None,
+    }
+
+
+def save_grid(path: Path, arrays: Dict[str, np.ndarray]) -> Path:
+    """Write the grid atomically into artifact directory ``path``."""
+    target = path / GRID_NAME
+    tmp = path / (GRID_NAME + ".tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, target)
+    return target
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .common import ARTIFACTS
+    from .train_cache import load_dataset, segment
+
+    ap = argparse.ArgumentParser(description="Build precomputed scoring grids for health/life models")
+    ap.add_argument("--spec", help="JSON file with grid values per numeric feature (and optional tolerance)")
+    ap.add_argument("--country", action="append", help="only these countries (repeatable)")
+    ap.add_argument("--policy", action="append", choices=GRID_POLICIES, help="only these policies (repeatable)")
+    args = ap.parse_args(argv)
+
+    spec = json.loads(Path(args.spec).read_text()) if args.spec else DEFAULT_SPEC
+    processed = ARTIFACTS.parent / "processed"
+    for path in sorted(p for p in ARTIFACTS.iterdir() if p.is_dir() and "_" in p.name):
+        country, policy = path.name.split("_", 1)
+        if policy not in (args.policy or GRID_POLICIES) or (args.country and country not in args.country):
+            continue
+
+        arrays = build_grid(country, policy, spec)
+        meta = json.loads(str(arrays["meta"]))
+
+        csv = processed / f"standardized_{country}.csv"
+        if csv.exists():
+            df = segment(load_dataset(csv), country, policy)
+            meta["agreement"] = agreement_report(ScoreGrid(arrays), country, policy, df)
+            arrays["meta"] = np.asarray(json.dumps(meta))
+
+        target = save_grid(path, arrays)
+        print(f"{country}-{policy}: {len(arrays['probs']):,} cells {meta['shape']} -> {target}"
+              f" ({target.stat().st_size / 1e6:.1f} MB); agreement on training rows: {meta.get('agreement')}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
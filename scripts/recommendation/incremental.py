@@ -0,0 +1,281 @@
+# scripts/recommendation/incremental.py
+"""Warm-start retraining of saved models from newly arrived rows.
+
+A full retrain fits every model from scratch. ``update_segment`` instead
+continues boosting the saved ``clf.pkl`` / ``reg.pkl`` of one
+(country, policy):
+
+* the delta rows are cleaned and split like training rows
+  (``train.prepare_segment``) and encoded with the saved encoders. Values
+  the encoders never saw are encoded as all-zero columns and counted in the
+  report. Only a full retrain learns them, and a tier the classifier does not
+  know skips the segment;
+* the base rows are the standardized CSV's plus every delta the last full
+  retrain already read. Deltas applied since then are split on their own,
+  as when they were applied;
+* each model is copied and fitted with ``warm_start`` on the base training
+  split plus the earlier deltas' and this delta's, for at most
+  ``extra_iter`` more iterations. The base matrices come from the feature
+  store when it used the same encoder;
+* both versions are scored on the matching holdout rows (accuracy for the
+  classifier, R² for the regressor). A model replaces the saved one only
+  when its score drops by no more than ``tolerance``.
+
+Accepted models are written next to the old ones, followed by a fresh
+model.bundle, so the registry picks the new version up like a retrain. The
+delta's rows are kept in ``deltas/<seq>-<digest>.parquet`` and the delta is
+recorded by digest in ``incremental.json``; applying it again is a no-op.
+Full retrains (``train.py``) read the kept rows along with the CSV. The
+score grid and the rule agreement table become stale as after any retrain.
+
+Usage::
+
+    python -m scripts.recommendation.incremental delta.parquet
+    python -m scripts.recommendation.incremental delta.parquet --extra-iter 30 --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import accuracy_score, r2_score
+
+from .feature_store import FEATURE_STORE, FeatureStore, data_version
+from .train import (
+    ARTIFACTS, DELTA_DIR, INCREMENTAL_LOG, POLICY_FEATURES, Segment, _encode, _same_encoder, delta_rows,
+    folded_deltas, load_incremental_log, prepare_segment, save_bundle, save_incremental_log, with_deltas,
+)
+from .train_cache import load_dataset, normalize_columns, segment
+
+LOG_NAME = INCREMENTAL_LOG
+MAX_EXTRA_ITER = int(os.getenv("INCREMENTAL_MAX_EXTRA_ITER", "50"))
+MIN_DELTA_ROWS = 10
+# L2 on the leaves of the added trees: the saved models fit their training rows
+# almost exactly, so a new row they get confidently wrong has a near-zero
+# hessian and, unregularized, a leaf value in the thousands
+WARM_START_L2 = 1.0
+# continue_boosting replaces HistGradientBoosting's private binning step as
+# written in this sklearn release; re-check it before allowing another
+SKLEARN_VERSION = "1.3."
+
+
+def read_delta(path) -> pd.DataFrame:
+    """New labelled rows from a parquet (or CSV) file, headers in the training schema."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Delta not found: {path}")
+    df = pd.read_csv(path) if path.suffix.lower() == ".csv" else pd.read_parquet(path)
+    return normalize_columns(df, path)
+
+
+def continue_boosting(model, X: np.ndarray, y, extra_iter: int, l2: float = WARM_START_L2):
+    """A copy of ``model`` boosted for up to ``extra_iter`` more iterations on (X, y).
+
+    sklearn refits the bin mapper on every fit, then scores the existing trees
+    on the new bins. That is only right when X is the data the model was
+    fitted on. The copy keeps the model's bin mapper, so old and new trees
+    split on the same bins. The added trees use at least ``l2`` leaf
+    regularization, and the copy keeps that value (see ``l2_regularization``
+    in its params and in the update log).
+    """
+    if not sklearn.__version__.startswith(SKLEARN_VERSION):
+        raise RuntimeError(f"continue_boosting relies on sklearn {SKLEARN_VERSION}x internals; "
+                           f"found {sklearn.__version__}. Retrain from scratch instead.")
+    if not hasattr(model, "_bin_mapper") or not callable(getattr(type(model), "_bin_data", None)):
+        raise RuntimeError(f"{type(model).__name__} has no _bin_mapper/_bin_data to keep the bins with")
+    grown = copy.deepcopy(model)
+    mapper = grown._bin_mapper
+
+    def _bin_data(X, is_training_data):
+        grown._bin_mapper = mapper
+        binned = mapper.transform(X)
+        return binned if is_training_data else np.ascontiguousarray(binned)
+
+    grown._bin_data = _bin_data
+    grown.set_params(warm_start=True, max_iter=model.n_iter_ + extra_iter,
+                     l2_regularization=max(model.l2_regularization, l2))
+    try:
+        grown.fit(X, y)
+    finally:
+        del grown._bin_data  # instance override; the model must stay picklable
+    grown.set_params(warm_start=False)
+    return grown
+
+
+def holdout_metrics(clf, reg, X_cls: np.ndarray, X_reg: np.ndarray, y_cls, y_reg) -> Dict[str, float]:
+    return {"accuracy": round(float(accuracy_score(y_cls, clf.predict(X_cls))), 6),
+            "r2": round(float(r2_score(y_reg, reg.predict(X_reg))), 6)}
+
+
+def _unseen_rows(X: pd.DataFrame, enc) -> int:
+    """Rows with a categorical value the encoder was not fitted on."""
+    unseen = np.zeros(len(X), dtype=bool)
+    for name, cats in zip(getattr(enc, "feature_names_in_", []), enc.categories_):
+        unseen |= ~X[name].astype(str).isin(cats.astype(str)).to_numpy()
+    return int(unseen.sum())
+
+
+def _base_matrices(base: Segment, enc, store: FeatureStore) -> Tuple[np.ndarray, np.ndarray]:
+    """Encoded (train, test) rows of the base split; the feature store's when it used ``enc``."""
+    data = store.encoded(base)
+    if _same_encoder(data.encoder, enc):
+        return data.Mtr, data.Mte
+    return _encode(base.Xtr, enc), _encode(base.Xte, enc)
+
+
+def _dump(obj, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+load_log = load_incremental_log
+
+
+def _pending_deltas(country: str, policy: str, outdir: Path) -> List[Segment]:
+    """Applied deltas the saved models were warm-started on but no full retrain has read."""
+    pending = {e["delta"] for e in load_log(outdir) if not e.get("folded")}
+    segments = [prepare_segment(country, policy, rows) for digest, rows in delta_rows(outdir) if digest in pending]
+    return [seg for seg in segments if seg is not None]
+
+
+def _save_delta(outdir: Path, digest: str, rows: pd.DataFrame) -> Path:
+    folder = outdir / DELTA_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{len(list(folder.glob('*.parquet'))) + 1:04d}-{digest}.parquet"
+    tmp = path.with_name(path.name + ".tmp")
+    rows.to_parquet(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def update_segment(country: str, policy: str, base: pd.DataFrame, delta: pd.DataFrame,
+                   artifacts: Path = ARTIFACTS, extra_iter: int = MAX_EXTRA_ITER, tolerance: float = 0.0,
+                   store: FeatureStore = FEATURE_STORE, dry_run: bool = False) -> Dict:
+    """Continue boosting one segment's saved models with ``delta``; returns a report.
+
+    ``base`` and ``delta`` are the segment's rows; deltas applied earlier
+    are added to ``base`` from ``outdir``. The status is "updated",
+    "rejected" (both models would regress), "applied" (this delta was
+    applied before) or "skipped" with a reason.
+    """
+    started = time.perf_counter()
+    report: Dict = {"country": country, "policy": policy, "rows": len(delta)}
+    outdir = artifacts / f"{country}_{policy}"
+    if not (outdir / "clf.pkl").exists():
+        return {**report, "status": "skipped", "reason": f"no trained models in {outdir}"}
+    if len(delta) < MIN_DELTA_ROWS:
+        return {**report, "status": "skipped", "reason": f"fewer than {MIN_DELTA_ROWS} rows"}
+
+    new = prepare_segment(country, policy, delta)
+    old = prepare_segment(country, policy, with_deltas(base, outdir, folded_deltas(outdir)))
+    if new is None or old is None:
+        return {**report, "status": "skipped", "reason": "no usable rows"}
+    digest = data_version(new)
+    log = load_log(outdir)
+    if any(entry["delta"] == digest for entry in log) or any(d == digest for d, _ in delta_rows(outdir)):
+        return {**report, "status": "applied", "delta": digest}
+    earlier = _pending_deltas(country, policy, outdir)
+
+    clf, reg = joblib.load(outdir / "clf.pkl"), joblib.load(outdir / "reg.pkl")
+    enc_cls, enc_reg = joblib.load(outdir / "encoder_cls.pkl"), joblib.load(outdir / "encoder_reg.pkl")
+    unknown = sorted((set(new.yct) | set(new.yce)) - {str(c) for c in clf.classes_})
+    if unknown:
+        return {**report, "status": "skipped", "reason": f"unknown tiers {unknown}; retrain from scratch"}
+
+    matrices = {}
+    for kind, enc in (("cls", enc_cls), ("reg", enc_reg)):
+        if kind == "reg" and _same_encoder(enc_reg, enc_cls):
+            matrices[kind] = matrices["cls"]
+            continue
+        Mtr, Mte = _base_matrices(old, enc, store)
+        matrices[kind] = (np.vstack([Mtr, *(_encode(seg.Xtr, enc) for seg in earlier + [new])]),
+                          np.vstack([Mte, *(_encode(seg.Xte, enc) for seg in earlier + [new])]))
+    (Xc, Xc_hold), (Xr, Xr_hold) = matrices["cls"], matrices["reg"]
+    parts = [old, *earlier, new]
+    y_cls, y_cls_hold = pd.concat([s.yct for s in parts]), pd.concat([s.yce for s in parts])
+    y_reg, y_reg_hold = pd.concat([s.yrt for s in parts]), pd.concat([s.yre for s in parts])
+
+    before = holdout_metrics(clf, reg, Xc_hold, Xr_hold, y_cls_hold, y_reg_hold)
+    grown_clf = continue_boosting(clf, Xc, y_cls, extra_iter)
+    grown_reg = continue_boosting(reg, Xr, y_reg, extra_iter)
+    after = holdout_metrics(grown_clf, grown_reg, Xc_hold, Xr_hold, y_cls_hold, y_reg_hold)
+
+    keep_clf = after["accuracy"] >= before["accuracy"] - tolerance
+    keep_reg = after["r2"] >= before["r2"] - tolerance
+    updated = [name for name, keep in (("clf", keep_clf), ("reg", keep_reg)) if keep]
+    report.update({
+        "status": "updated" if updated else "rejected",
+        "delta": digest,
+        "unseen_rows": _unseen_rows(pd.concat([new.Xtr, new.Xte]), enc_cls),
+        "earlier_deltas": len(earlier),
+        "train_rows": len(y_cls),
+        "holdout_rows": len(y_cls_hold),
+        "iterations": {"clf": [clf.n_iter_, grown_clf.n_iter_], "reg": [reg.n_iter_, grown_reg.n_iter_]},
+        "l2_regularization": {"clf": grown_clf.l2_regularization, "reg": grown_reg.l2_regularization},
+        "before": before,
+        "after": after,
+        "updated": updated,
+    })
+    if updated and not dry_run:
+        clf, reg = (grown_clf if keep_clf else clf), (grown_reg if keep_reg else reg)
+        if keep_clf:
+            _dump(clf, outdir / "clf.pkl")
+        if keep_reg:
+            _dump(reg, outdir / "reg.pkl")
+        # written last: the bundle must not be older than the pickles
+        features_cls = json.loads((outdir / "features_cls.json").read_text())
+        features_reg = (json.loads((outdir / "features_reg.json").read_text())
+                        if (outdir / "features_reg.json").exists() else features_cls)
+        report["version"] = save_bundle(outdir, clf, reg, enc_cls, enc_reg, features_cls, features_reg)
+
+        _save_delta(outdir, digest, delta)
+        log.append({"delta": digest, "applied": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    **{k: report[k] for k in ("rows", "iterations", "l2_regularization", "before", "after", "updated")}})
+        save_incremental_log(outdir, log)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Continue boosting saved models with newly arrived rows")
+    ap.add_argument("delta", nargs="+", help="parquet (or CSV) files of new labelled rows")
+    ap.add_argument("--extra-iter", type=int, default=MAX_EXTRA_ITER,
+                    help=f"most boosting iterations to add per model (default {MAX_EXTRA_ITER})")
+    ap.add_argument("--tolerance", type=float, default=0.0,
+                    help="largest holdout score drop still accepted (default 0)")
+    ap.add_argument("--country", action="append", help="only these countries (repeatable)")
+    ap.add_argument("--policy", action="append", help="only these policies (repeatable)")
+    ap.add_argument("--dry-run", action="store_true", help="report the metrics; write nothing")
+    args = ap.parse_args(argv)
+
+    delta = pd.concat([read_delta(p) for p in args.delta], ignore_index=True)
+    processed = ARTIFACTS.parent / "processed"
+    keys = sorted(set(zip(delta["country"].astype(str).str.lower(), delta["policytype"].astype(str).str.lower())))
+    for country, policy in keys:
+        if (policy not in POLICY_FEATURES or (args.country and country not in args.country)
+                or (args.policy and policy not in args.policy)):
+            continue
+        csv = processed / f"standardized_{country}.csv"
+        if not csv.exists():
+            print(f"⚠️  Skipping {country}-{policy}: {csv} not found")
+            continue
+        report = update_segment(country, policy, segment(load_dataset(csv), country, policy),
+                                segment(delta, country, policy), extra_iter=args.extra_iter,
+                                tolerance=args.tolerance, dry_run=args.dry_run)
+        print(json.dumps(report))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,23 +1,29 @@
 from __future__ import annotations
 
-import json
-import re
-from pathlib import Path
-from typing import Dict, List, Optional
+import copy
+import itertools
+import time
+from typing import Dict, List, Union
 
+import numpy as np
 import pandas as pd
 
-from .common import ARTIFACTS, load_artifacts, preprocess
+from .cache import PREDICTION_CACHE
+from .pricing import (
+    ENGINE,
+    PROPERTY_BASE_RATE,
+    TIER_MULTIPLIER,
+    TRAVEL_COVERAGE_MULTIPLIER,
+    VEHICLE_BASE_PREMIUM,
+    VEHICLE_DEPRECIATION,
+    propertyage_MULTIPLIER,
+    propertytype_MULTIPLIER,
+)
+from .registry import REGISTRY, get_bundle
+from .tree_eval import score_unique
 
 TIERS = ["Basic", "Standard", "Gold", "Premium"]
 
-TIER_MULTIPLIER = {
-    "Basic": 0.90,
-    "Standard": 1.00,
-    "Gold": 1.20,
-    "Premium": 1.45,
-}
-
 # Policy-specific required features (as used in training)
 POLICY_FEATURES: Dict[str, List[str]] = {
     "health": ["age", "sumassured", "smokerdrinker", "diseases", "country", "policytype"],
@@ -32,61 +38,10 @@ POLICY_FEATURES: Dict[str, List[str]] = {
 AUD_TO_INR = 55.0
 INR_TO_AUD = 1 / AUD_TO_INR
 
-# Vehicle IDV depreciation rates (based on vehicle age)
-VEHICLE_DEPRECIATION = {
-    0: 0.0,    # New vehicle
-    1: 0.15,   # 15% for 1st year
-    2: 0.25,   # 25% for 2nd year
-    3: 0.35,   # 35% for 3rd year
-    4: 0.45,   # 45% for 4th year
-    5: 0.50    # 50% for 5th year and beyond
-}
-
-# Base premium rates by vehicle type (percentage of IDV)
-VEHICLE_BASE_PREMIUM = {
-    "2wheeler": 0.02,     # 2% of IDV
-    "car": 0.03,         # 3% of IDV
-    "luxry": 0.035,        # 3.5% of IDV
-    "commercial": 0.04   # 4% of IDV
-}
-
-# Property insurance base rates and multipliers
-PROPERTY_BASE_RATE = 0.001  # 0.1% of property value
-propertyage_MULTIPLIER = {
-    0: 1.0,    # New property
-    5: 1.1,    # 5 years
-    10: 1.2,   # 10 years
-    15: 1.3,   # 15 years
-    20: 1.4,   # 20 years and above
-}
-
-propertytype_MULTIPLIER = {
-    "apartment": 1.0,
-    "house": 1.2,
-    "villa": 1.4,
-    "commercial": 1.5
-}
-
 def calculate_property_premium(value: float, age: int, propertytype: str, size: float) -> float:
     """Calculate annual premium for property insurance."""
     try:
-        # Get base premium
-        base_premium = value * PROPERTY_BASE_RATE
-        
-        # Apply age multiplier
-        age_multiplier = 1.0
-        for threshold_age, mult in sorted(propertyage_MULTIPLIER.items()):
-            if age >= threshold_age:
-                age_multiplier = mult
-        
-        # Apply property type multiplier
-        type_multiplier = propertytype_MULTIPLIER.get(propertytype.lower(), 1.2)
-        
-        # Apply size adjustment (additional 5% per 1000 sq ft over 1000)
-        size_multiplier = 1.0 + max(0, (size - 1000) / 1000) * 0.05
-        
-        final_premium = base_premium * age_multiplier * type_multiplier * size_multiplier
-        return round(final_premium, 2)
+        return ENGINE.property_one(value, age, propertytype, size)
     except Exception as e:
         print(f"Error calculating property premium: {str(e)}")
         return 0.0
@@ -97,72 +52,11 @@ def calculate_property_premium(value: float, age: int, propertytype: str, size:
 
 def calculate_vehicle_idv(price: float, age: int, vehicle_type: str) -> tuple[float, float]:
     """Calculate IDV and annual premium for a vehicle."""
-    # Get depreciation rate based on age
-    depreciation_rate = VEHICLE_DEPRECIATION.get(min(age, 5))
-    
-    # Calculate IDV
-    idv = price * (1 - depreciation_rate)
-    
-    # Get base premium rate based on vehicle type
-    base_rate = VEHICLE_BASE_PREMIUM.get(vehicle_type.lower(), 0.03)  # Default to car rate
-    
-    # Calculate annual premium
-    annual_premium = idv * base_rate
-    
-    return idv, annual_premium
-def _canon(s: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", s.lower())
-
-def _load_feature_list(path: Path, name: str) -> Optional[List[str]]:
-    p = path / name
-    if p.exists():
-        with open(p, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
-
-def _align_columns(X: pd.DataFrame, expected_cols: List[str]) -> pd.DataFrame:
-    print(f"Input columns: {X.columns.tolist()}")
-    print(f"Expected columns: {expected_cols}")
-    
-    can_to_expected = {_canon(c): c for c in expected_cols}
-    renames = {}
-    for col in X.columns:
-        c = _canon(col)
-        if c in can_to_expected:
-            renames[col] = can_to_expected[c]
-    
-    print(f"Column renames: {renames}")
-    X2 = X.rename(columns=renames).copy()
-    for col in expected_cols:
-        if col not in X2.columns:
-            X2[col] = pd.NA
-            print(f"Added missing column: {col}")
-    
-    final_cols = X2[expected_cols].columns.tolist()
-    print(f"Final columns: {final_cols}")
-    return X2[expected_cols]
-
-def _expected_features_from_encoder(enc, fallback: List[str]) -> List[str]:
-    if hasattr(enc, "feature_names_in_"):
-        return list(enc.feature_names_in_)
-    return fallback
-
-def _ensure_csv_schema(data_norm: dict) -> pd.DataFrame:
-    """Force input row to match the CSV schema exactly."""
-    row = {}
-    for col in CSV_FEATURES:
-        row[col] = data_norm.get(col, pd.NA)
-    return pd.DataFrame([row], dtype="object")
+    return ENGINE.vehicle_one(price, age, vehicle_type)
 
 # -------------------------
 # Currency conversion
 # -------------------------
-def _try_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return None
-
 def convert_output_for_country(country: str, premiums_in_inr: Dict[str, float]) -> Dict[str, float]:
     if country and country.upper() == "AUSTRALIA":
         return {t: round(v * INR_TO_AUD, 2) for t, v in premiums_in_inr.items()}
@@ -175,6 +69,159 @@ def predict(country: str, policy: str, data: dict) -> Dict:
     """
     Predict recommended tier + all-tier premiums.
     """
+    data_norm = _normalize_input(country, policy, data)
+
+    # Loaded once per process; reloaded by the registry when artifacts change
+    bundle = get_bundle(country, policy)
+
+    # profiles that encode to the same model inputs share one cached result
+    cache_key = _cache_key(bundle, data_norm)
+    cached = PREDICTION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # precomputed grid first (health/life); otherwise one predict_proba call
+    # for tier + confidence and one regressor call for all tiers (stacked
+    # when the regressor was trained with policytier)
+    scored = bundle.grid.lookup(data_norm) if bundle.grid is not None else None
+    if scored is not None:
+        result = _format_result(country, *scored)
+    elif _cascade().enabled:
+        classes, probs, premiums, decided = _score_rows_cascade(bundle, [data_norm])
+        result = _format_result(country, classes, probs[0], premiums[0], decided[0])
+    else:
+        result = _format_result(country, *_score_row(bundle, data_norm))
+
+    PREDICTION_CACHE.put(cache_key, result)
+    return result
+
+
+def predict_many(country: str, policy: str, items: List[dict]) -> List[Union[Dict, Exception]]:
+    """predict() for several profiles of one (country, policy) at once.
+
+    Returns one entry per item, in order: the prediction dict, or the
+    exception predict() would have raised for that item. Items that encode to
+    the same model inputs are scored once; cache and grid misses share one
+    classifier and one regressor call.
+    """
+    out: List[Union[Dict, Exception]] = [None] * len(items)
+    norms: Dict[int, dict] = {}
+    for i, data in enumerate(items):
+        try:
+            norms[i] = _normalize_input(country, policy, data)
+        except Exception as e:
+            out[i] = e
+    if not norms:
+        return out
+
+    try:
+        bundle = get_bundle(country, policy)
+    except Exception as e:
+        return [e if r is None else r for r in out]
+
+    # cache key -> item positions; only the first row per key is scored
+    pending: Dict[tuple, List[int]] = {}
+    for i, data_norm in norms.items():
+        key = _cache_key(bundle, data_norm)
+        if key in pending:
+            pending[key].append(i)
+            continue
+        cached = PREDICTION_CACHE.get(key)
+        if cached is not None:
+            out[i] = cached
+            continue
+        scored = bundle.grid.lookup(data_norm) if bundle.grid is not None else None
+        if scored is not None:
+            out[i] = _format_result(country, *scored)
+            PREDICTION_CACHE.put(key, out[i])
+        else:
+            pending[key] = [i]
+
+    if pending:
+        keys = list(pending)
+        rows = [norms[pending[k][0]] for k in keys]
+        if _cascade().enabled:
+            classes, probs, premiums, decided = _score_rows_cascade(bundle, rows)
+        else:
+            (classes, probs, premiums), decided = _score_rows(bundle, rows), [None] * len(rows)
+        for row, key in enumerate(keys):
+            result = _format_result(country, classes, probs[row], premiums[row], decided[row])
+            PREDICTION_CACHE.put(key, result)
+            for n, i in enumerate(pending[key]):
+                out[i] = result if n == 0 else copy.deepcopy(result)
+    return out
+
+
+def sweep_features(policy: str) -> List[str]:
+    """Input fields of ``policy`` that predict_sweep can vary."""
+    features = [f for f in POLICY_FEATURES[policy.lower()] if f not in ("country", "policytype")]
+    if policy.lower() == "house":
+        # predict() reads the size from the request field, not the model column
+        features = [f if f != "propertysize" else "propertysizesqfeet" for f in features]
+    return features
+
+
+def predict_sweep(country: str, policy: str, base: dict, axes: List[tuple]) -> Dict:
+    """Score ``base`` with one or two fields swept over the given values.
+
+    axes is a list of (field, values). Every combination is scored through
+    predict_many, so uncached variants share one classifier and one regressor
+    call. Curves are returned as lists (one axis) or nested lists indexed
+    [i][j] (two axes).
+    """
+    policytype = policy.lower()
+    if policytype not in POLICY_FEATURES:
+        raise ValueError(f"Unknown policy type: {policy}")
+    if not 1 <= len(axes) <= 2:
+        raise ValueError("Sweep one or two fields")
+    allowed = sweep_features(policytype)
+    names = [name for name, _ in axes]
+    for name in names:
+        if name not in allowed:
+            raise ValueError(f"Cannot sweep {name!r} for {policytype}; choose from {allowed}")
+    if len(set(names)) != len(names):
+        raise ValueError("Sweep axes must be different fields")
+    if any(len(values) == 0 for _, values in axes):
+        raise ValueError("Every sweep axis needs at least one value")
+
+    shape = [len(values) for _, values in axes]
+    variants = [dict(base, **dict(zip(names, combo))) for combo in itertools.product(*(v for _, v in axes))]
+    results = predict_many(country, policytype, variants)
+    for variant, result in zip(variants, results):
+        if isinstance(result, Exception):
+            raise ValueError(f"Could not score {dict(zip(names, (variant[n] for n in names)))}: {result}")
+
+    def curve(values):
+        return np.asarray(values, dtype=object).reshape(shape).tolist()
+
+    classes = list(results[0]["confidence"])
+    return {
+        "axes": [{"feature": name, "values": list(values)} for name, values in axes],
+        "recommended_tier": curve([r["recommended_tier"] for r in results]),
+        "confidence": {c: curve([r["confidence"][c] for r in results]) for c in classes},
+        "all_tiers": {t: curve([r["all_tiers"][t] for r in results]) for t in TIERS},
+    }
+
+
+def _format_result(country: str, classes, probs, premiums, decided_by_rules=None) -> Dict:
+    recommended_tier = classes[int(np.argmax(probs))]
+    confidence = {c: round(float(p), 4) for c, p in zip(classes, probs)}
+    all_tiers: Dict[str, float] = {t: round(float(v), 2) for t, v in zip(TIERS, premiums)}
+
+    all_tiers = convert_output_for_country(country, all_tiers)
+
+    result = {
+        "recommended_tier": recommended_tier,
+        "all_tiers": all_tiers,
+        "confidence": confidence,
+    }
+    if decided_by_rules is not None:
+        result["decided_by"] = "rules"
+    return result
+
+
+def _normalize_input(country: str, policy: str, data: dict) -> dict:
+    """Validate and normalize one raw profile into the model's feature dict."""
     print(f"Input data: {data}")
     print(f"Country: {country}, Policy: {policy}")
 
@@ -270,28 +317,13 @@ def predict(country: str, policy: str, data: dict) -> Dict:
                     "accidentcoverage": str(data.get("accidentcoverage", "Basic")).lower(),
                     "sumassured": float(data.get("sumassured", 0))  # Add sumassured as it's required
                 })
-                # Calculate base trip premium based on duration and coverages
-                duration = int(data.get("tripdurationdays", 0))
-                base_premium = duration * 100  # Base rate per day
-                
-                # Adjust premium based on coverages
-                coverage_multipliers = {
-                    "healthcoverage": {"basic": 1.0, "standard": 1.2, "gold": 1.5, "premium": 2.0},
-                    "baggagecoverage": {"basic": 1.0, "standard": 1.1, "gold": 1.3, "premium": 1.5},
-                    "accidentcoverage": {"basic": 1.0, "standard": 1.2, "gold": 1.4, "premium": 1.6}
-                }
-                
-                for coverage, multipliers in coverage_multipliers.items():
-                    level = str(data.get(coverage, "basic")).lower()
-                    base_premium *= multipliers.get(level, 1.0)
-                
-                # Additional premium for medical condition and trip cancellation
-                if str(data.get("existingmedicalcondition", "No")).lower() == "yes":
-                    base_premium *= 1.3
-                if str(data.get("tripcancellationcoverage", "No")).lower() == "yes":
-                    base_premium *= 1.2
-                    
-                data_norm["trippremium"] = base_premium
+                # Base daily rate adjusted by coverages, medical condition and cancellation
+                data_norm["trippremium"] = ENGINE.travel_one(
+                    int(data.get("tripdurationdays", 0)),
+                    {c: data.get(c, "basic") for c in TRAVEL_COVERAGE_MULTIPLIER},
+                    data.get("existingmedicalcondition", "No"),
+                    data.get("tripcancellationcoverage", "No"),
+                )
             except (ValueError, TypeError) as e:
                 print(f"Error processing travel insurance data: {str(e)}")
                 raise ValueError(f"Invalid travel insurance data: {str(e)}")
@@ -300,76 +332,247 @@ def predict(country: str, policy: str, data: dict) -> Dict:
         raise ValueError(f"Invalid data format: {str(e)}")
         
     print(f"Normalized data: {data_norm}")
-    data_norm = pd.DataFrame([data_norm])
-    print(f"Normalized data:\n{data_norm}")
 
-    # Load artifacts
-    path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-    clf = load_artifacts(path, "clf")
-    reg = load_artifacts(path, "reg")
-    enc_cls = load_artifacts(path, "encoder_cls")
-    enc_reg = load_artifacts(path, "encoder_reg")
+    # Verify all required features are present
+    missing_features = [f for f in required_features if f not in data_norm]
+    if missing_features:
+        raise ValueError(f"Missing required features for {policytype}: {missing_features}")
+    return data_norm
 
-    # Feature lists
-    features_cls = _load_feature_list(path, "features_cls.json") or []
-    features_reg = _load_feature_list(path, "features_reg.json") or features_cls
 
-    exp_cls = _expected_features_from_encoder(enc_cls, features_cls)
-    exp_reg = _expected_features_from_encoder(enc_reg, features_reg if features_reg else features_cls)
+def _cache_key(bundle, data_norm: dict) -> tuple:
+    """(country, policy, artifact version, encoded classifier row, encoded regressor row)."""
+    return (
+        bundle.country,
+        bundle.policy,
+        bundle.version,
+        bundle.row_cls.encode(data_norm).tobytes(),
+        bundle.row_reg.encode(data_norm).tobytes(),
+    )
 
-    # Make sure we have all required features for this policy type
-    features_needed = POLICY_FEATURES[policytype]
-    
-    # Add any missing columns with None values
-    for feat in features_needed:
-        if feat not in data_norm.columns:
-            data_norm[feat] = None
-            
-    # Use the features specific to this policy type
-    data_for_prediction = data_norm[features_needed]
-    print(f"\nFeatures for prediction:\n{data_for_prediction}")
-    
-    # Use policy-specific feature list for preprocessing
-    X_enc_cls, _ = preprocess(data_for_prediction, enc_cls, features_list=features_needed)
-    recommended_tier = clf.predict(X_enc_cls)[0]
 
-    confidence: Dict[str, float] = {}
-    if hasattr(clf, "predict_proba"):
-        probs = clf.predict_proba(X_enc_cls)[0]
-        classes = list(clf.classes_)
-        confidence = {c: round(float(p), 4) for c, p in zip(classes, probs)}
+def _drop_cached_predictions(country: str, policy: str, old_version: str, new_version: str) -> None:
+    dropped = PREDICTION_CACHE.invalidate(lambda key: key[:2] == (country, policy))
+    print(f"Dropped {dropped} cached predictions for {country}-{policy} ({old_version} -> {new_version})")
 
-    # Verify all required features are present
-    missing_features = [f for f in required_features if f not in data_norm]
-    if missing_features:
-        raise ValueError(f"Missing required features for {policytype}: {missing_features}")
 
-    # ---- Regressor
-    data_for_regression = data_norm[features_needed]
-    X_enc_reg, _ = preprocess(data_for_regression, enc_reg, features_list=features_needed)
-    all_tiers: Dict[str, float] = {}
-    reg_has_policy_tier = any(_canon(c) == "policytier" for c in exp_reg)
-
-    if reg_has_policy_tier:
-        tier_col = next(c for c in exp_reg if _canon(c) == "policytier")
-        for t in TIERS:
-            data_with_tier = data_for_regression.copy()
-            data_with_tier[tier_col] = t
-            X_enc_reg_t, _ = preprocess(data_with_tier, enc_reg, features_list=features_needed + [tier_col])
-            premium = float(reg.predict(X_enc_reg_t)[0])
-            all_tiers[t] = round(premium, 2)
-    else:
-        base = float(reg.predict(X_enc_reg)[0])
-        for t in TIERS:
-            all_tiers[t] = round(base * TIER_MULTIPLIER[t], 2)
+REGISTRY.add_reload_listener(_drop_cached_predictions)
 
-    all_tiers = convert_output_for_country(country, all_tiers)
+# -------------------------
+# Batch Prediction
+# -------------------------
+def _col(df: pd.DataFrame, name: str, default) -> pd.Series:
+    """Column by name, or a constant Series when the input doesn't have it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
 
-    return {
-        "recommended_tier": recommended_tier,
-        "all_tiers": all_tiers,
-        "confidence": confidence,
-    }
+
+def _num_col(df: pd.DataFrame, name: str, default: float) -> pd.Series:
+    return pd.to_numeric(_col(df, name, default), errors="coerce").fillna(default).astype(float)
+
+
+def _int_col(df: pd.DataFrame, name: str, default: int) -> pd.Series:
+    # int(x) truncates toward zero, same as the scalar path
+    return np.trunc(_num_col(df, name, default)).astype(np.int64)
+
+
+def _str_col(df: pd.DataFrame, name: str, default: str, lower: bool = True) -> pd.Series:
+    s = _col(df, name, default).astype(object)
+    s = s.where(s.notna(), default).astype(str)
+    return s.str.lower() if lower else s
+
+
+def _normalize_frame(country: str, policytype: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Column-wise equivalent of the per-dict normalization in predict().
+
+    Missing columns and missing values (None/NaN) both fall back to the same
+    defaults predict() uses for absent keys.
+    """
+    out = pd.DataFrame(index=df.index)
+    out["country"] = country.lower()
+    out["policytype"] = policytype
+    out["age"] = _num_col(df, "age", 0.0)
+
+    if policytype in ("health", "life"):
+        out["sumassured"] = _num_col(df, "sumassured", 0.0)
+        out["smokerdrinker"] = _str_col(df, "smokerdrinker", "No")
+        if "diseases" in df.columns:
+            out["diseases"] = _str_col(df, "diseases", "", lower=False)
+        else:
+            out["diseases"] = _str_col(df, "numdiseases", "0", lower=False)
+    elif policytype == "vehicle":
+        price = _num_col(df, "priceofvehicle", 0.0)
+        vage = _int_col(df, "ageofvehicle", 0)
+        vtype = _str_col(df, "typeofvehicle", "car")
+        vtype = vtype.where(vtype.isin(["2wheeler", "car", "luxury", "commercial"]), "car")
+
+        idv, annual_premium = ENGINE.vehicle(price.to_numpy(), vage.to_numpy(), vtype.to_numpy())
+
+        out["priceofvehicle"] = price
+        out["ageofvehicle"] = vage
+        out["typeofvehicle"] = vtype
+        out["sumassured"] = idv
+        out["annualpremium"] = annual_premium
+    elif policytype == "house":
+        value = _num_col(df, "propertyvalue", 0.0)
+        page = _int_col(df, "propertyage", 0)
+        ptype = _str_col(df, "propertytype", "house")
+        size = _num_col(df, "propertysizesqfeet", 1000.0)
+
+        out["propertyvalue"] = value
+        out["propertyage"] = page
+        out["propertytype"] = ptype
+        out["propertysize"] = size
+        out["sumassured"] = value
+        out["annualpremium"] = ENGINE.property(value.to_numpy(), page.to_numpy(), ptype.to_numpy(), size.to_numpy())
+    elif policytype == "travel":
+        duration = _int_col(df, "tripdurationdays", 0)
+        out["destinationcountry"] = _str_col(df, "destinationcountry", "", lower=False)
+        out["tripdurationdays"] = duration
+        out["existingmedicalcondition"] = _str_col(df, "existingmedicalcondition", "No")
+        out["healthcoverage"] = _str_col(df, "healthcoverage", "Basic")
+        out["baggagecoverage"] = _str_col(df, "baggagecoverage", "Basic")
+        out["tripcancellationcoverage"] = _str_col(df, "tripcancellationcoverage", "No")
+        out["accidentcoverage"] = _str_col(df, "accidentcoverage", "Basic")
+        out["sumassured"] = _num_col(df, "sumassured", 0.0)
+
+        out["trippremium"] = ENGINE.travel(
+            duration.to_numpy(),
+            {c: out[c].to_numpy() for c in TRAVEL_COVERAGE_MULTIPLIER},
+            out["existingmedicalcondition"].to_numpy(),
+            out["tripcancellationcoverage"].to_numpy(),
+        )
+
+    for feature in POLICY_FEATURES[policytype]:
+        if feature not in out.columns:
+            out[feature] = None
+    return out
+
+
+def _score_row(bundle, data_norm: dict):
+    """Single-row counterpart of _score_frame using the compiled encoders.
+
+    Returns (classes, probabilities[k], premiums[len(TIERS)]).
+    """
+    classes, probs, premiums = _score_rows(bundle, [data_norm])
+    return classes, probs[0], premiums[0]
+
+
+def _score_rows(bundle, rows: List[dict]):
+    """Score normalized feature dicts with one classifier and one regressor call.
+
+    Returns (classes, probabilities[n, k], premiums[n, len(TIERS)]).
+    """
+    probs = score_unique(bundle.clf, bundle.row_cls.encode_many(rows), "predict_proba")
+    return list(bundle.clf.classes_), probs, _regress_rows(bundle, rows)
+
+
+def _cascade():
+    # imported here so ``python -m scripts.recommendation.cascade`` runs cleanly
+    from .cascade import CASCADE
+    return CASCADE
+
+
+def _score_rows_cascade(bundle, rows: List[dict]):
+    """_score_rows where trusted rule branches stand in for the classifier.
+
+    Returns (classes, probabilities[n, k], premiums[n, len(TIERS)], decided)
+    with decided[i] the rule's class label for rows the classifier skipped
+    (their probabilities are one-hot) and None for the others.
+    """
+    cascade = _cascade()
+    classes = list(bundle.clf.classes_)
+    decided = cascade.decide(bundle, rows)
+    probs = np.zeros((len(rows), len(classes)))
+    todo = [i for i, label in enumerate(decided) if label is None]
+    for i, label in enumerate(decided):
+        if label is not None:
+            probs[i, classes.index(label)] = 1.0
+    if todo:
+        started = time.perf_counter()
+        probs[todo] = score_unique(bundle.clf, bundle.row_cls.encode_many([rows[i] for i in todo]), "predict_proba")
+        cascade.record_model(bundle, len(todo), time.perf_counter() - started)
+    return classes, probs, _regress_rows(bundle, rows), decided
+
+
+def _regress_rows(bundle, rows: List[dict]) -> np.ndarray:
+    """Premiums[n, len(TIERS)] (unrounded, INR) from one regressor call."""
+    if bundle.reg_tier_col is not None:
+        stacked = [{**r, bundle.reg_tier_col: t} for r in rows for t in TIERS]
+        return score_unique(bundle.reg, bundle.row_reg.encode_many(stacked)).reshape(len(rows), len(TIERS))
+    base = score_unique(bundle.reg, bundle.row_reg.encode_many(rows))
+    return base[:, None] * np.array([TIER_MULTIPLIER[t] for t in TIERS])
+
+
+def _score_frame_parts(bundle, X: pd.DataFrame):
+    """Model outputs for every row of X, before tier multipliers are applied.
+
+    Returns (classes, probabilities[n, k], tier_premiums, base): a regressor
+    trained with the tier as a feature fills tier_premiums[n, len(TIERS)],
+    otherwise base[n] is the premium that TIER_MULTIPLIER scales. The other
+    one is None. Premiums are unrounded and in INR.
+    """
+    features_needed = POLICY_FEATURES[bundle.policy]
+    X = X[features_needed]
+
+    # rows routed identically by every tree are scored once
+    probs = score_unique(bundle.clf, bundle.row_cls.encode_frame(X), "predict_proba")
+    classes = list(bundle.clf.classes_)
+
+    tier_col = bundle.reg_tier_col
+    if tier_col is not None:
+        # stack every row once per tier and score them in a single call
+        stacked = X.loc[X.index.repeat(len(TIERS))].copy()
+        stacked[tier_col] = np.tile(TIERS, len(X))
+        premiums = score_unique(bundle.reg, bundle.row_reg.encode_frame(stacked)).reshape(len(X), len(TIERS))
+        return classes, probs, premiums, None
+    return classes, probs, None, score_unique(bundle.reg, bundle.row_reg.encode_frame(X))
+
+
+def _score_frame(bundle, X: pd.DataFrame):
+    """One predict_proba and one regressor call for every row of X.
+
+    Returns (classes, probabilities[n, k], premiums[n, len(TIERS)]) with
+    premiums unrounded and in INR.
+    """
+    classes, probs, premiums, base = _score_frame_parts(bundle, X)
+    if premiums is None:
+        premiums = np.outer(base, [TIER_MULTIPLIER[t] for t in TIERS])
+    return classes, probs, premiums
+
+
+def predict_batch(country: str, policy: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized predict() for many profiles of one (country, policy).
+
+    Returns a frame aligned to df.index with recommended_tier,
+    confidence_<class> and premium_<Tier> columns.
+    """
+    policytype = policy.lower()
+    if policytype not in POLICY_FEATURES:
+        raise ValueError(f"Unknown policy type: {policy}")
+
+    bundle = get_bundle(country, policytype)
+    if df.empty:
+        columns = (["recommended_tier"] + [f"confidence_{c}" for c in bundle.clf.classes_]
+                   + [f"premium_{t}" for t in TIERS])
+        return pd.DataFrame(columns=columns, index=df.index)
+
+    X = _normalize_frame(country, policytype, df)
+    classes, probs, premiums = _score_frame(bundle, X)
+
+    premiums = np.round(premiums, 2)
+    if country and country.upper() == "AUSTRALIA":
+        premiums = np.round(premiums * INR_TO_AUD, 2)
+
+    out = pd.DataFrame(index=df.index)
+    out["recommended_tier"] = np.asarray(classes, dtype=object)[probs.argmax(axis=1)]
+    for j, c in enumerate(classes):
+        out[f"confidence_{c}"] = np.round(probs[:, j], 4)
+    for j, t in enumerate(TIERS):
+        out[f"premium_{t}"] = premiums[:, j]
+    return out
 
 def predict_probability(data: dict, country: str, policy: str) -> pd.DataFrame:
     """Get probability prediction for a single row."""
@@ -390,12 +593,11 @@ def predict_probability(data: dict, country: str, policy: str) -> pd.DataFrame:
         print(f"Normalized data:\n{data_norm}")
         
         # Load classifier model and encoder
-        path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-        clf = load_artifacts(path, "clf")
-        enc = load_artifacts(path, "encoder_cls")
+        bundle = get_bundle(country, policy)
+        clf = bundle.clf
         
         # Preprocess data
-        X_enc, _ = preprocess(data_norm, enc)
+        X_enc = bundle.row_cls.encode_frame(data_norm)
         print(f"Preprocessed data shape: {X_enc.shape}")
         
         # Get probabilities
@@ -427,12 +629,11 @@ def predict_amount(data: dict, country: str, policy: str) -> pd.DataFrame:
         print(f"Normalized data:\n{data_norm}")
         
         # Load regression model and encoder
-        path = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-        reg = load_artifacts(path, "reg")
-        enc = load_artifacts(path, "encoder_reg")
+        bundle = get_bundle(country, policy)
+        reg = bundle.reg
         
         # Preprocess data
-        X_enc, _ = preprocess(data_norm, enc)
+        X_enc = bundle.row_reg.encode_frame(data_norm)
         print(f"Preprocessed data shape: {X_enc.shape}")
         
         # Get prediction
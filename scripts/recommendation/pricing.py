@@ -0,0 +1,194 @@
+# scripts/recommendation/pricing.py
+"""Deterministic premium formulas for vehicle, house and travel policies.
+
+The tariff tables live here as plain dicts (the names predict.py has always
+exported). ``PremiumEngine`` compiles a ``Tariff`` into sorted slab arrays and
+lookup tables once, then prices whole NumPy arrays with ``np.searchsorted``
+and array indexing. The ``*_one`` methods are the scalar fast path used for
+single requests; both paths multiply in the same order so they agree exactly
+(property premiums round with ``round`` vs ``np.round``, which can differ by
+one cent on exact half-cent ties).
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .common import TIERS
+
+TIER_MULTIPLIER = {
+    "Basic": 0.90,
+    "Standard": 1.00,
+    "Gold": 1.20,
+    "Premium": 1.45,
+}
+
+# Vehicle IDV depreciation rates (based on vehicle age)
+VEHICLE_DEPRECIATION = {
+    0: 0.0,    # New vehicle
+    1: 0.15,   # 15% for 1st year
+    2: 0.25,   # 25% for 2nd year
+    3: 0.35,   # 35% for 3rd year
+    4: 0.45,   # 45% for 4th year
+    5: 0.50    # 50% for 5th year and beyond
+}
+
+# Base premium rates by vehicle type (percentage of IDV)
+VEHICLE_BASE_PREMIUM = {
+    "2wheeler": 0.02,     # 2% of IDV
+    "car": 0.03,         # 3% of IDV
+    "luxry": 0.035,        # 3.5% of IDV
+    "commercial": 0.04   # 4% of IDV
+}
+
+# Property insurance base rates and multipliers
+PROPERTY_BASE_RATE = 0.001  # 0.1% of property value
+propertyage_MULTIPLIER = {
+    0: 1.0,    # New property
+    5: 1.1,    # 5 years
+    10: 1.2,   # 10 years
+    15: 1.3,   # 15 years
+    20: 1.4,   # 20 years and above
+}
+
+propertytype_MULTIPLIER = {
+    "apartment": 1.0,
+    "house": 1.2,
+    "villa": 1.4,
+    "commercial": 1.5
+}
+
+# Travel premium multipliers per coverage level
+TRAVEL_COVERAGE_MULTIPLIER = {
+    "healthcoverage": {"basic": 1.0, "standard": 1.2, "gold": 1.5, "premium": 2.0},
+    "baggagecoverage": {"basic": 1.0, "standard": 1.1, "gold": 1.3, "premium": 1.5},
+    "accidentcoverage": {"basic": 1.0, "standard": 1.2, "gold": 1.4, "premium": 1.6}
+}
+
+
+@dataclass(frozen=True)
+class Tariff:
+    """One complete set of pricing constants."""
+    tier_multiplier: Dict[str, float] = field(default_factory=lambda: dict(TIER_MULTIPLIER))
+    vehicle_depreciation: Dict[int, float] = field(default_factory=lambda: dict(VEHICLE_DEPRECIATION))
+    vehicle_base_premium: Dict[str, float] = field(default_factory=lambda: dict(VEHICLE_BASE_PREMIUM))
+    vehicle_default_rate: float = 0.03          # unknown types are priced as cars
+    property_base_rate: float = PROPERTY_BASE_RATE
+    property_age_multiplier: Dict[int, float] = field(default_factory=lambda: dict(propertyage_MULTIPLIER))
+    property_type_multiplier: Dict[str, float] = field(default_factory=lambda: dict(propertytype_MULTIPLIER))
+    property_default_type_multiplier: float = 1.2
+    property_size_step: float = 1000.0          # +5% per 1000 sq ft over 1000
+    property_size_loading: float = 0.05
+    travel_daily_rate: float = 100.0
+    travel_coverage_multiplier: Dict[str, Dict[str, float]] = field(
+        default_factory=lambda: {k: dict(v) for k, v in TRAVEL_COVERAGE_MULTIPLIER.items()})
+    travel_medical_multiplier: float = 1.3
+    travel_cancellation_multiplier: float = 1.2
+
+    def with_changes(self, **changes) -> "Tariff":
+        return replace(self, **changes)
+
+
+def _lookup(values, table: Dict[str, float], default: float) -> np.ndarray:
+    """Vectorized ``table.get(str(v).lower(), default)`` over an array of labels."""
+    values = np.asarray(values, dtype=object)
+    if values.size == 0:
+        return np.zeros(values.shape)
+    uniq, inverse = np.unique(values.astype(str), return_inverse=True)
+    mult = np.array([table.get(u.lower(), default) for u in uniq], dtype=float)
+    return mult[inverse].reshape(values.shape)
+
+
+class PremiumEngine:
+    """A Tariff compiled into slab arrays for vectorized and scalar pricing."""
+
+    def __init__(self, tariff: Tariff = None):
+        self.tariff = tariff = tariff or Tariff()
+
+        # sorted slab thresholds; lists for the scalar path, arrays for NumPy
+        self._dep_ages = sorted(tariff.vehicle_depreciation)
+        self._dep_values = [tariff.vehicle_depreciation[a] for a in self._dep_ages]
+        self._dep_slabs = np.array(self._dep_ages, dtype=float)
+        self._dep_rates = np.array(self._dep_values, dtype=float)
+
+        self._prop_ages = sorted(tariff.property_age_multiplier)
+        self._prop_values = [tariff.property_age_multiplier[a] for a in self._prop_ages]
+        self._prop_slabs = np.array(self._prop_ages, dtype=float)
+        self._prop_mults = np.array(self._prop_values, dtype=float)
+
+        self.tier_multipliers = np.array([tariff.tier_multiplier[t] for t in TIERS], dtype=float)
+
+    # ---------------------
+    # Vehicle
+    # ---------------------
+    def vehicle(self, price, age, vehicle_type) -> Tuple[np.ndarray, np.ndarray]:
+        """IDV and annual premium for arrays of vehicles."""
+        price = np.asarray(price, dtype=float)
+        # slab = last threshold <= age; ages below the first slab use the first
+        idx = np.searchsorted(self._dep_slabs, np.asarray(age, dtype=float), side="right") - 1
+        depreciation = self._dep_rates[np.clip(idx, 0, None)]
+        idv = price * (1 - depreciation)
+        rate = _lookup(vehicle_type, self.tariff.vehicle_base_premium, self.tariff.vehicle_default_rate)
+        return idv, idv * rate
+
+    def vehicle_one(self, price: float, age: int, vehicle_type: str) -> Tuple[float, float]:
+        idx = max(bisect_right(self._dep_ages, age) - 1, 0)
+        idv = price * (1 - self._dep_values[idx])
+        rate = self.tariff.vehicle_base_premium.get(str(vehicle_type).lower(), self.tariff.vehicle_default_rate)
+        return idv, idv * rate
+
+    # ---------------------
+    # Property
+    # ---------------------
+    def property(self, value, age, propertytype, size) -> np.ndarray:
+        """Annual premium (rounded to cents) for arrays of properties."""
+        t = self.tariff
+        value = np.asarray(value, dtype=float)
+        size = np.asarray(size, dtype=float)
+        idx = np.searchsorted(self._prop_slabs, np.asarray(age, dtype=float), side="right") - 1
+        age_mult = np.where(idx >= 0, self._prop_mults[np.clip(idx, 0, None)], 1.0)
+        type_mult = _lookup(propertytype, t.property_type_multiplier, t.property_default_type_multiplier)
+        size_mult = 1.0 + np.maximum(0, (size - t.property_size_step) / t.property_size_step) * t.property_size_loading
+        return np.round(value * t.property_base_rate * age_mult * type_mult * size_mult, 2)
+
+    def property_one(self, value: float, age: int, propertytype: str, size: float) -> float:
+        t = self.tariff
+        idx = bisect_right(self._prop_ages, age) - 1
+        age_mult = self._prop_values[idx] if idx >= 0 else 1.0
+        type_mult = t.property_type_multiplier.get(propertytype.lower(), t.property_default_type_multiplier)
+        size_mult = 1.0 + max(0, (size - t.property_size_step) / t.property_size_step) * t.property_size_loading
+        return round(value * t.property_base_rate * age_mult * type_mult * size_mult, 2)
+
+    # ---------------------
+    # Travel
+    # ---------------------
+    def travel(self, duration, coverages: Dict[str, np.ndarray], medical, cancellation) -> np.ndarray:
+        """Trip premium for arrays of trips.
+
+        coverages maps each key of ``travel_coverage_multiplier`` to an array
+        of levels; medical / cancellation are "yes"/"no" arrays.
+        """
+        t = self.tariff
+        premium = np.asarray(duration, dtype=float) * t.travel_daily_rate
+        for coverage, multipliers in t.travel_coverage_multiplier.items():
+            premium = premium * _lookup(coverages.get(coverage, "basic"), multipliers, 1.0)
+        medical = _lookup(medical, {"yes": t.travel_medical_multiplier}, 1.0)
+        cancellation = _lookup(cancellation, {"yes": t.travel_cancellation_multiplier}, 1.0)
+        return premium * medical * cancellation
+
+    def travel_one(self, duration: int, coverages: Dict[str, str], medical: str, cancellation: str) -> float:
+        t = self.tariff
+        premium = duration * t.travel_daily_rate
+        for coverage, multipliers in t.travel_coverage_multiplier.items():
+            premium *= multipliers.get(str(coverages.get(coverage, "basic")).lower(), 1.0)
+        if str(medical).lower() == "yes":
+            premium *= t.travel_medical_multiplier
+        if str(cancellation).lower() == "yes":
+            premium *= t.travel_cancellation_multiplier
+        return premium
+
+
+ENGINE = PremiumEngine()
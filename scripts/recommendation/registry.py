@@ -0,0 +1,274 @@
+# scripts/recommendation/registry.py
+"""In-process registry of loaded (country, policy) model bundles.
+
+Each artifact directory (``artifacts/<country>_<policy>/``) is loaded once and
+handed out as an immutable :class:`ModelBundle`. The registry re-stats the
+directory at most every ``check_interval`` seconds and, if any file changed,
+builds a fresh bundle and swaps it in. Callers holding the old bundle keep
+using it until they ask again, so a reload never exposes a half-loaded model.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .bundle import BUNDLE_NAME, read_bundle
+from .common import ARTIFACTS, RowEncoder, compile_encoder, load_artifacts, load_feature_list
+from .tree_eval import FlatTreeModel
+
+if TYPE_CHECKING:
+    from .grid import ScoreGrid
+
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Everything predict() needs for one (country, policy).
+
+    enc_cls / enc_reg are the fitted sklearn encoders when loaded from pickles
+    and None when loaded from model.bundle; scoring only uses row_cls / row_reg.
+    grid is the precomputed ScoreGrid when the directory has a current one.
+    """
+    country: str
+    policy: str
+    version: str
+    clf: Any
+    reg: Any
+    enc_cls: Any
+    enc_reg: Any
+    features_cls: Tuple[str, ...]
+    features_reg: Tuple[str, ...]
+    row_cls: RowEncoder
+    row_reg: RowEncoder
+    reg_tier_col: Optional[str] = None
+    grid: Optional["ScoreGrid"] = None
+
+
+def _fingerprint(path: Path) -> Fingerprint:
+    """(name, mtime_ns, size) for every file in the artifact directory."""
+    if not path.is_dir():
+        raise FileNotFoundError(f"Artifacts not found: {path}")
+    entries = []
+    for p in sorted(path.iterdir()):
+        if p.is_file():
+            st = p.stat()
+            entries.append((p.name, st.st_mtime_ns, st.st_size))
+    return tuple(entries)
+
+
+def _version(fp: Fingerprint) -> str:
+    return hashlib.sha1(repr(fp).encode("utf-8")).hexdigest()[:12]
+
+
+def _tier_name(names) -> Optional[str]:
+    for c in names:
+        if re.sub(r"[^a-z0-9]", "", str(c).lower()) == "policytier":
+            return str(c)
+    return None
+
+
+def _bundle_is_current(path: Path) -> bool:
+    """True when the bundle file exists and is at least as new as clf.pkl."""
+    bundle, pkl = path / BUNDLE_NAME, path / "clf.pkl"
+    if not bundle.exists():
+        return False
+    return not pkl.exists() or bundle.stat().st_mtime_ns >= pkl.stat().st_mtime_ns
+
+
+def _with_tier_column(features, tier_col: Optional[str]):
+    features = list(features)
+    if tier_col is not None and tier_col not in features:
+        features.append(tier_col)
+    return features
+
+
+def _load_from_bundle_file(path: Path, country: str, policy: str) -> ModelBundle:
+    """Memory-map model.bundle; arrays stay backed by the shared page cache."""
+    header, arrays = read_bundle(path / BUNDLE_NAME)
+    meta = header["meta"]
+
+    def _group(prefix: str) -> Dict[str, Any]:
+        n = len(prefix) + 1
+        return {k[n:]: v for k, v in arrays.items() if k.startswith(prefix + "/")}
+
+    enc_cls_features = meta["enc_cls_features"]
+    enc_reg_features = meta["enc_reg_features"]
+    cls_categories = [arrays[f"enc_cls/{i}"] for i in range(len(enc_cls_features))]
+    reg_categories = [arrays[f"enc_reg/{i}"] for i in range(len(enc_reg_features))]
+    features_cls = arrays["features_cls"].tolist()
+    features_reg = arrays["features_reg"].tolist() or features_cls
+
+    reg_tier_col = _tier_name(enc_reg_features)
+    return ModelBundle(
+        country=country,
+        policy=policy,
+        version=header["version"],
+        clf=FlatTreeModel(_group("clf")),
+        reg=FlatTreeModel(_group("reg")),
+        enc_cls=None,
+        enc_reg=None,
+        features_cls=tuple(features_cls),
+        features_reg=tuple(features_reg),
+        row_cls=RowEncoder(features_cls, enc_cls_features, cls_categories),
+        row_reg=RowEncoder(_with_tier_column(features_reg, reg_tier_col), enc_reg_features, reg_categories),
+        reg_tier_col=reg_tier_col,
+        grid=_load_grid(path),
+    )
+
+
+def _load_grid(path: Path) -> Optional["ScoreGrid"]:
+    # imported here so ``python -m scripts.recommendation.grid`` runs cleanly
+    from .grid import load_grid
+    return load_grid(path)
+
+
+def load_bundle(path: Path, country: str, policy: str, fp: Optional[Fingerprint] = None,
+                prefer_flat: bool = True) -> ModelBundle:
+    """Load one artifact directory from disk into a ModelBundle.
+
+    Uses the memory-mapped model.bundle when it is current, otherwise (or with
+    prefer_flat=False) the sklearn pickles.
+    """
+    if prefer_flat and _bundle_is_current(path):
+        return _load_from_bundle_file(path, country, policy)
+
+    fp = fp if fp is not None else _fingerprint(path)
+    features_cls = load_feature_list(path, "features_cls.json") or []
+    features_reg = load_feature_list(path, "features_reg.json") or features_cls
+    enc_cls = load_artifacts(path, "encoder_cls")
+    enc_reg = load_artifacts(path, "encoder_reg")
+
+    # a regressor trained with the tier as a feature is scored once per tier
+    reg_tier_col = _tier_name(getattr(enc_reg, "feature_names_in_", []))
+
+    return ModelBundle(
+        country=country,
+        policy=policy,
+        version=_version(fp),
+        clf=load_artifacts(path, "clf"),
+        reg=load_artifacts(path, "reg"),
+        enc_cls=enc_cls,
+        enc_reg=enc_reg,
+        features_cls=tuple(features_cls),
+        features_reg=tuple(features_reg),
+        row_cls=compile_encoder(enc_cls, features_cls),
+        row_reg=compile_encoder(enc_reg, _with_tier_column(features_reg, reg_tier_col)),
+        reg_tier_col=reg_tier_col,
+        grid=_load_grid(path),
+    )
+
+
+class ModelRegistry:
+    """Thread-safe cache of ModelBundles keyed by (country, policy)."""
+
+    def __init__(self, root: Path = ARTIFACTS, check_interval: float = 5.0, prefer_flat: bool = True):
+        self.root = Path(root)
+        self.check_interval = check_interval
+        # flat trees win on single rows; batch jobs may prefer sklearn's pickles
+        self.prefer_flat = prefer_flat
+        self._bundles: Dict[Tuple[str, str], ModelBundle] = {}
+        self._fingerprints: Dict[Tuple[str, str], Fingerprint] = {}
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._reload_listeners: List[Callable[[str, str, str, str], None]] = []
+
+    def _lock_for(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def add_reload_listener(self, listener: Callable[[str, str, str, str], None]) -> None:
+        """Call ``listener(country, policy, old_version, new_version)`` after every reload."""
+        self._reload_listeners.append(listener)
+
+    def _notify_reload(self, key: Tuple[str, str], old: ModelBundle, new: ModelBundle) -> None:
+        for listener in list(self._reload_listeners):
+            try:
+                listener(key[0], key[1], old.version, new.version)
+            except Exception as e:
+                print(f"Reload listener failed for {key[0]}-{key[1]}: {e}")
+
+    def path_for(self, country: str, policy: str) -> Path:
+        return self.root / f"{country.lower()}_{policy.lower()}"
+
+    def get(self, country: str, policy: str) -> ModelBundle:
+        """Return the current bundle, loading or reloading it if needed."""
+        key = (country.lower(), policy.lower())
+        bundle = self._bundles.get(key)
+        now = time.monotonic()
+        if bundle is not None and now - self._checked_at.get(key, 0.0) < self.check_interval:
+            return bundle
+
+        with self._lock_for(key):
+            # another thread may have (re)loaded while we waited
+            bundle = self._bundles.get(key)
+            if bundle is not None and now - self._checked_at.get(key, 0.0) < self.check_interval:
+                return bundle
+
+            path = self.path_for(*key)
+            fp = _fingerprint(path)
+            if bundle is None or fp != self._fingerprints.get(key):
+                if bundle is not None:
+                    print(f"Reloading artifacts for {key[0]}-{key[1]} from {path}")
+                try:
+                    fresh, fp = self._load_stable(path, key, fp)
+                except Exception as e:
+                    # a retrain may be mid-write; keep serving the old bundle
+                    if bundle is None:
+                        raise
+                    print(f"Reload of {path} failed, keeping version {bundle.version}: {e}")
+                else:
+                    previous, bundle = bundle, fresh
+                    self._bundles[key] = bundle
+                    self._fingerprints[key] = fp
+                    if previous is not None:
+                        self._notify_reload(key, previous, bundle)
+            self._checked_at[key] = time.monotonic()
+            return bundle
+
+    def _load_stable(self, path: Path, key: Tuple[str, str], fp: Fingerprint,
+                     attempts: int = 3) -> Tuple[ModelBundle, Fingerprint]:
+        """Load until the directory fingerprint is the same before and after."""
+        for _ in range(attempts):
+            bundle = load_bundle(path, key[0], key[1], fp, self.prefer_flat)
+            after = _fingerprint(path)
+            if after == fp:
+                return bundle, fp
+            fp = after
+        raise RuntimeError(f"Artifacts in {path} kept changing while loading")
+
+    def preload(self) -> None:
+        """Load every artifact directory under the root up front."""
+        if not self.root.is_dir():
+            return
+        for p in sorted(self.root.iterdir()):
+            if p.is_dir() and "_" in p.name and ((p / "clf.pkl").exists() or (p / BUNDLE_NAME).exists()):
+                country, policy = p.name.split("_", 1)
+                self.get(country, policy)
+
+    def loaded(self) -> List[ModelBundle]:
+        """Bundles currently held, without checking for changes on disk."""
+        return list(self._bundles.values())
+
+    def clear(self) -> None:
+        with self._guard:
+            self._bundles.clear()
+            self._fingerprints.clear()
+            self._checked_at.clear()
+
+
+REGISTRY = ModelRegistry()
+
+
+def get_bundle(country: str, policy: str) -> ModelBundle:
+    """Shortcut for ``REGISTRY.get`` used by the predict path."""
+    return REGISTRY.get(country, policy)
@@ -0,0 +1,225 @@
+# scripts/recommendation/repricing.py
+"""Book-wide what-if for tariff changes.
+
+``PortfolioSimulator`` loads a policy book once and scores it once. The
+classifier output and the regressor's base premium do not depend on the
+pricing constants, so they are cached as arrays. ``simulate`` then applies a
+proposed ``Tariff`` and recomputes only the columns the changed fields feed:
+
+* ``tier_multiplier`` -> quoted premiums (regressor base x multiplier of the
+  recommended tier, as predict() returns them);
+* ``vehicle_*`` / ``property_*`` / ``travel_*`` -> the formula premium of
+  vehicle / house / travel rows (in the book's own units).
+
+The result is aggregated by country, policy type and recommended tier,
+before vs after.
+
+Usage::
+
+    python -m scripts.recommendation.repricing changes.json
+
+where changes.json holds Tariff fields, e.g. ``{"tier_multiplier": {"Gold": 1.25}}``.
+Dict-valued fields are merged into the current values.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .predict import INR_TO_AUD, POLICY_FEATURES, TIERS, _normalize_frame, _score_frame_parts
+from .pricing import TRAVEL_COVERAGE_MULTIPLIER, PremiumEngine, Tariff
+from .registry import REGISTRY, get_bundle
+from .score_book import standardize_columns
+
+TIER_INDEX = {t.lower(): i for i, t in enumerate(TIERS)}
+
+# Tariff field prefix -> policy whose formula premium it feeds
+FORMULA_POLICY = {"vehicle_": "vehicle", "property_": "house", "travel_": "travel"}
+
+
+@dataclass
+class _Segment:
+    """Cached model outputs and tariff inputs for one (country, policy)."""
+    country: str
+    policy: str
+    tier: np.ndarray                      # index into TIERS of the recommended tier
+    base: Optional[np.ndarray]            # regressor premium scaled by TIER_MULTIPLIER
+    fixed: Optional[np.ndarray]           # quoted premium when the regressor sees the tier
+    inputs: Dict[str, np.ndarray]
+
+
+def _merge(current, change):
+    if isinstance(current, dict) and isinstance(change, dict):
+        return {**current, **{k: _merge(current.get(k), v) for k, v in change.items()}}
+    return change
+
+
+def _affected(old: Tariff, new: Tariff) -> set:
+    """Outputs ("premium" or a policy's formula) that depend on a changed field."""
+    out = set()
+    for f in fields(Tariff):
+        if getattr(old, f.name) == getattr(new, f.name):
+            continue
+        if f.name == "tier_multiplier":
+            out.add("premium")
+        out.update(p for prefix, p in FORMULA_POLICY.items() if f.name.startswith(prefix))
+    return out
+
+
+class PortfolioSimulator:
+    """A scored book that can be repriced under proposed tariffs."""
+
+    def __init__(self, book: pd.DataFrame, tariff: Optional[Tariff] = None):
+        self.tariff = tariff or Tariff()
+        self.segments: List[_Segment] = []
+        self.skipped = 0
+
+        df = standardize_columns(book.copy())
+        country = df["country"].astype(str).str.strip().str.lower()
+        policy = df["policytype"].astype(str).str.strip().str.lower()
+        for (c, p), idx in df.groupby([country, policy], sort=True).groups.items():
+            if p not in POLICY_FEATURES or not REGISTRY.path_for(c, p).is_dir():
+                self.skipped += len(idx)
+                continue
+            X = _normalize_frame(c, p, df.loc[idx])
+            classes, probs, fixed, base = _score_frame_parts(get_bundle(c, p), X)
+            tier = np.array([TIER_INDEX[str(k).lower()] for k in classes])[probs.argmax(axis=1)]
+            if fixed is not None:
+                fixed = fixed[np.arange(len(tier)), tier]
+            self.segments.append(_Segment(c, p, tier, base, fixed, self._inputs(p, X)))
+
+        self._baseline = self._evaluate(self.tariff)
+
+    @staticmethod
+    def _inputs(policy: str, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+        cols = {
+            "vehicle": ("priceofvehicle", "ageofvehicle", "typeofvehicle"),
+            "house": ("propertyvalue", "propertyage", "propertytype", "propertysize"),
+            "travel": ("tripdurationdays", "existingmedicalcondition", "tripcancellationcoverage",
+                       *TRAVEL_COVERAGE_MULTIPLIER),
+        }.get(policy, ())
+        return {c: X[c].to_numpy() for c in cols}
+
+    def __len__(self) -> int:
+        return sum(len(s.tier) for s in self.segments)
+
+    # ---------------------
+    # Pricing
+    # ---------------------
+    def _premium(self, seg: _Segment, tariff: Tariff) -> np.ndarray:
+        """Quoted premium of the recommended tier, rounded as predict() rounds it."""
+        if seg.fixed is not None:
+            premium = np.round(seg.fixed, 2)
+        else:
+            multipliers = np.array([tariff.tier_multiplier[t] for t in TIERS])
+            premium = np.round(seg.base * multipliers[seg.tier], 2)
+        if seg.country == "australia":
+            premium = np.round(premium * INR_TO_AUD, 2)
+        return premium
+
+    @staticmethod
+    def _formula(seg: _Segment, engine: PremiumEngine) -> Optional[np.ndarray]:
+        x = seg.inputs
+        if seg.policy == "vehicle":
+            return engine.vehicle(x["priceofvehicle"], x["ageofvehicle"], x["typeofvehicle"])[1]
+        if seg.policy == "house":
+            return engine.property(x["propertyvalue"], x["propertyage"], x["propertytype"], x["propertysize"])
+        if seg.policy == "travel":
+            return engine.travel(x["tripdurationdays"], {c: x[c] for c in TRAVEL_COVERAGE_MULTIPLIER},
+                                 x["existingmedicalcondition"], x["tripcancellationcoverage"])
+        return None
+
+    def _evaluate(self, tariff: Tariff, previous: Optional[List[Dict]] = None,
+                  affected: Optional[set] = None) -> List[Dict]:
+        """Per-segment {"premium", "formula"} arrays; reuses ``previous`` where unaffected."""
+        engine = None
+        out = []
+        for i, seg in enumerate(self.segments):
+            if previous is not None and "premium" not in affected:
+                premium = previous[i]["premium"]
+            else:
+                premium = self._premium(seg, tariff)
+            if previous is not None and seg.policy not in affected:
+                formula = previous[i]["formula"]
+            else:
+                engine = engine or PremiumEngine(tariff)
+                formula = self._formula(seg, engine)
+            out.append({"premium": premium, "formula": formula})
+        return out
+
+    def proposed(self, changes: Union[Tariff, Dict]) -> Tariff:
+        """A Tariff from a full Tariff or a dict of field changes merged into the current one."""
+        if isinstance(changes, Tariff):
+            return changes
+        merged = {}
+        for name, value in changes.items():
+            if not hasattr(self.tariff, name):
+                raise ValueError(f"Unknown tariff field: {name}")
+            merged[name] = _merge(getattr(self.tariff, name), value)
+        return self.tariff.with_changes(**merged)
+
+    def simulate(self, changes: Union[Tariff, Dict]) -> pd.DataFrame:
+        """Totals before/after by (country, policytype, tier) under the proposed tariff."""
+        tariff = self.proposed(changes)
+        after = self._evaluate(tariff, self._baseline, _affected(self.tariff, tariff))
+
+        rows = []
+        for seg, old, new in zip(self.segments, self._baseline, after):
+            count = np.bincount(seg.tier, minlength=len(TIERS))
+
+            def totals(values):
+                if values is None:
+                    return np.full(len(TIERS), np.nan)
+                return np.bincount(seg.tier, weights=values, minlength=len(TIERS))
+
+            before, later = totals(old["premium"]), totals(new["premium"])
+            f_before, f_later = totals(old["formula"]), totals(new["formula"])
+            for t, tier in enumerate(TIERS):
+                if count[t]:
+                    rows.append((seg.country, seg.policy, tier, int(count[t]), before[t], later[t],
+                                 f_before[t], f_later[t]))
+
+        table = pd.DataFrame(rows, columns=["country", "policytype", "tier", "rows", "premium_before",
+                                            "premium_after", "formula_before", "formula_after"])
+        table["premium_delta"] = table["premium_after"] - table["premium_before"]
+        table["premium_delta_pct"] = 100 * table["premium_delta"] / table["premium_before"]
+        table["formula_delta"] = table["formula_after"] - table["formula_before"]
+        return table.round(2)
+
+
+def load_book(paths: List[str]) -> pd.DataFrame:
+    """Concatenate standardized CSV / parquet books."""
+    frames = [pd.read_parquet(p) if str(p).endswith(".parquet") else pd.read_csv(p) for p in paths]
+    return pd.concat([standardize_columns(f) for f in frames], ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    processed = Path(__file__).resolve().parents[2] / "processed"
+    ap = argparse.ArgumentParser(description="Reprice the policy book under proposed tariff constants")
+    ap.add_argument("changes", help="JSON file of Tariff field changes")
+    ap.add_argument("--book", nargs="+", default=[str(processed / "standardized_india.csv"),
+                                                  str(processed / "standardized_australia.csv")])
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    sim = PortfolioSimulator(load_book(args.book))
+    t1 = time.perf_counter()
+    table = sim.simulate(json.loads(Path(args.changes).read_text()))
+    t2 = time.perf_counter()
+
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(table.to_string(index=False))
+    print(f"\n{len(sim):,} rows ({sim.skipped:,} skipped); load + score {t1 - t0:.2f}s, "
+          f"reprice {1000 * (t2 - t1):.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,282 +2,366 @@
 # Hybrid Rule Engine for Insurance Recommendation
 # Covers: India + Australia × (Health, Life, Vehicle, Travel, House)
 # Each parameter affects final tier. Rules are deterministic, explainable.
+#
+# The rule tables live in rules.json (override with RULES_PATH). They are
+# compiled once into a RulePlan that scores either one row dict or a whole
+# DataFrame, and RuleBook recompiles the file when it changes on disk.
 
-from typing import Dict, Optional
+import hashlib
+import json
+import keyword
+import operator
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = Path(os.getenv("RULES_PATH", Path(__file__).resolve().parent / "rules.json"))
+RULES_FORMAT = 1
+
+TIERS = ["Basic", "Standard", "Gold", "Premium"]
+TIER_LABELS = np.array(TIERS + [None], dtype=object)  # index -1 = no rule matched
+
+Depreciation = Tuple[Tuple[float, ...], Tuple[float, ...], float]
 
 # --------------------------
 # Utility
 # --------------------------
 
-def calculate_idv(price: float, age_years: float) -> float:
+def calculate_idv(price: float, age_years: float, depreciation: Optional[Depreciation] = None) -> float:
     """
     Calculate Insured Declared Value (IDV) using IRDAI slab rules.
     (Same logic generally used by Australian insurers as well.)
+    The slabs come from rules.json unless ``depreciation`` is given.
     """
-    if age_years < 0.5:       # < 6 months
-        depreciation = 0.05
-    elif age_years < 1:       # 6 months – 1 year
-        depreciation = 0.15
-    elif age_years < 2:
-        depreciation = 0.20
-    elif age_years < 3:
-        depreciation = 0.30
-    elif age_years < 4:
-        depreciation = 0.40
-    elif age_years < 5:
-        depreciation = 0.50
-    else:
-        depreciation = 0.60  # >5 years (market negotiated ~60%)
-
-    idv = price * (1 - depreciation)
+    age_below, rates, otherwise = depreciation or RULES.get().idv_depreciation
+    rate = otherwise
+    for bound, r in zip(age_below, rates):
+        if age_years < bound:
+            rate = r
+            break
+
+    idv = price * (1 - rate)
     return max(idv, 0)
 
 
-# --------------------------
-# INDIA RULES
-# --------------------------
-
-def india_health_rules(row: Dict) -> Optional[str]:
-    """
-    Health Insurance (India):
-    - Smoker/disease/age increases risk
-    - High sum insured or premium → Premium tier
-    """
-    age = int(row.get("Age", 0) or 0)
-    sum_insured = float(row.get("SumInsured", 0) or 0)
-    premium = float(row.get("AnnualPremium", 0) or 0)
-    smoker = str(row.get("SmokerDrinker", "No")).lower() == "yes"
-    disease = str(row.get("HealthIssues", "none")).lower()
-
-    risk_score = 0
-    if smoker: risk_score += 1
-    if disease != "none": risk_score += 1
-    if age >= 45: risk_score += 1
-    if age >= 60: risk_score += 2
-
-    if sum_insured > 1500000 or premium > 50000:
-        return "Premium"
-
-    if risk_score == 0: return "Basic"
-    if risk_score == 1: return "Standard"
-    if risk_score == 2: return "Gold"
-    return "Premium"
-
-
-def india_life_rules(row: Dict) -> Optional[str]:
-    """
-    Life Insurance (India):
-    - Smoker/disease heavily penalized
-    - Very high premiums → Premium tier
-    """
-    age = int(row.get("Age", 0) or 0)
-    premium = float(row.get("AnnualPremium", 0) or 0)
-    smoker = str(row.get("SmokerDrinker", "No")).lower() == "yes"
-    disease = str(row.get("HealthIssues", "none")).lower()
-
-    risk_score = 0
-    if smoker: risk_score += 2
-    if disease != "none": risk_score += 1
-    if age >= 50: risk_score += 1
-    if age >= 65: risk_score += 2
-
-    if premium > 100000:
-        return "Premium"
-
-    if risk_score == 0: return "Basic"
-    if risk_score <= 2: return "Standard"
-    if risk_score == 3: return "Gold"
-    return "Premium"
-
-
-def india_vehicle_rules(row: Dict) -> Optional[str]:
-    """
-    Vehicle Insurance (India):
-    - Uses IDV + type of vehicle
-    - Luxury/trucks riskier, bikes moderate
-    """
-    price = float(row.get("PriceOfVehicle", 0) or 0)
-    age = int(row.get("AgeOfVehicle", 0) or 0)
-    vtype = str(row.get("TypeOfVehicle", "")).lower()
-    idv = calculate_idv(price, age)
-
-    type_risk = 0
-    if vtype in ["luxury", "truck"]: type_risk += 1
-    if vtype == "bike": type_risk += 0.5
-
-    if idv < 200000 and type_risk == 0: return "Basic"
-    if 200000 <= idv < 600000 or type_risk > 0: return "Standard"
-    if 600000 <= idv < 1500000: return "Gold"
-    if idv >= 1500000: return "Premium"
-    return None
-
-
-def india_travel_rules(row: Dict) -> Optional[str]:
-    """
-    Travel Insurance (India):
-    - Longer trips, existing medical conditions increase risk
-    - More coverage options → higher tiers
-    """
-    duration = int(row.get("tripdurationdays", 0) or 0)
-    medical_cond = str(row.get("ExistingMedicalCondition", "No")).lower() == "yes"
-    baggage = str(row.get("BaggageCoverage", "No")).lower() == "yes"
-    trip_cancel = str(row.get("TripCancellationCoverage", "No")).lower() == "yes"
-    accident = str(row.get("AccidentCoverage", "No")).lower() == "yes"
-    health = str(row.get("HealthCoverage", "No")).lower() == "yes"
-
-    risk_score = 0
-    if duration > 15: risk_score += 1
-    if medical_cond: risk_score += 1
-
-    coverage_count = sum([baggage, trip_cancel, accident, health])
-
-    if coverage_count == 1: return "Basic"
-    if coverage_count == 2: return "Standard" if risk_score == 0 else "Gold"
-    if coverage_count == 3: return "Gold" if risk_score <= 1 else "Premium"
-    if coverage_count == 4: return "Premium"
-    return None
-
-
-def india_house_rules(row: Dict) -> Optional[str]:
-    """
-    House Insurance (India):
-    - Property value, size, type, and age decide risk
-    """
-    value = float(row.get("PropertyValue", 0) or 0)
-    age = int(row.get("PropertyAge", 0) or 0)
-    size = float(row.get("PropertySizeSqFeet", 0) or 0)
-    ptype = str(row.get("PropertyType", "")).lower()
-
-    risk_score = 0
-    if age > 30: risk_score += 1
-    if ptype in ["villa", "bungalow"]: risk_score += 1
-
-    if value < 2000000 and size < 800: return "Basic"
-    if 2000000 <= value < 10000000 or size < 1500: return "Standard"
-    if 10000000 <= value < 30000000 or size < 3000: return "Gold"
-    return "Premium"
+def calculate_idv_array(price: np.ndarray, age_years: np.ndarray,
+                        depreciation: Optional[Depreciation] = None) -> np.ndarray:
+    """Vectorized calculate_idv."""
+    age_below, rates, otherwise = depreciation or RULES.get().idv_depreciation
+    rate = np.select([age_years < b for b in age_below], list(rates), default=otherwise)
+    idv = price * (1 - rate)
+    return np.where(0 > idv, 0.0, idv)
 
 
 # --------------------------
-# AUSTRALIA RULES
+# Field parsing
 # --------------------------
+# Scalar parsers reproduce ``int(row.get(col, 0) or 0)``, ``str(...).lower()``
+# etc.; the column versions do the same over a DataFrame.
 
-def australia_health_rules(row: Dict) -> Optional[str]:
-    """
-    Health Insurance (Australia):
-    - Smoker/disease much heavier impact
-    - Higher sum insured → Premium tier
-    """
-    age = int(row.get("Age", 0) or 0)
-    sum_insured = float(row.get("SumInsured", 0) or 0)
-    smoker = str(row.get("SmokerDrinker", "No")).lower() == "yes"
-    disease = str(row.get("HealthIssues", "none")).lower()
-
-    risk_score = 0
-    if smoker: risk_score += 2
-    if disease != "none": risk_score += 2
-    if age >= 50: risk_score += 1
-    if age >= 65: risk_score += 2
-
-    if sum_insured > 2000000: return "Premium"
+def _num_col(df: pd.DataFrame, key: str) -> np.ndarray:
+    """float(row.get(key, 0) or 0) for every row."""
+    if key not in df.columns:
+        return np.zeros(len(df))
+    s = df[key]
+    if s.dtype == object:
+        s = s.map(lambda v: v or 0)
+    return pd.to_numeric(s).to_numpy(dtype=float)
 
-    if risk_score == 0: return "Basic"
-    if risk_score <= 2: return "Standard"
-    if risk_score <= 4: return "Gold"
-    return "Premium"
-
-
-def australia_life_rules(row: Dict) -> Optional[str]:
-    """
-    Life Insurance (Australia):
-    - Smoker and higher age are strong negatives
-    - High premiums → Premium tier
-    """
-    age = int(row.get("Age", 0) or 0)
-    premium = float(row.get("AnnualPremium", 0) or 0)
-    smoker = str(row.get("SmokerDrinker", "No")).lower() == "yes"
 
-    risk_score = 0
-    if smoker: risk_score += 2
-    if age >= 55: risk_score += 2
-    if age >= 70: risk_score += 2
+def _int_col(df: pd.DataFrame, key: str) -> np.ndarray:
+    """int(row.get(key, 0) or 0) for every row (truncated, kept as float)."""
+    values = _num_col(df, key)
+    if np.isnan(values).any():
+        raise ValueError(f"cannot convert float NaN to integer in column {key!r}")
+    return np.trunc(values)
 
-    if premium > 150000: return "Premium"
 
-    if risk_score == 0: return "Basic"
-    if risk_score <= 2: return "Standard"
-    if risk_score <= 4: return "Gold"
-    return "Premium"
+def _str_col(df: pd.DataFrame, key: str, default: str) -> np.ndarray:
+    """str(row.get(key, default)).lower() for every row."""
+    if key not in df.columns:
+        return np.full(len(df), default.lower(), dtype=object)
+    return df[key].astype(str).str.lower().to_numpy(dtype=object)
 
 
-def australia_vehicle_rules(row: Dict) -> Optional[str]:
-    """
-    Vehicle Insurance (Australia):
-    - Uses IDV + type of vehicle
-    - Higher thresholds than India
-    """
-    price = float(row.get("PriceOfVehicle", 0) or 0)
-    age = int(row.get("AgeOfVehicle", 0) or 0)
-    vtype = str(row.get("TypeOfVehicle", "")).lower()
-    idv = calculate_idv(price, age)
+def _yes_col(df: pd.DataFrame, key: str, default: str = "No") -> np.ndarray:
+    return _str_col(df, key, default) == "yes"
 
-    type_risk = 0
-    if vtype in ["luxury", "truck"]: type_risk += 1
-    if vtype == "bike": type_risk += 0.5
 
-    if idv < 5000 and type_risk == 0: return "Basic"
-    if 5000 <= idv < 15000 or type_risk > 0: return "Standard"
-    if 15000 <= idv < 30000: return "Gold"
-    if idv >= 30000: return "Premium"
-    return None
+FIELD_TYPES: Dict[str, Tuple[Any, str, Callable[[pd.DataFrame, str, Any], np.ndarray]]] = {
+    # type: (default, scalar expression around row.get(...), column parser)
+    "int": (0, "int({} or 0)", lambda df, col, default: _int_col(df, col)),
+    "float": (0, "float({} or 0)", lambda df, col, default: _num_col(df, col)),
+    "str": ("", "str({}).lower()", _str_col),
+    "flag": ("No", "str({}).lower() == 'yes'", _yes_col),
+}
 
+# --------------------------
+# Compilation
+# --------------------------
+# Each rule table becomes a generated Python function for single rows (no
+# per-call interpretation of the table) plus NumPy predicates for frames.
 
-def australia_travel_rules(row: Dict) -> Optional[str]:
-    """
-    Travel Insurance (Australia):
-    - More weight on medical conditions
-    - Longer trip durations are riskier
-    """
-    duration = int(row.get("tripdurationdays", 0) or 0)
-    baggage = str(row.get("BaggageCoverage", "No")).lower() == "yes"
-    trip_cancel = str(row.get("TripCancellationCoverage", "No")).lower() == "yes"
-    accident = str(row.get("AccidentCoverage", "No")).lower() == "yes"
-    health = str(row.get("HealthCoverage", "No")).lower() == "yes"
-    medical_cond = str(row.get("ExistingMedicalCondition", "No")).lower() == "yes"
+_COMPARE = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_LITERAL = (bool, int, float, str)
 
-    risk_score = 0
-    if duration > 20: risk_score += 1
-    if medical_cond: risk_score += 2
 
-    coverage_count = sum([baggage, trip_cancel, accident, health])
+def _literal(value, where: str):
+    if not isinstance(value, _LITERAL):
+        raise ValueError(f"{where}: expected a number, string or boolean, got {value!r}")
+    return value
 
-    if coverage_count == 1: return "Basic"
-    if coverage_count == 2: return "Standard" if risk_score == 0 else "Gold"
-    if coverage_count == 3: return "Gold" if risk_score <= 2 else "Premium"
-    if coverage_count == 4: return "Premium"
-    return None
 
+def _compile_condition(spec, names, where: str) -> Tuple[str, Callable[[Dict], np.ndarray]]:
+    """Compile ``[name, op, value]`` / ``["all"|"any"|"not", ...]``.
 
-def australia_house_rules(row: Dict) -> Optional[str]:
-    """
-    House Insurance (Australia):
-    - Higher base property values compared to India
-    - Larger homes and villas → higher tiers
+    Returns a Python expression over ``f_<name>`` locals (single-row path)
+    and a predicate over a dict of column arrays (frame path).
     """
-    value = float(row.get("PropertyValue", 0) or 0)
-    age = int(row.get("PropertyAge", 0) or 0)
-    size = float(row.get("PropertySizeSqFeet", 0) or 0)
-    ptype = str(row.get("PropertyType", "")).lower()
-
-    risk_score = 0
-    if age > 40: risk_score += 1
-    if ptype in ["villa", "bungalow"]: risk_score += 1
-
-    if value < 300000 and size < 1000: return "Basic"
-    if 300000 <= value < 1000000 or size < 2000: return "Standard"
-    if 1000000 <= value < 3000000 or size < 4000: return "Gold"
-    return "Premium"
-
+    if not isinstance(spec, list) or not spec:
+        raise ValueError(f"{where}: condition must be a non-empty list, got {spec!r}")
+
+    head = spec[0]
+    if head in ("all", "any", "not"):
+        parts = [_compile_condition(s, names, where) for s in spec[1:]]
+        if head == "not":
+            if len(parts) != 1:
+                raise ValueError(f"{where}: 'not' takes exactly one condition")
+            (src, vec), = parts
+            return f"(not {src})", (lambda v: ~vec(v))
+        if not parts:
+            raise ValueError(f"{where}: {head!r} needs at least one condition")
+        vectors = [p[1] for p in parts]
+        src = "(" + f" {'and' if head == 'all' else 'or'} ".join(p[0] for p in parts) + ")"
+        if head == "all":
+            return src, (lambda v: np.logical_and.reduce([f(v) for f in vectors]))
+        return src, (lambda v: np.logical_or.reduce([f(v) for f in vectors]))
+
+    if len(spec) != 3:
+        raise ValueError(f"{where}: expected [name, op, value], got {spec!r}")
+    name, op, value = spec
+    if name not in names:
+        raise ValueError(f"{where}: unknown name {name!r}")
+    var = f"f_{name}"
+
+    if op in _COMPARE:
+        cmp, value = _COMPARE[op], _literal(value, where)
+        return f"({var} {op} {value!r})", (lambda v: cmp(v[name], value))
+    if op == "in":
+        values = tuple(_literal(x, where) for x in value)
+        return f"({var} in {values!r})", (lambda v: np.isin(v[name], values))
+    if op == "between":
+        lo, hi = (_literal(x, where) for x in value)
+        return f"({lo!r} <= {var} < {hi!r})", (lambda v: (lo <= v[name]) & (v[name] < hi))
+    raise ValueError(f"{where}: unknown operator {op!r}")
+
+
+def _tier_index(label, where: str) -> int:
+    if label is None:
+        return -1
+    if label not in TIERS:
+        raise ValueError(f"{where}: unknown tier {label!r}")
+    return TIERS.index(label)
+
+
+def _check_name(name: str, names, where: str) -> str:
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name):
+        raise ValueError(f"{where}: {name!r} is not a valid name")
+    if name in names:
+        raise ValueError(f"{where}: {name!r} is defined twice")
+    return name
+
+
+class CompiledRule:
+    """One (country, product) rule table compiled into an evaluation plan."""
+
+    def __init__(self, key: str, spec: Dict, depreciation: Depreciation):
+        self.key = key
+        self.depreciation = depreciation
+        names = set()
+        lines = ["def evaluate(row):"]
+
+        self.fields: List[Tuple[str, str, Any, Callable]] = []
+        for name, f in spec.get("fields", {}).items():
+            _check_name(name, names, key)
+            if f.get("type") not in FIELD_TYPES:
+                raise ValueError(f"{key}: field {name!r} has unknown type {f.get('type')!r}")
+            default, expr, parse_col = FIELD_TYPES[f["type"]]
+            default = _literal(f.get("default", default), f"{key} field {name!r}")
+            self.fields.append((name, f["column"], default, parse_col))
+            lines.append(f"    f_{name} = " + expr.format(f"row.get({f['column']!r}, {default!r})"))
+            names.add(name)
+
+        self.derived: List[Tuple[str, Tuple[str, str]]] = []
+        for name, d in spec.get("derived", {}).items():
+            _check_name(name, names, key)
+            if d.get("fn") != "idv":
+                raise ValueError(f"{key}: derived {name!r} has unknown fn {d.get('fn')!r}")
+            args = tuple(d["args"])
+            if len(args) != 2 or any(a not in names for a in args):
+                raise ValueError(f"{key}: derived {name!r} needs two known args, got {args!r}")
+            self.derived.append((name, args))
+            lines.append(f"    f_{name} = _idv(f_{args[0]}, f_{args[1]}, _dep)")
+            names.add(name)
+
+        self.scores: List[Tuple[str, List[Tuple[Callable, float]]]] = []
+        score_names = []
+        for name, terms in spec.get("scores", {}).items():
+            _check_name(name, names | set(score_names), key)
+            where = f"{key} score {name!r}"
+            lines.append(f"    f_{name} = 0")
+            compiled = []
+            for t in terms:
+                src, vec = _compile_condition(t["when"], names, where)
+                add = _literal(t["add"], where)
+                lines.append(f"    if {src}: f_{name} += {add!r}")
+                compiled.append((vec, add))
+            self.scores.append((name, compiled))
+            score_names.append(name)
+        names.update(score_names)
+
+        # branch() shares the field/score lines and returns which tier rule fired
+        branch_lines = ["def branch(row):"] + lines[1:]
+        self.tiers: List[Tuple[Callable, int]] = []
+        for i, t in enumerate(spec.get("tiers", [])):
+            where = f"{key} tier #{i}"
+            src, vec = _compile_condition(t["when"], names, where)
+            tier = _tier_index(t["tier"], where)
+            lines.append(f"    if {src}: return {TIERS[tier]!r}")
+            branch_lines.append(f"    if {src}: return {i}")
+            self.tiers.append((vec, tier))
+        self.default = _tier_index(spec.get("default"), f"{key} default")
+        lines.append(f"    return {TIER_LABELS[self.default]!r}")
+        branch_lines.append("    return -1")
+        # tier index per branch; the last entry (branch -1) is the default
+        self.branch_tiers = np.array([tier for _, tier in self.tiers] + [self.default], dtype=np.intp)
+
+        self.source = "\n".join(lines)
+        namespace = {"_idv": calculate_idv, "_dep": depreciation}
+        exec(compile(self.source, f"<rules {key}>", "exec"), namespace)
+        exec(compile("\n".join(branch_lines), f"<rules {key} branch>", "exec"), namespace)
+        self.evaluate: Callable[[Dict], Optional[str]] = namespace["evaluate"]
+        self.branch: Callable[[Dict], int] = namespace["branch"]
+
+    def branch_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Index of the tier rule that decides each row of ``df`` (-1 = the default)."""
+        v = {}
+        for name, column, default, parse_col in self.fields:
+            v[name] = parse_col(df, column, default)
+        for name, (price, age) in self.derived:
+            v[name] = calculate_idv_array(v[price], v[age], self.depreciation)
+        for name, terms in self.scores:
+            total = np.zeros(len(df))
+            for cond, add in terms:
+                total += add * cond(v)
+            v[name] = total
+        if not self.tiers:
+            return np.full(len(df), -1, dtype=np.intp)
+        return np.select([cond(v) for cond, _ in self.tiers], list(range(len(self.tiers))), default=-1)
+
+    def evaluate_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Tier index per row of ``df`` (-1 where no tier applies)."""
+        return self.branch_tiers[self.branch_frame(df)]
+
+
+class RulePlan:
+    """All compiled rule tables from one rules file."""
+
+    def __init__(self, spec: Dict, digest: str = ""):
+        if spec.get("format") != RULES_FORMAT:
+            raise ValueError(f"Unsupported rules format {spec.get('format')!r}")
+        self.version = str(spec.get("version", ""))
+        self.digest = digest
+
+        dep = spec["idv_depreciation"]
+        if len(dep["age_below"]) != len(dep["rate"]):
+            raise ValueError("idv_depreciation: age_below and rate must have the same length")
+        self.idv_depreciation: Depreciation = (tuple(dep["age_below"]), tuple(dep["rate"]), dep["otherwise"])
+
+        self.rules: Dict[Tuple[str, str], CompiledRule] = {}
+        for key, rule in spec["rules"].items():
+            country, product = key.lower().split("/", 1)
+            self.rules[(country, product)] = CompiledRule(key, rule, self.idv_depreciation)
+
+    def evaluate(self, row: Dict) -> Optional[str]:
+        country = str(row.get("Country", "")).lower()
+        product = str(row.get("ProductType", "")).lower()
+        rule = self.rules.get((country, product))
+        return rule.evaluate(row) if rule is not None else None
+
+    def evaluate_frame(self, df: pd.DataFrame) -> pd.Series:
+        tiers = np.full(len(df), -1, dtype=np.intp)
+        groups = pd.DataFrame({
+            "country": _str_col(df, "Country", ""),
+            "product": _str_col(df, "ProductType", ""),
+        }).groupby(["country", "product"], sort=False).indices
+
+        for key, positions in groups.items():
+            rule = self.rules.get(key)
+            if rule is not None:
+                tiers[positions] = rule.evaluate_frame(df.iloc[positions])
+        return pd.Series(TIER_LABELS[tiers], index=df.index, dtype=object)
+
+
+def load_rules(path: Path = RULES_PATH) -> RulePlan:
+    """Read and compile a rules file."""
+    raw = Path(path).read_bytes()
+    return RulePlan(json.loads(raw.decode("utf-8")), hashlib.sha1(raw).hexdigest()[:12])
+
+
+class RuleBook:
+    """Holds the compiled plan for one rules file and recompiles it when the file changes."""
+
+    def __init__(self, path: Path = RULES_PATH, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._plan: Optional[RulePlan] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stat_now(self) -> Tuple[int, int]:
+        st = self.path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> RulePlan:
+        plan = self._plan
+        if plan is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return plan
+
+        with self._lock:
+            plan = self._plan
+            if plan is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return plan
+            try:
+                stat = self._stat_now()
+                if plan is None or stat != self._stat:
+                    if plan is not None:
+                        print(f"Reloading rules from {self.path}")
+                    plan = load_rules(self.path)
+                    self._plan, self._stat = plan, stat
+            except Exception as e:
+                # a half-written or invalid file must not take the rules offline
+                if plan is None:
+                    raise
+                print(f"Reload of {self.path} failed, keeping rules version {plan.version}: {e}")
+            self._checked_at = time.monotonic()
+            return plan
+
+
+RULES = RuleBook()
 
 # --------------------------
 # Dispatcher
@@ -285,21 +369,13 @@ def australia_house_rules(row: Dict) -> Optional[str]:
 
 def apply_rules(row: Dict) -> Optional[str]:
     """Main dispatcher to apply country + product-specific rules."""
-    country = str(row.get("Country", "")).lower()
-    product = str(row.get("ProductType", "")).lower()
-
-    if country == "india":
-        if product == "health": return india_health_rules(row)
-        if product == "life": return india_life_rules(row)
-        if product == "vehicle": return india_vehicle_rules(row)
-        if product == "travel": return india_travel_rules(row)
-        if product == "house": return india_house_rules(row)
-
-    if country == "australia":
-        if product == "health": return australia_health_rules(row)
-        if product == "life": return australia_life_rules(row)
-        if product == "vehicle": return australia_vehicle_rules(row)
-        if product == "travel": return australia_travel_rules(row)
-        if product == "house": return australia_house_rules(row)
-
-    return None
+    return RULES.get().evaluate(row)
+
+
+def apply_rules_frame(df: pd.DataFrame) -> pd.Series:
+    """Columnar apply_rules: one tier label (or None) per row of ``df``.
+
+    Rows are split by (Country, ProductType) and each group is scored with
+    NumPy masks. Labels match apply_rules row for row.
+    """
+    return RULES.get().evaluate_frame(df)
@@ -0,0 +1,209 @@
+# scripts/recommendation/score_book.py
+"""Offline bulk scoring of parquet policy books.
+
+Each parquet row group is cut into slices of at most ``batch_rows`` rows,
+and every slice is one unit of work. pandas writes a whole book as a single
+row group, so without slicing one worker would read and score all of it.
+A pool of worker processes loads the models once, at start-up. By default
+these are the sklearn pickles, because on chunks this large sklearn's
+compiled tree walk beats the flat NumPy trees. Each worker streams its slice
+with ``iter_batches`` and scores it with ``predict_batch``. Rows are grouped
+by (country, policytype), and every group produces a part file under a
+hive-partitioned output tree::
+
+    <out>/country=<country>/policytype=<policy>/part-<file>-<row group>-<slice>.parquet
+
+Each part holds the row id, recommended tier, per-class confidences and the
+premium for every tier. Parts are written to a temporary name and renamed.
+Then a marker in ``<out>/_done/`` records the finished slice, so a restarted
+run skips every slice that already completed.
+
+Usage::
+
+    python -m scripts.recommendation.score_book book.parquet --out scored/ --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .predict import POLICY_FEATURES, predict_batch
+from .registry import REGISTRY
+
+DONE_DIR = "_done"
+BATCH_ROWS = 16_384
+
+# book column names that differ from the ones predict_batch reads
+COLUMN_ALIASES = {"propertysize": "propertysizesqfeet"}
+
+
+class Chunk(NamedTuple):
+    path: str
+    row_group: int
+    slice: int
+    start: int       # index of the slice's first row within its row group
+    offset: int      # index of the slice's first row within the file
+    rows: int
+
+    @property
+    def name(self) -> str:
+        return f"{Path(self.path).stem}-{self.row_group:05d}-{self.slice:05d}"
+
+
+def plan_chunks(paths: List[str], batch_rows: int = BATCH_ROWS) -> Iterator[Chunk]:
+    """One Chunk per ``batch_rows`` slice of every row group, from parquet metadata only."""
+    for path in paths:
+        meta = pq.ParquetFile(path).metadata
+        offset = 0
+        for rg in range(meta.num_row_groups):
+            group_rows = meta.row_group(rg).num_rows
+            for i, start in enumerate(range(0, group_rows, batch_rows)):
+                rows = min(batch_rows, group_rows - start)
+                yield Chunk(str(path), rg, i, start, offset + start, rows)
+            offset += group_rows
+
+
+def read_chunk(chunk: Chunk) -> pd.DataFrame:
+    """The chunk's rows, streamed from its row group without reading the rest of it."""
+    pieces, pos, stop = [], 0, chunk.start + chunk.rows
+    for batch in pq.ParquetFile(chunk.path).iter_batches(batch_size=chunk.rows, row_groups=[chunk.row_group]):
+        lo, hi = max(chunk.start - pos, 0), min(stop - pos, batch.num_rows)
+        if lo < hi:
+            pieces.append(batch.slice(lo, hi - lo))
+        pos += batch.num_rows
+        if pos >= stop:
+            break
+    return pa.Table.from_batches(pieces).to_pandas()
+
+
+def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Lowercase, stripped column names with book aliases mapped to predict's names."""
+    df.columns = df.columns.str.lower().str.strip()
+    for src, dst in COLUMN_ALIASES.items():
+        if src in df.columns and dst not in df.columns:
+            df = df.rename(columns={src: dst})
+    return df
+
+
+def _write_atomic(table: pa.Table, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def score_chunk(chunk: Chunk, out_dir: str, id_column: Optional[str] = None) -> Tuple[str, int, int]:
+    """Score one slice and write its partitions; returns (name, scored, skipped)."""
+    df = standardize_columns(read_chunk(chunk))
+    if id_column:
+        row_id = df[id_column.lower()]
+    else:
+        row_id = pd.Series(range(chunk.offset, chunk.offset + len(df)), index=df.index)
+
+    country = df["country"].astype(str).str.strip().str.lower()
+    policy = df["policytype"].astype(str).str.strip().str.lower()
+    known = policy.isin(list(POLICY_FEATURES))
+
+    out_root = Path(out_dir)
+    scored = 0
+    for (c, p), idx in df[known].groupby([country[known], policy[known]], sort=True).groups.items():
+        if not REGISTRY.path_for(c, p).is_dir():
+            continue  # no model for this market; counted as skipped
+        result = predict_batch(c, p, df.loc[idx])
+        result.insert(0, "row_id", row_id.loc[idx].to_numpy())
+        part = out_root / f"country={c}" / f"policytype={p}" / f"part-{chunk.name}.parquet"
+        _write_atomic(pa.Table.from_pandas(result, preserve_index=False), part)
+        scored += len(result)
+
+    marker = out_root / DONE_DIR / chunk.name
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(f"{scored} {len(df) - scored}\n")
+    return chunk.name, scored, len(df) - scored
+
+
+def _init_worker(prefer_flat: bool):
+    """Load every model once; returns the thread limiter (None without threadpoolctl)."""
+    # one BLAS / OpenMP thread per process; the pool supplies the parallelism
+    try:
+        from threadpoolctl import threadpool_limits
+        limiter = threadpool_limits(1)
+    except ImportError:
+        limiter = None
+    REGISTRY.prefer_flat = prefer_flat
+    REGISTRY.check_interval = float("inf")
+    REGISTRY.preload()
+    return limiter
+
+
+def score_book(paths: List[str], out_dir: str, workers: int = os.cpu_count() or 1,
+               id_column: Optional[str] = None, prefer_flat: bool = False,
+               batch_rows: int = BATCH_ROWS, log=print) -> Tuple[int, int]:
+    """Score every pending slice of ``paths``; returns (rows scored, rows skipped)."""
+    done = Path(out_dir) / DONE_DIR
+    chunks = [c for c in plan_chunks(paths, batch_rows) if not (done / c.name).exists()]
+    total_rows = sum(c.rows for c in chunks)
+    log(f"{len(chunks)} slices ({total_rows:,} rows) to score with {workers} worker(s)")
+
+    started = time.perf_counter()
+    scored = skipped = rows_seen = 0
+
+    def _progress(i: int, name: str, n: int, s: int) -> None:
+        nonlocal scored, skipped, rows_seen
+        scored, skipped, rows_seen = scored + n, skipped + s, rows_seen + n + s
+        rate = rows_seen / max(time.perf_counter() - started, 1e-9)
+        log(f"[{i}/{len(chunks)}] {name}: {n:,} scored, {s:,} skipped "
+            f"({rows_seen:,}/{total_rows:,} rows, {rate:,.0f} rows/s)")
+
+    if workers <= 1:
+        # scoring in this process: put the shared registry back afterwards
+        saved, limiter = (REGISTRY.prefer_flat, REGISTRY.check_interval), None
+        try:
+            if prefer_flat != REGISTRY.prefer_flat:
+                REGISTRY.clear()
+            limiter = _init_worker(prefer_flat)
+            for i, chunk in enumerate(chunks, 1):
+                _progress(i, *score_chunk(chunk, out_dir, id_column))
+        finally:
+            if prefer_flat != saved[0]:
+                REGISTRY.clear()
+            REGISTRY.prefer_flat, REGISTRY.check_interval = saved
+            if limiter is not None:
+                limiter.restore_original_limits()
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(prefer_flat,)) as pool:
+            futures = [pool.submit(score_chunk, c, out_dir, id_column) for c in chunks]
+            for i, fut in enumerate(as_completed(futures), 1):
+                _progress(i, *fut.result())
+    return scored, skipped
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Score parquet policy books into partitioned parquet")
+    ap.add_argument("books", nargs="+", help="input parquet files")
+    ap.add_argument("--out", required=True, help="output directory")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--id-column", default=None,
+                    help="carry this column through as row_id (default: row number in the file)")
+    ap.add_argument("--flat", action="store_true",
+                    help="score with the flat NumPy trees instead of the sklearn pickles")
+    ap.add_argument("--batch-rows", type=int, default=BATCH_ROWS,
+                    help=f"rows per unit of work (default {BATCH_ROWS})")
+    args = ap.parse_args(argv)
+
+    scored, skipped = score_book(args.books, args.out, args.workers, args.id_column, args.flat,
+                                 args.batch_rows)
+    print(f"Done: {scored:,} rows scored, {skipped:,} skipped (no model for country/policy)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# scripts/recommendation/store.py
+"""Persistent result store shared by every worker on the host.
+
+``ResultStore`` is the second tier behind ``ResultCache``. A memory miss
+reads the entry from a local SQLite file, and every put is also queued for
+the file. Because of that, restarted workers and the other gunicorn workers
+find predictions and LLM explanations that any worker computed before.
+
+* The database runs in WAL mode: readers never wait for the writer and
+  each thread reads through its own connection.
+* Puts go to an in-memory queue. A background thread writes them in one
+  transaction per batch (every ``flush_interval`` seconds or
+  ``batch_size`` entries), so request threads never block on disk.
+* Keys are hashed from the cache key, so prediction entries carry the
+  artifact version like the in-process cache. Entries older than
+  ``max_age`` are ignored and pruned when the store opens.
+
+Enable it with ``RESULT_STORE=/path/to/results.sqlite`` (unset = off).
+``python -m scripts.api.warm_store`` fills the store from a replay of
+historical requests.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    namespace TEXT NOT NULL,
+    key BLOB NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+
+
+def key_digest(key: Hashable) -> bytes:
+    """Stable 16-byte digest of a cache key (tuples of str / bytes / float / None)."""
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+
+
+class ResultStore:
+    """SQLite (WAL) key/value store with non-blocking reads and batched background writes."""
+
+    def __init__(self, path: Path, max_age: float = 7 * 86400.0, flush_interval: float = 0.5,
+                 batch_size: int = 256, clock=time.time):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._clock = clock
+        self._local = threading.local()
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.written = self.batches = self.errors = self.skipped = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._connect()
+        with db:
+            db.execute(_SCHEMA)
+            db.execute("DELETE FROM results WHERE created < ?", (self._clock() - self.max_age,))
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _reader(self) -> sqlite3.Connection:
+        # one connection per thread (and per process: forked workers reconnect)
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.db, self._local.pid = self._connect(), pid
+        return self._local.db
+
+    # ---------------------
+    # Reads
+    # ---------------------
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """The stored value for ``key``, or None when absent, expired or unreadable."""
+        try:
+            row = self._reader().execute(
+                "SELECT value FROM results WHERE namespace = ? AND key = ? AND created >= ?",
+                (namespace, key_digest(key), self._clock() - self.max_age),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Result store read failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    # ---------------------
+    # Writes
+    # ---------------------
+    def put(self, namespace: str, key: Hashable, value: Any) -> None:
+        """Queue ``value`` for the next batch; values that are not JSON are skipped."""
+        try:
+            encoded = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError):
+            self.skipped += 1
+            return
+        self._ensure_writer()
+        self._queue.put((namespace, key_digest(key), encoded, self._clock()))
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or self._writer_pid != os.getpid() or not self._writer.is_alive():
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue()  # a forked child must not drain the parent's queue
+                self._writer = threading.Thread(target=self._write_loop, name="result-store", daemon=True)
+                self._writer_pid = os.getpid()
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        db = self._connect()
+        stop = False
+        while not stop:
+            batch: List[Tuple] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                        break
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                stop = item is None
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(db, batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+        db.close()
+
+    def _write(self, db: sqlite3.Connection, batch: List[Tuple]) -> None:
+        try:
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"Result store write of {len(batch)} entries failed: {e}")
+
+    def flush(self) -> None:
+        """Block until every queued put is on disk."""
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush and stop the writer thread."""
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._writer = None
+
+    def __len__(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "skipped": self.skipped,
+        }
+
+
+def open_store(path: Optional[str] = None) -> Optional[ResultStore]:
+    """The store at ``path`` (default: $RESULT_STORE), or None when unset or unusable."""
+    path = path if path is not None else os.getenv("RESULT_STORE", "")
+    if not path:
+        return None
+    try:
+        return ResultStore(
+            Path(path),
+            max_age=float(os.getenv("RESULT_STORE_MAX_AGE", str(7 * 86400))),
+            flush_interval=float(os.getenv("RESULT_STORE_FLUSH_INTERVAL", "0.5")),
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Result store {path} unavailable, using the in-process cache only: {e}")
+        return None
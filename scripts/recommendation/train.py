@@ -2,8 +2,13 @@
 from __future__ import annotations
 
 import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
@@ -13,6 +18,10 @@ from sklearn.metrics import classification_report, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder
 
+from scripts.recommendation import train_cache
+from scripts.recommendation.bundle import BUNDLE_NAME, write_bundle
+from scripts.recommendation.feature_store import FEATURE_STORE, EncodedSegment, FeatureStore
+
 # -------------------------------------------------------------------
 # Paths / constants
 # -------------------------------------------------------------------
@@ -32,6 +41,15 @@ POLICY_FEATURES: Dict[str, List[str]] = {
                "tripcancellationcoverage", "accidentcoverage", "country", "policytype"],
 }
 
+# Model parameters; a segment's tuning.json (see scripts.recommendation.tuning) overrides them
+CLASSIFIER_PARAMS: Dict[str, Any] = {"max_iter": 300, "learning_rate": 0.05}
+REGRESSOR_PARAMS: Dict[str, Any] = {"max_iter": 400, "learning_rate": 0.05}
+TUNING_NAME = "tuning.json"
+
+# rows applied by scripts.recommendation.incremental, per artifact directory
+INCREMENTAL_LOG = "incremental.json"
+DELTA_DIR = "deltas"
+
 # Premium target per policy (lowercase; must match CSV)
 PREMIUM_COLUMN = {
     "health": "annualpremium",
@@ -46,7 +64,8 @@ PREMIUM_COLUMN = {
 # Helpers
 # -------------------------------------------------------------------
 def _split_num_cat(X: pd.DataFrame) -> Tuple[List[str], List[str]]:
-    cat_cols = [c for c in X.columns if X[c].dtype == "object" or str(X[c].dtype).startswith("string")]
+    cat_cols = [c for c in X.columns if X[c].dtype == "object" or str(X[c].dtype).startswith("string")
+                or isinstance(X[c].dtype, pd.CategoricalDtype)]
     num_cols = [c for c in X.columns if c not in cat_cols]
     return num_cols, cat_cols
 
@@ -93,31 +112,176 @@ def _save_feature_lists(outdir: Path, features: List[str]) -> None:
         json.dump(features, f, ensure_ascii=False, indent=2)
 
 
+def _link_name(model) -> str:
+    """How raw scores map to outputs; see tree_eval.FlatTreeModel."""
+    loss = type(model._loss).__name__
+    if loss == "HalfMultinomialLoss":
+        return "softmax"
+    if loss == "HalfBinomialLoss":
+        return "sigmoid"
+    if type(model._loss.link).__name__ == "LogLink":
+        return "log"
+    return "identity"
+
+
+def export_flat_trees(model) -> Dict[str, np.ndarray]:
+    """Flatten a fitted HistGradientBoosting model into contiguous node arrays.
+
+    Trees are laid out iteration-major and every leaf points to itself, so the
+    evaluator can walk all trees for a fixed number of steps without branching.
+    """
+    nodes = [p.nodes for it in model._predictors for p in it]
+    if any(n["is_categorical"].any() for n in nodes):
+        raise ValueError("Native categorical splits are not supported by the flat evaluator")
+
+    sizes = np.array([len(n) for n in nodes])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    allnodes = np.concatenate(nodes)
+    is_leaf = allnodes["is_leaf"].astype(bool)
+    base = np.repeat(offsets, sizes)
+    own = np.arange(len(allnodes))
+
+    arrays = {
+        "feature": np.where(is_leaf, 0, allnodes["feature_idx"]).astype(np.int32),
+        "threshold": allnodes["num_threshold"].astype(np.float64),
+        "missing_left": allnodes["missing_go_to_left"].astype(bool),
+        "left": np.where(is_leaf, own, allnodes["left"] + base).astype(np.int32),
+        "right": np.where(is_leaf, own, allnodes["right"] + base).astype(np.int32),
+        "is_leaf": is_leaf,
+        "value": allnodes["value"].astype(np.float64),
+        "roots": offsets.astype(np.int32),
+        "baseline": np.asarray(model._baseline_prediction, dtype=np.float64).ravel(),
+        "max_depth": np.array(int(allnodes["depth"].max())),
+        "n_features": np.array(int(model.n_features_in_)),
+        "link": np.array(_link_name(model)),
+    }
+    if hasattr(model, "classes_"):
+        arrays["classes"] = np.asarray(model.classes_).astype(str)
+    return arrays
+
+
+def _encoder_arrays(prefix: str, enc: OneHotEncoder) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    names = [str(f) for f in getattr(enc, "feature_names_in_", [])]
+    arrays = {}
+    for i, cats in enumerate(enc.categories_ if names else []):
+        arrays[f"{prefix}/{i}"] = cats.astype(str) if cats.dtype == object else cats
+    return arrays, names
+
+
+def save_bundle(outdir: Path, clf, reg, enc_cls: OneHotEncoder, enc_reg: OneHotEncoder,
+                features_cls: List[str], features_reg: List[str]) -> str:
+    """Write models, encoders and feature lists into one memory-mappable file."""
+    arrays: Dict[str, np.ndarray] = {}
+    arrays.update({f"clf/{k}": v for k, v in export_flat_trees(clf).items()})
+    arrays.update({f"reg/{k}": v for k, v in export_flat_trees(reg).items()})
+    cls_arrays, cls_names = _encoder_arrays("enc_cls", enc_cls)
+    reg_arrays, reg_names = _encoder_arrays("enc_reg", enc_reg)
+    arrays.update(cls_arrays)
+    arrays.update(reg_arrays)
+    arrays["features_cls"] = np.array(features_cls, dtype=str)
+    arrays["features_reg"] = np.array(features_reg, dtype=str)
+
+    meta = {"enc_cls_features": cls_names, "enc_reg_features": reg_names}
+    return write_bundle(outdir / BUNDLE_NAME, arrays, meta)
+
+
+def export_all(artifacts: Path = ARTIFACTS) -> None:
+    """Write a model bundle for every trained artifact directory."""
+    for outdir in sorted(p for p in artifacts.iterdir() if (p / "clf.pkl").exists()):
+        with open(outdir / "features_cls.json", encoding="utf-8") as f:
+            features_cls = json.load(f)
+        features_reg = features_cls
+        if (outdir / "features_reg.json").exists():
+            with open(outdir / "features_reg.json", encoding="utf-8") as f:
+                features_reg = json.load(f)
+        version = save_bundle(
+            outdir,
+            joblib.load(outdir / "clf.pkl"), joblib.load(outdir / "reg.pkl"),
+            joblib.load(outdir / "encoder_cls.pkl"), joblib.load(outdir / "encoder_reg.pkl"),
+            features_cls, features_reg,
+        )
+        print(f"✅ Exported bundle {version} to {outdir}")
+
+
 # -------------------------------------------------------------------
 # Training
 # -------------------------------------------------------------------
-def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
-    print("\n" + "=" * 68)
-    print(f"🚀 Training {country.upper()} — {policy.upper()}")
-    print("=" * 68)
+@dataclass
+class Segment:
+    """Prepared, split training data for one (country, policy)."""
+    country: str
+    policy: str
+    features: List[str]
+    Xtr: pd.DataFrame
+    Xte: pd.DataFrame
+    yct: pd.Series
+    yce: pd.Series
+    yrt: pd.Series
+    yre: pd.Series
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.country.lower(), self.policy.lower()
+
+
+def load_dataset(csv_path: str) -> pd.DataFrame:
+    """Training rows of a standardized CSV (memory-mapped from its typed cache when current)."""
+    return train_cache.load_dataset(csv_path)
+
+
+def policy_frames(df: pd.DataFrame, country: str) -> Dict[str, pd.DataFrame]:
+    """Rows of ``country`` per policy type, split with one pass over the frame."""
+    partitions = df.attrs.get("partitions")
+    if partitions is not None and df.attrs.get("rows") == len(df):
+        return {p: df.iloc[a:b] for (c, p), (a, b) in partitions.items() if c == country.lower()}
+    rows = df[df["country"].str.lower() == country.lower()]
+    return {str(p): g for p, g in rows.groupby(rows["policytype"].str.lower(), sort=False)}
+
+
+def load_incremental_log(outdir: Path) -> List[Dict]:
+    path = outdir / INCREMENTAL_LOG
+    return json.loads(path.read_text()) if path.exists() else []
+
 
+def save_incremental_log(outdir: Path, log: List[Dict]) -> None:
+    tmp = outdir / (INCREMENTAL_LOG + ".tmp")
+    tmp.write_text(json.dumps(log, indent=2))
+    os.replace(tmp, outdir / INCREMENTAL_LOG)
+
+
+def delta_rows(outdir: Path) -> List[Tuple[str, pd.DataFrame]]:
+    """(digest, rows) of every delta applied to ``outdir``'s models, oldest first."""
+    paths = sorted((outdir / DELTA_DIR).glob("*.parquet")) if (outdir / DELTA_DIR).is_dir() else []
+    return [(p.stem.split("-", 1)[1], pd.read_parquet(p)) for p in paths]
+
+
+def folded_deltas(outdir: Path) -> List[pd.DataFrame]:
+    """Applied deltas a full retrain has trained on, i.e. that are part of the base rows."""
+    pending = {e["delta"] for e in load_incremental_log(outdir) if not e.get("folded")}
+    return [rows for digest, rows in delta_rows(outdir) if digest not in pending]
+
+
+def with_deltas(sub: pd.DataFrame, outdir: Path, deltas: Optional[List[pd.DataFrame]] = None) -> pd.DataFrame:
+    """Segment rows plus the rows of ``deltas`` (default: every delta applied to ``outdir``)."""
+    deltas = [rows for _, rows in delta_rows(outdir)] if deltas is None else deltas
+    return pd.concat([sub, *deltas], ignore_index=True) if deltas else sub
+
+
+def prepare_segment(country: str, policy: str, sub: pd.DataFrame) -> Optional[Segment]:
+    """Targets, cleaned features and the train/test split; None when no rows are usable."""
     feats   = POLICY_FEATURES[policy]
     tgt_cls = "policytier"
     tgt_reg = PREMIUM_COLUMN[policy]
 
-    # Filter to rows for this (country, policy)
-    sub = df[(df["country"].str.lower() == country.lower()) &
-             (df["policytype"].str.lower() == policy.lower())].copy()
-
     if sub.empty:
         print(f"⚠️  Skipping {country}-{policy}: no rows after filter.")
-        return
+        return None
 
     # Remove rows missing targets
     sub = sub.dropna(subset=[tgt_cls, tgt_reg])
     if sub.empty:
         print(f"⚠️  Skipping {country}-{policy}: no rows with targets.")
-        return
+        return None
 
     # Build X/y
     X = sub.reindex(columns=feats).copy()
@@ -135,10 +299,6 @@ def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
         for c in cat_cols:
             X[c] = X[c].astype("object").fillna("__missing__").astype(str)
 
-    # Save feature order to artifacts
-    outdir = ARTIFACTS / f"{country.lower()}_{policy.lower()}"
-    _save_feature_lists(outdir, list(X.columns))
-
     # Split
     try:
         Xtr, Xte, yct, yce, yrt, yre = train_test_split(
@@ -149,68 +309,120 @@ def train_one(country: str, df: pd.DataFrame, policy: str) -> None:
         Xtr, Xte, yct, yce, yrt, yre = train_test_split(
             X, y_cls, y_reg, test_size=0.2, random_state=42
         )
+    return Segment(country, policy, list(X.columns), Xtr, Xte, yct, yce, yrt, yre)
 
-    # ---- Classifier ----
-    enc_cls = _fit_encoder(Xtr)
-    Mtr_cls = _encode(Xtr, enc_cls)
-    Mte_cls = _encode(Xte, enc_cls)
-
-    clf = HistGradientBoostingClassifier(max_iter=300, learning_rate=0.05)
-    clf.fit(Mtr_cls, yct)
 
+def _classifier_report(data: EncodedSegment, clf) -> str:
     try:
-        yhat = clf.predict(Mte_cls)
-        print(f"[{country}-{policy}] Classifier report:")
-        print(classification_report(yce, yhat, labels=TIERS, zero_division=0))
+        yhat = clf.predict(data.Mte)
+        return (f"[{data.country}-{data.policy}] Classifier report:\n"
+                + classification_report(data.yce, yhat, labels=TIERS, zero_division=0))
     except Exception as e:
-        print(f"[{country}-{policy}] Classifier eval skipped: {e}")
+        return f"[{data.country}-{data.policy}] Classifier eval skipped: {e}"
 
-    # ---- Regressor ----
-    enc_reg = _fit_encoder(Xtr)  # separate encoder
-    Mtr_reg = _encode(Xtr, enc_reg)
-    Mte_reg = _encode(Xte, enc_reg)
 
-    reg = HistGradientBoostingRegressor(max_iter=400, learning_rate=0.05)
-    reg.fit(Mtr_reg, yrt)
+def _regressor_report(data: EncodedSegment, reg) -> str:
+    try:
+        return f"[{data.country}-{data.policy}] Regressor R²: {r2_score(data.yre, reg.predict(data.Mte)):.3f}"
+    except Exception as e:
+        return f"[{data.country}-{data.policy}] Regressor eval skipped: {e}"
+
 
+def tuned_params(outdir: Path) -> Dict[str, Dict[str, Any]]:
+    """Per model ("clf" / "reg"), the parameters tuning chose for ``outdir``; {} when untuned."""
+    path = outdir / TUNING_NAME
+    if not path.exists():
+        return {}
     try:
-        r2 = r2_score(yre, reg.predict(Mte_reg))
-        print(f"[{country}-{policy}] Regressor R²: {r2:.3f}")
+        return json.loads(path.read_text())["chosen"]
     except Exception as e:
-        print(f"[{country}-{policy}] Regressor eval skipped: {e}")
+        print(f"Could not load {path}, using default parameters: {e}")
+        return {}
+
+
+def fit_classifier(data: EncodedSegment, params: Optional[Dict[str, Any]] = None
+                   ) -> Tuple[HistGradientBoostingClassifier, str]:
+    """Fitted classifier and its evaluation report."""
+    clf = HistGradientBoostingClassifier(**{**CLASSIFIER_PARAMS, **(params or {})})
+    clf.fit(data.Mtr, data.yct)
+    return clf, _classifier_report(data, clf)
+
+
+def fit_regressor(data: EncodedSegment, params: Optional[Dict[str, Any]] = None
+                  ) -> Tuple[HistGradientBoostingRegressor, str]:
+    """Fitted premium regressor and its evaluation line."""
+    reg = HistGradientBoostingRegressor(**{**REGRESSOR_PARAMS, **(params or {})})
+    reg.fit(data.Mtr, data.yrt)
+    return reg, _regressor_report(data, reg)
 
-    # Save artifacts
+
+def save_segment(data: EncodedSegment, clf, reg, artifacts: Path = ARTIFACTS) -> Path:
+    """Write pickles, feature lists and the model bundle for one segment.
+
+    Both models read the feature store's single encoder; it is saved under
+    both encoder names so the serving layout is unchanged.
+    """
+    outdir = artifacts / f"{data.country}_{data.policy}"
+    _save_feature_lists(outdir, data.features)
     joblib.dump(clf, outdir / "clf.pkl")
     joblib.dump(reg, outdir / "reg.pkl")
-    joblib.dump(enc_cls, outdir / "encoder_cls.pkl")
-    joblib.dump(enc_reg, outdir / "encoder_reg.pkl")
+    joblib.dump(data.encoder, outdir / "encoder_cls.pkl")
+    joblib.dump(data.encoder, outdir / "encoder_reg.pkl")
+    save_bundle(outdir, clf, reg, data.encoder, data.encoder, data.features, data.features)
+
+    # these models were trained on every applied delta: they are base rows now
+    log = load_incremental_log(outdir)
+    if any(not entry.get("folded") for entry in log):
+        save_incremental_log(outdir, [{**entry, "folded": True} for entry in log])
+    return outdir
+
+
+def _same_encoder(a: OneHotEncoder, b: OneHotEncoder) -> bool:
+    names = [list(getattr(e, "feature_names_in_", [])) for e in (a, b)]
+    return names[0] == names[1] and all(np.array_equal(x, y) for x, y in zip(a.categories_, b.categories_))
+
+
+def evaluate(data: EncodedSegment, artifacts: Path = ARTIFACTS) -> str:
+    """Reports of the saved models of ``data``'s segment on its stored test matrix."""
+    outdir = artifacts / f"{data.country}_{data.policy}"
+    if not (outdir / "clf.pkl").exists():
+        return f"[{data.country}-{data.policy}] No trained models in {outdir}"
+    if not (_same_encoder(joblib.load(outdir / "encoder_cls.pkl"), data.encoder)
+            and _same_encoder(joblib.load(outdir / "encoder_reg.pkl"), data.encoder)):
+        return f"[{data.country}-{data.policy}] Models in {outdir} were trained on other data; retrain first"
+    return "\n".join([_classifier_report(data, joblib.load(outdir / "clf.pkl")),
+                      _regressor_report(data, joblib.load(outdir / "reg.pkl"))])
+
+
+def train_one(country: str, df: pd.DataFrame, policy: str, artifacts: Path = ARTIFACTS,
+              store: FeatureStore = FEATURE_STORE) -> None:
+    print("\n" + "=" * 68)
+    print(f"🚀 Training {country.upper()} — {policy.upper()}")
+    print("=" * 68)
+
+    # Filter to rows for this (country, policy)
+    sub = df[(df["country"].str.lower() == country.lower()) &
+             (df["policytype"].str.lower() == policy.lower())]
+    seg = prepare_segment(country, policy, with_deltas(sub, artifacts / f"{country.lower()}_{policy.lower()}"))
+    if seg is None:
+        return
+    data = store.encoded(seg)
+    params = tuned_params(artifacts / f"{data.country}_{data.policy}")
+
+    clf, report = fit_classifier(data, params.get("clf"))
+    print(report)
+    reg, report = fit_regressor(data, params.get("reg"))
+    print(report)
+
+    outdir = save_segment(data, clf, reg, artifacts)
     print(f"✅ Saved to {outdir}")
 
 
 def train_all(csv_path: str, country: str) -> None:
-    csv = Path(csv_path)
-    if not csv.exists():
-        raise FileNotFoundError(f"Data not found: {csv}")
-
-    df = pd.read_csv(csv)
-    # normalize headers -> lowercase, strip spaces/underscores to your schema
-    df.columns = df.columns.str.lower().str.strip()
-    # also unify some headers that might vary across sources
-    df = df.rename(columns={
-        "policy type": "policytype",
-        "policy tier": "policytier",
-        "sum assured": "sumassured",
-        "annual premium": "annualpremium",
-        "property size sq feet": "propertysize",
-    })
-
-    required = {"country", "policytype", "policytier"}
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required columns in {csv}: {missing}")
+    df = load_dataset(csv_path)
 
     print("\n" + "#" * 72)
-    print(f"### Training for {country.upper()} from {csv} ###")
+    print(f"### Training for {country.upper()} from {csv_path} ###")
     print("#" * 72)
 
     for policy in POLICY_FEATURES.keys():
@@ -220,12 +432,147 @@ def train_all(csv_path: str, country: str) -> None:
             print(f"❌ Failed {country}-{policy}: {e}")
 
 
+# -------------------------------------------------------------------
+# Parallel training
+# -------------------------------------------------------------------
+FITTERS = {"clf": fit_classifier, "reg": fit_regressor}
+DEFAULT_PARAMS = {"clf": CLASSIFIER_PARAMS, "reg": REGRESSOR_PARAMS}
+
+# encoded segments shared with pool workers (inherited on fork; sent as
+# feature-store paths otherwise)
+_SEGMENTS: Dict[Tuple[str, str], EncodedSegment] = {}
+_LIMITER = None
+
+
+def _init_trainer(segments: Dict[Tuple[str, str], EncodedSegment], threads: int) -> None:
+    global _SEGMENTS, _LIMITER
+    _SEGMENTS = segments
+    try:
+        from threadpoolctl import threadpool_limits
+        _LIMITER = threadpool_limits(threads)
+    except ImportError:
+        _LIMITER = None
+
+
+def _run_job(key: Tuple[str, str], kind: str, params: Optional[Dict[str, Any]] = None):
+    """Fit one model of one segment; returns (key, kind, model, report, seconds)."""
+    started = time.perf_counter()
+    model, report = FITTERS[kind](_SEGMENTS[key], params)
+    return key, kind, model, report, time.perf_counter() - started
+
+
+def encode_segments(datasets: Dict[str, str], store: FeatureStore = FEATURE_STORE, artifacts: Path = ARTIFACTS
+                    ) -> Dict[Tuple[str, str], EncodedSegment]:
+    """Every (country, policy) of ``datasets`` (country -> CSV) plus its applied deltas,
+    split and encoded through ``store``."""
+    segments: Dict[Tuple[str, str], EncodedSegment] = {}
+    for country, csv_path in datasets.items():
+        frames = policy_frames(train_cache.load_dataset(csv_path, build=True), country)
+        for policy in POLICY_FEATURES:
+            rows = with_deltas(frames.get(policy, pd.DataFrame()), artifacts / f"{country.lower()}_{policy}")
+            seg = prepare_segment(country, policy, rows)
+            if seg is not None:
+                segments[seg.key] = store.encoded(seg)
+    return segments
+
+
+def train_parallel(datasets: Dict[str, str], cpus: Optional[int] = None,
+                   artifacts: Path = ARTIFACTS, store: FeatureStore = FEATURE_STORE) -> List[Dict]:
+    """Train every (country, policy) x (classifier, regressor) on a process pool.
+
+    Each CSV is loaded once (through its typed cache, built when missing or
+    stale) and split once. Each segment is encoded once through the feature
+    store, whose memory-mapped matrices the workers read. Jobs run longest
+    first (rows x boosting iterations) under a budget of ``cpus`` cores: one
+    process per job slot and ``cpus // workers`` OpenMP threads each. Models
+    are identical to train_all's, including a segment's tuned parameters.
+    Returns one timing record per job.
+    """
+    started = time.perf_counter()
+    segments = encode_segments(datasets, store, artifacts)
+    loaded = time.perf_counter() - started
+    rows = {key: data.meta["shapes"]["Mtr"][0] for key, data in segments.items()}
+    params = {key: tuned_params(artifacts / f"{key[0]}_{key[1]}") for key in segments}
+
+    def cost(job):
+        key, kind = job
+        return rows[key] * {**DEFAULT_PARAMS[kind], **params[key].get(kind, {})}["max_iter"]
+
+    jobs = sorted(((key, kind) for key in segments for kind in FITTERS), key=cost, reverse=True)
+    cpus = cpus or os.cpu_count() or 1
+    workers = max(1, min(cpus, len(jobs)))
+    threads = max(1, cpus // workers)
+    print(f"Training {len(jobs)} models from {len(segments)} segments on {workers} processes "
+          f"x {threads} threads (data loaded in {loaded:.1f}s)")
+
+    fitted: Dict[Tuple[str, str], Dict[str, Any]] = {key: {} for key in segments}
+    timings: List[Dict] = []
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_trainer,
+                             initargs=(segments, threads)) as pool:
+        futures = [pool.submit(_run_job, key, kind, params[key].get(kind)) for key, kind in jobs]
+        for future in as_completed(futures):
+            try:
+                key, kind, model, report, seconds = future.result()
+            except Exception as e:
+                print(f"❌ Training job failed: {e}")
+                continue
+            print(report)
+            fitted[key][kind] = model
+            timings.append({"country": key[0], "policy": key[1], "model": kind,
+                            "rows": rows[key], "seconds": round(seconds, 2)})
+            if len(fitted[key]) == len(FITTERS):
+                outdir = save_segment(segments[key], fitted[key]["clf"], fitted[key]["reg"], artifacts)
+                print(f"✅ Saved to {outdir}")
+
+    wall = time.perf_counter() - started
+    print("\n" + "#" * 72)
+    print(f"{'country':<10} {'policy':<8} {'model':<5} {'rows':>6} {'seconds':>8}")
+    for t in sorted(timings, key=lambda t: -t["seconds"]):
+        print(f"{t['country']:<10} {t['policy']:<8} {t['model']:<5} {t['rows']:>6} {t['seconds']:>8.2f}")
+    slowest = max((t["seconds"] for t in timings), default=0.0)
+    total = sum(t["seconds"] for t in timings)
+    print(f"Wall {wall:.1f}s for {total:.1f}s of fitting (slowest job {slowest:.1f}s)")
+    return timings
+
 
 # Main
 # -------------------------------------------------------------------
 if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Train (or export) recommendation models")
+    ap.add_argument("--export-only", action="store_true",
+                    help="skip training; write model bundles from the existing pickles")
+    ap.add_argument("--cpus", type=int, default=None,
+                    help="CPU budget for parallel training (default: all cores)")
+    ap.add_argument("--sequential", action="store_true",
+                    help="train one model at a time in this process")
+    ap.add_argument("--evaluate", action="store_true",
+                    help="skip training; score the saved models on the feature store's test matrices")
+    args = ap.parse_args()
+
     base = Path(__file__).resolve().parents[1].parent / "processed"
     # OR simply: Path(__file__).resolve().parents[2] / "processed"
-
-    train_all(str(base / "standardized_india.csv"), "india")
-    train_all(str(base / "standardized_australia.csv"), "australia")
+    datasets = {
+        "india": str(base / "standardized_india.csv"),
+        "australia": str(base / "standardized_australia.csv"),
+    }
+
+    if args.export_only:
+        export_all()
+    elif args.evaluate:
+        for country, csv_path in datasets.items():
+            frames = policy_frames(load_dataset(csv_path), country)
+            for policy in POLICY_FEATURES:
+                rows = with_deltas(frames.get(policy, pd.DataFrame()), ARTIFACTS / f"{country}_{policy}",
+                                   folded_deltas(ARTIFACTS / f"{country}_{policy}"))
+                seg = prepare_segment(country, policy, rows)
+                if seg is not None:
+                    print(evaluate(FEATURE_STORE.encoded(seg)))
+    else:
+        if args.sequential:
+            for country, csv_path in datasets.items():
+                train_all(csv_path, country)
+        else:
+            train_parallel(datasets, cpus=args.cpus)
@@ -0,0 +1,185 @@
+# scripts/recommendation/train_cache.py
+"""Typed, memory-mapped cache of the standardized training CSVs.
+
+``build_cache`` parses a CSV once, normalizes its headers and stores it as an
+uncompressed Arrow IPC file next to it (``standardized_india.arrow``):
+
+* numeric columns keep the dtypes the CSV parser chose, and string columns
+  become pandas categoricals (Arrow dictionaries);
+* rows are stably sorted by (country, policytype). The row range of each
+  pair is stored in the file metadata, so a segment is a slice and needs
+  no string comparisons. The original row labels are kept as the index.
+
+``load_dataset`` memory-maps the cache when it is current, that is when the
+CSV size and mtime match the ones recorded. Otherwise it parses the CSV.
+Either way it returns the same rows. Training and the evaluation scripts
+(grid, cascade) load their data through it.
+
+Usage::
+
+    python -m scripts.recommendation.train_cache      # (re)build all caches
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CACHE_SUFFIX = ".arrow"
+CACHE_FORMAT = 1
+_META_KEY = b"train_cache"
+
+# header spellings used by some sources -> training schema
+HEADER_ALIASES = {
+    "policy type": "policytype",
+    "policy tier": "policytier",
+    "sum assured": "sumassured",
+    "annual premium": "annualpremium",
+    "property size sq feet": "propertysize",
+}
+REQUIRED_COLUMNS = ("country", "policytype", "policytier")
+
+Partitions = Dict[Tuple[str, str], Tuple[int, int]]
+
+
+def read_csv(csv_path) -> pd.DataFrame:
+    """Parse a standardized CSV with headers normalized to the training schema."""
+    csv = Path(csv_path)
+    if not csv.exists():
+        raise FileNotFoundError(f"Data not found: {csv}")
+
+    return normalize_columns(pd.read_csv(csv), csv)
+
+
+def normalize_columns(df: pd.DataFrame, source) -> pd.DataFrame:
+    """``df`` with headers in the training schema; raises when required ones are missing."""
+    # normalize headers -> lowercase, strip spaces/underscores to your schema
+    df.columns = df.columns.str.lower().str.strip()
+    # also unify some headers that might vary across sources
+    df = df.rename(columns=HEADER_ALIASES)
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns in {source}: {missing}")
+    return df
+
+
+def cache_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(CACHE_SUFFIX)
+
+
+def _source_stamp(csv: Path) -> Dict[str, int]:
+    st = csv.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _segment_keys(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    return (df["country"].astype(str).str.lower().to_numpy(),
+            df["policytype"].astype(str).str.lower().to_numpy())
+
+
+def build_cache(csv_path, target: Optional[Path] = None) -> Path:
+    """Write the typed, segment-sorted cache of ``csv_path``; returns its path."""
+    csv = Path(csv_path)
+    target = Path(target) if target is not None else cache_path(csv)
+    stamp = _source_stamp(csv)
+    df = read_csv(csv)
+
+    country, policy = _segment_keys(df)
+    order = np.lexsort((policy, country))  # stable: rows keep their order within a segment
+    df = df.iloc[order]
+    country, policy = country[order], policy[order]
+
+    partitions = []
+    starts = np.flatnonzero(np.r_[True, (country[1:] != country[:-1]) | (policy[1:] != policy[:-1])])
+    for start, stop in zip(starts, np.r_[starts[1:], len(df)]):
+        partitions.append([str(country[start]), str(policy[start]), int(start), int(stop)])
+
+    for c in df.columns:
+        if df[c].dtype == object:
+            df[c] = df[c].astype("category")
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    meta = {"format": CACHE_FORMAT, "source": csv.name, **stamp, "partitions": partitions}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta)})
+
+    tmp = target.with_name(target.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, target)
+    return target
+
+
+def load_cache(csv_path) -> Optional[pd.DataFrame]:
+    """The memory-mapped cache of ``csv_path``, or None when missing or stale."""
+    csv, path = Path(csv_path), cache_path(csv_path)
+    if not path.exists():
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        meta = json.loads(table.schema.metadata[_META_KEY])
+    except Exception as e:
+        print(f"Could not read {path}: {e}")
+        return None
+    if meta.get("format") != CACHE_FORMAT or (csv.exists() and
+                                              _source_stamp(csv) != {"mtime_ns": meta["mtime_ns"],
+                                                                     "size": meta["size"]}):
+        print(f"Ignoring stale {path}; rebuild it with python -m scripts.recommendation.train_cache")
+        return None
+
+    df = table.to_pandas()
+    df.attrs["partitions"] = {(c, p): (start, stop) for c, p, start, stop in meta["partitions"]}
+    df.attrs["rows"] = len(df)  # partitions describe this frame, not slices of it
+    return df
+
+
+def load_dataset(csv_path, build: bool = False) -> pd.DataFrame:
+    """Training rows of ``csv_path``: from the cache when current, else parsed.
+
+    With ``build``, a missing or stale cache is (re)written first.
+    """
+    df = load_cache(csv_path)
+    if df is None and build:
+        build_cache(csv_path)
+        df = load_cache(csv_path)
+    return df if df is not None else read_csv(csv_path)
+
+
+def segment(df: pd.DataFrame, country: str, policy: str) -> pd.DataFrame:
+    """Rows of one (country, policy); a slice when ``df`` came from the cache."""
+    partitions: Optional[Partitions] = df.attrs.get("partitions")
+    if partitions is not None and df.attrs.get("rows") == len(df):
+        start, stop = partitions.get((country.lower(), policy.lower()), (0, 0))
+        return df.iloc[start:stop]
+    return df[(df["country"].str.lower() == country.lower()) & (df["policytype"].str.lower() == policy.lower())]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    processed = Path(__file__).resolve().parents[2] / "processed"
+    ap = argparse.ArgumentParser(description="Build typed Arrow caches of the standardized training CSVs")
+    ap.add_argument("csv", nargs="*", help="CSV files (default: processed/standardized_*.csv)")
+    args = ap.parse_args(argv)
+
+    for csv in args.csv or sorted(processed.glob("standardized_*.csv")):
+        t0 = time.perf_counter()
+        read_csv(csv)
+        t1 = time.perf_counter()
+        target = build_cache(csv)
+        t2 = time.perf_counter()
+        df = load_cache(csv)
+        t3 = time.perf_counter()
+        print(f"{csv} -> {target} ({len(df):,} rows, {len(df.attrs['partitions'])} segments, "
+              f"{target.stat().st_size / 1e6:.1f} MB); parse {1000 * (t1 - t0):.1f} ms, "
+              f"build {1000 * (t2 - t1):.1f} ms, mapped load {1000 * (t3 - t2):.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
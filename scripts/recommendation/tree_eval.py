@@ -0,0 +1,200 @@
+# scripts/recommendation/tree_eval.py
+"""Pure-NumPy evaluator for flattened HistGradientBoosting models.
+
+``train.export_flat_trees`` writes every tree of a fitted model into one set
+of contiguous node arrays, stored in the artifact's model bundle. This module
+scores those arrays without importing sklearn, so serving workers skip the
+per-call validation and thread-pool setup of ``HistGradientBoosting*.predict``.
+
+Trees are stored iteration-major (tree ``t`` belongs to iteration
+``t // K`` and output ``t % K``) and leaf values are summed in that order,
+which reproduces sklearn's raw predictions bit for bit.
+
+The win is per-call overhead: a single row scores roughly 10x faster than
+through sklearn. For large batches sklearn's compiled tree walk is still
+faster, so batch jobs can ask the registry for the pickled models instead.
+
+``score_unique`` speeds up large batches for either kind of model: rows that
+fall between the same pair of split thresholds on every feature take the same
+path through every tree, so only one representative per group is scored.
+"""
+from __future__ import annotations
+
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+CHUNK_ROWS = 2048
+
+ARRAY_KEYS = ("feature", "threshold", "missing_left", "left", "right",
+              "is_leaf", "value", "roots", "baseline")
+
+
+class FlatTreeModel:
+    """Drop-in for the predict/predict_proba surface of a fitted HGB model."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.missing_left = arrays["missing_left"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.is_leaf = arrays["is_leaf"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.baseline = arrays["baseline"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.link = str(arrays["link"])
+
+        self.n_trees_per_iteration_ = len(self.baseline)
+        self.n_iter_ = len(self.roots) // self.n_trees_per_iteration_
+
+        classes = arrays.get("classes")
+        self.classes_ = np.array(classes.tolist(), dtype=object) if classes is not None else None
+
+        for name in ARRAY_KEYS:
+            arr = getattr(self, name)
+            if arr.flags.writeable:
+                arr.flags.writeable = False
+
+    # ---------------------
+    # Raw scores
+    # ---------------------
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf index reached by every (row, tree) pair, shape (n, n_trees).
+
+        All (row, tree) walks advance one level per step, for at most
+        ``max_depth`` steps (the deepest node's depth, so every walk ends on
+        a leaf). Walks that reached a leaf are dropped from the active set so
+        shallow trees stop early.
+        """
+        n, n_features = X.shape
+        n_trees = len(self.roots)
+        node = np.tile(self.roots.astype(np.intp), n)
+        row_offset = np.repeat(np.arange(n, dtype=np.intp) * n_features, n_trees)
+        Xf = X.ravel()
+
+        active = np.flatnonzero(~self.is_leaf[node])
+        for _ in range(self.max_depth):
+            if not active.size:
+                break
+            nd = node[active]
+            x = Xf[row_offset[active] + self.feature[nd]]
+            go_left = (x <= self.threshold[nd]) | (np.isnan(x) & self.missing_left[nd])
+            nd = np.where(go_left, self.left[nd], self.right[nd])
+            node[active] = nd
+            active = active[~self.is_leaf[nd]]
+        return node.reshape(n, n_trees)
+
+    def raw_predict(self, X) -> np.ndarray:
+        """Baseline plus leaf values, shape (n, n_trees_per_iteration)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features but this model was trained with {self.n_features_in_} features."
+            )
+        n, k = X.shape[0], self.n_trees_per_iteration_
+        out = np.empty((n, k))
+        # walk (rows x trees) in chunks so temporaries stay bounded
+        for start in range(0, n, CHUNK_ROWS):
+            Xc = X[start:start + CHUNK_ROWS]
+            leaf_values = self.value[self._leaves(Xc)].reshape(len(Xc), self.n_iter_, k)
+
+            # cumsum adds strictly left to right, same order as sklearn's += loop
+            terms = np.empty((len(Xc), self.n_iter_ + 1, k))
+            terms[:, 0, :] = self.baseline
+            terms[:, 1:, :] = leaf_values
+            out[start:start + CHUNK_ROWS] = np.cumsum(terms, axis=1)[:, -1, :]
+        return out
+
+    # ---------------------
+    # sklearn-compatible API
+    # ---------------------
+    def predict_proba(self, X) -> np.ndarray:
+        raw = self.raw_predict(X)
+        if self.link == "softmax":
+            e = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        if self.link == "sigmoid":
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        raise AttributeError("predict_proba is only available for classifiers")
+
+    def predict(self, X) -> np.ndarray:
+        if self.classes_ is not None:
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        raw = self.raw_predict(X).ravel()
+        if self.link == "log":
+            return np.exp(raw)
+        return raw
+
+
+# ---------------------
+# Batch deduplication
+# ---------------------
+_SPLIT_POINTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def split_points(model) -> Optional[List[np.ndarray]]:
+    """Sorted distinct split thresholds per input feature.
+
+    Works for FlatTreeModel and fitted sklearn HistGradientBoosting models;
+    returns None when the model has categorical splits. Cached per model.
+    """
+    try:
+        return _SPLIT_POINTS[model]
+    except KeyError:
+        pass
+
+    if isinstance(model, FlatTreeModel):
+        internal = ~model.is_leaf
+        feature, threshold = model.feature[internal], model.threshold[internal]
+    else:
+        nodes = np.concatenate([p.nodes for predictors in model._predictors for p in predictors])
+        internal = ~nodes["is_leaf"].astype(bool)
+        if nodes["is_categorical"][internal].any():
+            _SPLIT_POINTS[model] = None
+            return None
+        feature, threshold = nodes["feature_idx"][internal], nodes["num_threshold"][internal]
+
+    order = np.argsort(feature, kind="stable")
+    feature, threshold = feature[order], threshold[order]
+    bounds = np.searchsorted(feature, np.arange(model.n_features_in_ + 1))
+    points = [np.unique(threshold[bounds[j]:bounds[j + 1]]) for j in range(model.n_features_in_)]
+    _SPLIT_POINTS[model] = points
+    return points
+
+
+def unique_rows(X: np.ndarray, points: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Group rows that every tree routes identically.
+
+    Returns (representatives, inverse): scoring ``X[representatives]`` and
+    indexing the result with ``inverse`` equals scoring ``X`` row by row.
+    """
+    used = [j for j, p in enumerate(points) if len(p)]
+    if not used:
+        return np.zeros(1, dtype=np.intp), np.zeros(len(X), dtype=np.intp)
+
+    # interval index of each value among the feature's thresholds; NaN
+    # gets its own slot since it follows missing_left instead
+    keys = np.empty((len(X), len(used)), dtype=np.uint16)
+    for c, j in enumerate(used):
+        col = X[:, j]
+        k = np.searchsorted(points[j], col, side="left")
+        k[np.isnan(col)] = len(points[j]) + 1
+        keys[:, c] = k
+    rows = keys.view(np.dtype((np.void, keys.itemsize * keys.shape[1]))).ravel()
+    _, representatives, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return representatives, inverse.ravel()
+
+
+def score_unique(model, X: np.ndarray, method: str = "predict") -> np.ndarray:
+    """``getattr(model, method)(X)``, scoring each routing-equivalent group once."""
+    X = np.asarray(X, dtype=np.float64)
+    points = split_points(model) if len(X) > 1 else None
+    if points is None:
+        return getattr(model, method)(X)
+    representatives, inverse = unique_rows(X, points)
+    return getattr(model, method)(X[representatives])[inverse]
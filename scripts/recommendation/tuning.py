@@ -0,0 +1,306 @@
+# scripts/recommendation/tuning.py
+"""Successive-halving search over HistGradientBoosting parameters per segment.
+
+train.py fits every (country, policy) with the same parameters (300 / 400
+iterations at learning rate 0.05). ``tune`` looks for parameters that score
+at least as well and are cheaper to serve. It searches per segment and per
+model (classifier, regressor):
+
+* ``candidates`` configurations are drawn from ``SEARCH_SPACE``, all with
+  early stopping. The current defaults are added as the baseline.
+* Successive halving: each rung fits the surviving candidates on ``eta``
+  times more rows of the training split than the last, with the full split
+  in the final rung. It keeps the best ``1 / eta``. A candidate is scored on
+  a validation slice of the training split (accuracy / R²) and on the
+  single-row latency of its flattened trees, which is what serving runs
+  (tree_eval.FlatTreeModel). Survivors are picked by Pareto rank, then by
+  score. The baseline always survives, so every rung compares against it.
+* The jobs of one rung, for all segments, share one process pool with a
+  budget of ``cpus`` cores. The search stops after ``budget`` seconds of
+  wall clock: pending jobs are cancelled and each segment decides on the
+  last rung it completed.
+
+The latencies of the last rung are measured again, one model at a time.
+From its Pareto front the cheapest configuration that scores at least as
+well as the baseline and is faster is chosen; if there is none, the
+baseline is kept. The choice is written to ``tuning.json`` in the segment's
+artifact directory, together with the front and the holdout scores of both
+configurations. train.py fits with those parameters from then on.
+
+Usage::
+
+    python -m scripts.recommendation.tuning --budget 900
+    python -m scripts.recommendation.train          # retrain with the chosen parameters
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.metrics import accuracy_score, r2_score
+
+from . import train
+from .feature_store import FEATURE_STORE, FeatureStore
+from .train import ARTIFACTS, DEFAULT_PARAMS, TUNING_NAME, encode_segments, export_flat_trees
+from .tree_eval import FlatTreeModel
+
+SEARCH_SPACE: Dict[str, List[Any]] = {
+    "learning_rate": [0.03, 0.05, 0.1, 0.2],
+    "max_iter": [100, 200, 300, 400, 600],
+    "max_leaf_nodes": [7, 15, 31, 63],
+    "max_depth": [None, 3, 5, 8],
+    "min_samples_leaf": [5, 10, 20, 40],
+    "l2_regularization": [0.0, 0.1, 1.0],
+}
+EARLY_STOPPING: Dict[str, Any] = {"early_stopping": True, "validation_fraction": 0.1,
+                                  "n_iter_no_change": 10, "random_state": 42}
+ESTIMATORS = {"clf": HistGradientBoostingClassifier, "reg": HistGradientBoostingRegressor}
+VALIDATION_FRACTION = 0.2
+LATENCY_CALLS = 200
+
+Study = Tuple[Tuple[str, str], str]  # ((country, policy), "clf" | "reg")
+
+
+# ---------------------
+# Search space
+# ---------------------
+def sample_candidates(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``n`` distinct early-stopping configurations drawn from SEARCH_SPACE."""
+    rng = np.random.default_rng(seed)
+    seen, out = set(), []
+    for _ in range(100 * n):
+        if len(out) == n:
+            break
+        params = {name: values[int(rng.integers(len(values)))] for name, values in SEARCH_SPACE.items()}
+        tag = json.dumps(params, sort_keys=True)
+        if tag not in seen:
+            seen.add(tag)
+            out.append({**params, **EARLY_STOPPING})
+    return out
+
+
+def rung_rows(n_rows: int, n_candidates: int, eta: int, min_rows: int) -> List[int]:
+    """Training rows per rung: ``eta`` times more each rung, every row in the last."""
+    rungs = max(1, int(math.log(max(n_candidates, 1), eta) + 1e-9))
+    return [min(n_rows, max(min_rows, math.ceil(n_rows / eta ** (rungs - 1 - r)))) for r in range(rungs)]
+
+
+# ---------------------
+# Scoring
+# ---------------------
+def _validation_split(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.random.default_rng(0).permutation(n)
+    cut = int(n * VALIDATION_FRACTION)
+    return order[cut:], order[:cut]
+
+
+def _score(kind: str, model, X: np.ndarray, y) -> float:
+    if kind == "clf":
+        return float(accuracy_score(y, model.predict(X)))
+    return float(r2_score(y, model.predict(X)))
+
+
+def single_row_latency(model, row: np.ndarray, calls: int = LATENCY_CALLS) -> float:
+    """Median microseconds to score one row with the flattened trees serving uses."""
+    flat = FlatTreeModel(export_flat_trees(model))
+    score = flat.predict_proba if flat.classes_ is not None else flat.predict
+    row = np.ascontiguousarray(row, dtype=np.float64).reshape(1, -1)
+    times = np.empty(calls)
+    for i in range(calls):
+        started = time.perf_counter()
+        score(row)
+        times[i] = time.perf_counter() - started
+    return round(float(np.median(times)) * 1e6, 1)
+
+
+def _fit_candidate(key: Tuple[str, str], kind: str, params: Dict[str, Any], rows: int,
+                   final: bool = False) -> Dict[str, Any]:
+    """Fit one configuration on the first ``rows`` training rows and score it (runs in a worker).
+
+    In the final rung the holdout score and the model (for timing it alone) come back too.
+    """
+    data = train._SEGMENTS[key]
+    y = data.yct if kind == "clf" else data.yrt
+    fit, val = _validation_split(len(y))
+    fit = fit[:rows]
+    result: Dict[str, Any] = {"key": key, "kind": kind, "params": params, "rows": int(len(fit))}
+    started = time.perf_counter()
+    try:
+        model = ESTIMATORS[kind](**params).fit(data.Mtr[fit], y[fit])
+    except ValueError as e:  # e.g. a class too rare for the early-stopping split
+        return {**result, "error": str(e), "score": -math.inf, "latency_us": math.inf}
+    result.update({"score": _score(kind, model, data.Mtr[val], y[val]),
+                   "latency_us": single_row_latency(model, data.Mtr[val[:1]]),
+                   "n_iter": int(model.n_iter_),
+                   "fit_seconds": round(time.perf_counter() - started, 3)})
+    if final:
+        result["holdout"] = round(_score(kind, model, data.Mte, data.yce if kind == "clf" else data.yre), 6)
+        result["model"] = model
+    return result
+
+
+# ---------------------
+# Pareto selection
+# ---------------------
+def _dominates(a: Dict, b: Dict) -> bool:
+    return (a["score"] >= b["score"] and a["latency_us"] <= b["latency_us"]
+            and (a["score"] > b["score"] or a["latency_us"] < b["latency_us"]))
+
+
+def pareto_front(results: List[Dict]) -> List[Dict]:
+    """Results no other result beats on both score (higher) and latency (lower)."""
+    ok = [r for r in results if "error" not in r]
+    return [r for r in ok if not any(_dominates(o, r) for o in ok)]
+
+
+def pareto_ranks(results: List[Dict]) -> List[float]:
+    """0 for the front, 1 for the front of the rest, ...; inf for failed fits."""
+    ranks = [math.inf] * len(results)
+    left = [i for i, r in enumerate(results) if "error" not in r]
+    rank = 0
+    while left:
+        front = [i for i in left if not any(_dominates(results[j], results[i]) for j in left)]
+        for i in front:
+            ranks[i] = rank
+        left = [i for i in left if i not in front]
+        rank += 1
+    return ranks
+
+
+def survivors(results: List[Dict], baseline: Dict[str, Any], eta: int) -> List[Dict[str, Any]]:
+    """Parameters of the best ``1 / eta`` of the candidates, plus the baseline."""
+    ranks = pareto_ranks(results)
+    ranked = sorted((i for i, r in enumerate(results) if r["params"] != baseline),
+                    key=lambda i: (ranks[i], -results[i]["score"], results[i]["latency_us"]))
+    keep = [results[i]["params"] for i in ranked[:math.ceil(len(ranked) / eta)] if ranks[i] < math.inf]
+    return [baseline] + keep
+
+
+def choose(results: List[Dict], baseline: Dict[str, Any]) -> Dict:
+    """The cheapest front member that scores at least the baseline and is faster, else the baseline."""
+    base = next(r for r in results if r["params"] == baseline)
+    better = [r for r in pareto_front(results)
+              if r["params"] != baseline and r["score"] >= base["score"] and r["latency_us"] < base["latency_us"]]
+    return min(better, key=lambda r: (r["latency_us"], -r["score"])) if better else base
+
+
+# ---------------------
+# Search
+# ---------------------
+def _summary(result: Dict) -> Dict[str, Any]:
+    return {k: result[k] for k in ("params", "rows", "score", "latency_us", "n_iter", "holdout") if k in result}
+
+
+def _decide(study: Study, results: List[Dict], baseline: Dict[str, Any], segments) -> Dict:
+    row = segments[study[0]].Mte[:1]
+    for r in results:
+        if "model" in r:
+            # timed one at a time, without the contention of a busy pool
+            r["latency_us"] = single_row_latency(r.pop("model"), row)
+    chosen, base = choose(results, baseline), next(r for r in results if r["params"] == baseline)
+    front = sorted(pareto_front(results), key=lambda r: r["latency_us"])
+    return {"rows": chosen["rows"], "baseline": _summary(base), "chosen": _summary(chosen),
+            "front": [_summary(r) for r in front]}
+
+
+def tune(datasets: Dict[str, str], cpus: Optional[int] = None, budget: float = 600.0, candidates: int = 27,
+         eta: int = 3, min_rows: int = 300, seed: int = 0, artifacts: Path = ARTIFACTS,
+         store: FeatureStore = FEATURE_STORE, log=print) -> Dict[Tuple[str, str], Dict]:
+    """Search every segment of ``datasets``; writes and returns each segment's tuning report."""
+    deadline = time.monotonic() + budget
+    segments = encode_segments(datasets, store, artifacts)
+    pool_candidates = sample_candidates(candidates, seed)
+
+    baselines: Dict[Study, Dict[str, Any]] = {}
+    alive: Dict[Study, List[Dict[str, Any]]] = {}
+    schedule: Dict[Study, List[int]] = {}
+    last: Dict[Study, List[Dict]] = {}
+    for key, data in segments.items():
+        n_fit = len(_validation_split(data.meta["shapes"]["Mtr"][0])[0])
+        for kind in ESTIMATORS:
+            study = (key, kind)
+            baselines[study] = dict(DEFAULT_PARAMS[kind])
+            alive[study] = [baselines[study]] + pool_candidates
+            schedule[study] = rung_rows(n_fit, len(pool_candidates), eta, min_rows)
+
+    cpus = cpus or os.cpu_count() or 1
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    pool = ProcessPoolExecutor(max_workers=cpus, mp_context=ctx, initializer=train._init_trainer,
+                               initargs=(segments, 1))
+    try:
+        for rung in range(max((len(rows) for rows in schedule.values()), default=0)):
+            studies = [s for s in alive if rung < len(schedule[s])]
+            futures = {pool.submit(_fit_candidate, s[0], s[1], params, schedule[s][rung],
+                                   rung == len(schedule[s]) - 1): s
+                       for s in studies for params in alive[s]}
+            log(f"Rung {rung}: {len(futures)} fits over {len(studies)} models")
+            results: Dict[Study, List[Dict]] = {s: [] for s in studies}
+            try:
+                for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0.0)):
+                    results[futures[future]].append(future.result())
+            except TimeoutError:
+                log(f"Budget of {budget:.0f}s spent in rung {rung}; deciding on the rungs completed")
+                break
+            for s in studies:
+                last[s] = results[s]
+                alive[s] = survivors(results[s], baselines[s], eta)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    reports: Dict[Tuple[str, str], Dict] = {}
+    for study, results in sorted(last.items()):
+        key, kind = study
+        report = reports.setdefault(key, {"searched": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                          "budget_s": budget, "chosen": {}})
+        report[kind] = _decide(study, results, baselines[study], segments)
+        report["chosen"][kind] = report[kind]["chosen"]["params"]
+
+    for (country, policy), report in sorted(reports.items()):
+        outdir = artifacts / f"{country}_{policy}"
+        outdir.mkdir(parents=True, exist_ok=True)
+        tmp = outdir / (TUNING_NAME + ".tmp")
+        tmp.write_text(json.dumps(report, indent=2))
+        os.replace(tmp, outdir / TUNING_NAME)
+        for kind in ESTIMATORS:
+            if kind in report:
+                b, c = report[kind]["baseline"], report[kind]["chosen"]
+                holdout = (f"holdout {b['holdout']:.4f} -> {c['holdout']:.4f}, "
+                           if "holdout" in b and "holdout" in c else "")
+                log(f"{country}-{policy} {kind}: score {b['score']:.4f} -> {c['score']:.4f}, {holdout}"
+                    f"{b['latency_us']:.0f} -> {c['latency_us']:.0f} us/row, "
+                    f"{b.get('n_iter')} -> {c.get('n_iter')} iterations")
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Successive-halving parameter search per segment")
+    ap.add_argument("--country", action="append", help="only these countries (repeatable)")
+    ap.add_argument("--cpus", type=int, default=None, help="CPU budget (default: all cores)")
+    ap.add_argument("--budget", type=float, default=600.0, help="wall-clock budget in seconds (default 600)")
+    ap.add_argument("--candidates", type=int, default=27, help="configurations per model (default 27)")
+    ap.add_argument("--eta", type=int, default=3, help="halving rate (default 3)")
+    ap.add_argument("--min-rows", type=int, default=300, help="training rows in the first rung (default 300)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    processed = ARTIFACTS.parent / "processed"
+    datasets = {c: str(processed / f"standardized_{c}.csv") for c in (args.country or ["india", "australia"])}
+    started = time.perf_counter()
+    tune(datasets, cpus=args.cpus, budget=args.budget, candidates=args.candidates, eta=args.eta,
+         min_rows=args.min_rows, seed=args.seed)
+    print(f"Tuned in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
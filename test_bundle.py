@@ -0,0 +1,59 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from scripts.recommendation.bundle import read_bundle, write_bundle
+from scripts.recommendation.common import ARTIFACTS
+from scripts.recommendation.registry import load_bundle
+from scripts.recommendation.train import export_all
+
+
+def test_bundle_round_trip(tmp_path):
+    arrays = {
+        "ints": np.arange(7, dtype=np.int32),
+        "floats": np.linspace(0, 1, 5).reshape(5, 1),
+        "names": np.array(["basic", "gold"]),
+        "scalar": np.array(3),
+    }
+    version = write_bundle(tmp_path / "x.bundle", arrays, {"k": "v"})
+    header, back = read_bundle(tmp_path / "x.bundle")
+
+    assert header["version"] == version
+    assert header["meta"] == {"k": "v"}
+    for k, v in arrays.items():
+        assert back[k].shape == v.shape
+        np.testing.assert_array_equal(back[k], v)
+        assert not back[k].flags.writeable
+        assert back[k].ctypes.data % 64 == 0
+
+
+NAMES = ["india_health", "australia_travel", "india_vehicle"]
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """Copies of the trained artifact dirs, exported there; the real ones stay untouched."""
+    artifacts = tmp_path_factory.mktemp("artifacts")
+    for name in NAMES:
+        shutil.copytree(ARTIFACTS / name, artifacts / name, ignore=shutil.ignore_patterns("model.bundle"))
+    export_all(artifacts)
+    return artifacts
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_bundle_file_scores_like_pickles(exported, name):
+    country, policy = name.split("_", 1)
+    assert (exported / name / "model.bundle").exists()
+    mapped = load_bundle(exported / name, country, policy)
+    pickled = load_bundle(exported / name, country, policy, prefer_flat=False)
+
+    assert mapped.enc_cls is None and pickled.enc_cls is not None
+    assert mapped.row_cls.width == pickled.row_cls.width
+
+    rng = np.random.default_rng(0)
+    X = (rng.random((200, mapped.row_cls.width)) > 0.5).astype(float)
+    X[:, 0] = rng.integers(18, 80, 200)
+    X[:, 1] = rng.lognormal(13, 1.5, 200)
+    np.testing.assert_array_equal(mapped.clf.predict_proba(X), pickled.clf.predict_proba(X))
+    np.testing.assert_array_equal(mapped.reg.predict(X), pickled.reg.predict(X))
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.recommendation import cascade
+from scripts.recommendation.cache import PREDICTION_CACHE
+from scripts.recommendation.cascade import CASCADE, AGREEMENT_NAME, calibrate, load_agreement, save_agreement
+from scripts.recommendation.predict import _score_row, predict, predict_many
+from scripts.recommendation.registry import get_bundle
+from scripts.recommendation.rule_engine import RULES
+from scripts.recommendation.score_book import standardize_columns
+
+# India vehicle: luxury cars hit branch #1 (Standard), 2-wheelers branch #0 (Basic)
+LUXURY = {"age": 40, "priceofvehicle": 2500000, "ageofvehicle": 2, "typeofvehicle": "luxury"}
+BIKE = {"age": 30, "priceofvehicle": 90000, "ageofvehicle": 1, "typeofvehicle": "2wheeler"}
+
+
+@pytest.fixture(scope="module")
+def table():
+    df = standardize_columns(pd.read_csv("processed/standardized_india.csv"))
+    return calibrate("india", "vehicle", df[df["policytype"].str.lower() == "vehicle"])
+
+
+@pytest.fixture
+def enabled(table, monkeypatch):
+    monkeypatch.setattr(cascade, "load_agreement", lambda path: table)
+    monkeypatch.setattr(CASCADE, "enabled", True)
+    CASCADE.clear()
+    PREDICTION_CACHE.clear()
+    yield CASCADE
+    CASCADE.clear()
+    PREDICTION_CACHE.clear()
+
+
+def test_calibration_counts_every_row(table):
+    assert table["rules_digest"] == RULES.get().digest
+    assert sum(b["rows"] for b in table["branches"].values()) == 2000
+    for b in table["branches"].values():
+        assert 0 <= b["agree"] <= b["rows"]
+
+
+def test_trusted_branch_skips_the_classifier(enabled):
+    rule = RULES.get().rules[("india", "vehicle")]
+    trusted = enabled.trusted_branches(get_bundle("india", "vehicle"), RULES.get())
+    assert trusted and all(rule.branch_tiers[b] >= 0 for b in trusted)
+
+    result = predict("INDIA", "vehicle", LUXURY)
+    assert result["decided_by"] == "rules"
+    assert max(result["confidence"].values()) == 1.0
+
+    classes, probs, premiums = _score_row(get_bundle("india", "vehicle"), {
+        **LUXURY, "country": "india", "policytype": "vehicle"})
+    assert result["recommended_tier"] == classes[int(np.argmax(probs))]
+    expected = {t: round(float(v), 2) for t, v in zip(["Basic", "Standard", "Gold", "Premium"], premiums)}
+    assert result["all_tiers"] == expected
+
+    stats = enabled.stats()["segments"]["india-vehicle"]
+    assert stats["requests"] == 1 and stats["short_circuits"] == 1
+
+
+def test_untrusted_rows_and_batches_use_the_model(enabled, monkeypatch):
+    monkeypatch.setattr(enabled, "min_agreement", 1.01)
+    result = predict("INDIA", "vehicle", BIKE)
+    assert "decided_by" not in result
+
+    PREDICTION_CACHE.clear()
+    enabled.clear()
+    monkeypatch.setattr(enabled, "min_agreement", 0.98)
+    many = predict_many("INDIA", "vehicle", [LUXURY, BIKE, dict(LUXURY, age=41)])
+    assert many[0]["decided_by"] == "rules" and many[2]["decided_by"] == "rules"
+    stats = enabled.stats()["segments"]["india-vehicle"]
+    assert stats["requests"] == 3
+    assert stats["short_circuit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_stale_or_foreign_tables_are_ignored(table, tmp_path, monkeypatch):
+    save_agreement(tmp_path, table)
+    assert load_agreement(tmp_path) == table
+    (tmp_path / "clf.pkl").write_bytes(b"")
+    newer = (tmp_path / AGREEMENT_NAME).stat().st_mtime_ns + 10**9
+    os.utime(tmp_path / "clf.pkl", ns=(newer, newer))
+    assert load_agreement(tmp_path) is None
+
+    monkeypatch.setattr(cascade, "load_agreement", lambda path: dict(table, rules_digest="other"))
+    fresh = cascade.RuleCascade(enabled=True)
+    assert fresh.trusted_branches(get_bundle("india", "vehicle"), RULES.get()) == {}
+    assert (tmp_path / AGREEMENT_NAME).exists()
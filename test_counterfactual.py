@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+
+from scripts.api import serve
+from scripts.recommendation.counterfactual import TIER_RANK, find_counterfactuals
+from scripts.recommendation.predict import predict
+
+HEALTH = {"age": 55, "sumassured": 5e6, "smokerdrinker": "Yes", "diseases": "asthma, diabetes"}
+TRAVEL = {"age": 40, "sumassured": 2e6, "destinationcountry": "USA", "tripdurationdays": 20,
+          "existingmedicalcondition": "Yes", "healthcoverage": "Premium", "baggagecoverage": "Gold",
+          "tripcancellationcoverage": "Yes", "accidentcoverage": "Gold"}
+
+
+def _apply(data, changes):
+    return dict(data, **{f: c["to"] for f, c in changes.items()})
+
+
+def test_tier_counterfactuals_reach_a_cheaper_tier():
+    current = predict("INDIA", "health", HEALTH)
+    found = find_counterfactuals("INDIA", "health", HEALTH, goal="tier")
+
+    assert found["current"]["recommended_tier"] == current["recommended_tier"]
+    assert found["counterfactuals"]
+    costs = [cf["cost"] for cf in found["counterfactuals"]]
+    assert costs == sorted(costs)
+    for cf in found["counterfactuals"]:
+        again = predict("INDIA", "health", _apply(HEALTH, cf["changes"]))
+        assert again["recommended_tier"] == cf["recommended_tier"]
+        assert TIER_RANK[cf["recommended_tier"]] < TIER_RANK[current["recommended_tier"]]
+
+
+def test_counterfactuals_always_save_money():
+    vehicle = {"age": 40, "priceofvehicle": 2e6, "ageofvehicle": 3, "typeofvehicle": "car"}
+    cases = [("india", "vehicle", vehicle), ("INDIA", "health", HEALTH), ("INDIA", "travel", TRAVEL),
+             ("india", "travel", dict(TRAVEL, tripcancellationcoverage="No"))]
+    returned = 0
+    for country, policy, data in cases:
+        for goal in ("tier", "premium"):
+            found = find_counterfactuals(country, policy, data, goal=goal, min_saving=0.0, budget_ms=5000)
+            returned += len(found["counterfactuals"])
+            for cf in found["counterfactuals"]:
+                assert cf["saving"] > 0, (policy, goal, cf)
+                assert cf["premium"] < found["current"]["premium"]
+                # only downgrades are proposed
+                assert cf["changes"].get("typeofvehicle", {}).get("to") in (None, "2wheeler")
+                assert cf["changes"].get("tripcancellationcoverage", {}).get("to") in (None, "no")
+    assert returned
+
+
+def test_premium_goal_and_budget():
+    found = find_counterfactuals("INDIA", "travel", TRAVEL, goal="premium", min_saving=0.1)
+    base = found["current"]["premium"]
+    for cf in found["counterfactuals"]:
+        assert cf["premium"] <= base * 0.9
+        assert len(cf["changes"]) == len(found["counterfactuals"][0]["changes"])  # fewest changes only
+
+    out_of_time = find_counterfactuals("INDIA", "travel", TRAVEL, goal="tier", budget_ms=0)
+    assert out_of_time["complete"] is False
+    assert out_of_time["counterfactuals"] == []
+
+
+def test_counterfactual_endpoint():
+    profile = dict(HEALTH, country="INDIA", policytype="HEALTH")
+    with TestClient(serve.app) as client:
+        ok = client.post("/counterfactual", json={"profile": profile, "goal": "tier"})
+        bad = client.post("/counterfactual", json={"profile": profile, "target_tier": "Platinum"})
+    assert ok.status_code == 200
+    assert ok.json()["counterfactuals"]
+    assert bad.status_code == 400
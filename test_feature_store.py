@@ -0,0 +1,46 @@
+import pickle
+
+import numpy as np
+
+from scripts.recommendation.feature_store import FeatureStore, data_version
+from scripts.recommendation.train import _encode, load_dataset, policy_frames, prepare_segment
+
+
+def _segment(rows=None):
+    df = load_dataset("processed/standardized_india.csv")
+    frame = policy_frames(df, "india")["travel"]
+    return prepare_segment("india", "travel", frame if rows is None else frame.head(rows))
+
+
+def test_encoded_once_and_memory_mapped(tmp_path):
+    store = FeatureStore(tmp_path)
+    seg = _segment()
+    first = store.encoded(seg)
+    stamp = (first.path / "Mtr.npy").stat().st_mtime_ns
+
+    again = store.encoded(seg)
+    assert again.version == first.version
+    assert (again.path / "Mtr.npy").stat().st_mtime_ns == stamp
+
+    assert isinstance(again.Mtr, np.memmap)
+    np.testing.assert_array_equal(again.Mtr, _encode(seg.Xtr, again.encoder))
+    np.testing.assert_array_equal(again.Mte, _encode(seg.Xte, again.encoder))
+    assert list(again.yct) == list(seg.yct) and list(again.yre) == list(seg.yre)
+
+
+def test_new_data_gets_new_version_and_old_ones_are_pruned(tmp_path):
+    store = FeatureStore(tmp_path, keep=2)
+    versions = [store.encoded(_segment(rows)).version for rows in (200, 300, 400)]
+    assert len(set(versions)) == 3
+    assert versions[0] == data_version(_segment(200))
+
+    kept = sorted(p.name for p in (tmp_path / "india_travel").iterdir())
+    assert kept == sorted(versions[1:])
+
+
+def test_pickles_only_the_path(tmp_path):
+    enc = FeatureStore(tmp_path).encoded(_segment(200))
+    enc.Mtr  # map it
+    copy = pickle.loads(pickle.dumps(enc))
+    assert len(pickle.dumps(enc)) < 1000
+    np.testing.assert_array_equal(copy.Mtr, enc.Mtr)
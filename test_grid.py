@@ -0,0 +1,71 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from scripts.recommendation.grid import GRID_NAME, ScoreGrid, build_grid, load_grid, save_grid
+from scripts.recommendation.predict import _format_result, _score_row
+from scripts.recommendation.registry import get_bundle
+
+SPEC = {"age": list(range(18, 81, 3)), "sumassured": [5e5, 1e6, 2e6, 3.5e6, 5e6]}
+
+
+@pytest.fixture(scope="module")
+def arrays():
+    return build_grid("india", "health", SPEC)
+
+
+def _rows(n=300, seed=0):
+    rng = random.Random(seed)
+    diseases = ["asthma", "diabetes", "thyroid", "heart condition, thyroid", "none", ""]
+    for _ in range(n):
+        yield {
+            "country": "india",
+            "policytype": "health",
+            "age": float(rng.choice([rng.randint(18, 90), rng.uniform(18, 90)])),
+            "sumassured": float(rng.choice([*SPEC["sumassured"], rng.uniform(1e5, 8e6)])),
+            "smokerdrinker": rng.choice(["yes", "no", "maybe"]),
+            "diseases": rng.choice(diseases),
+        }
+
+
+def test_grid_hits_match_the_models(arrays):
+    grid = ScoreGrid(arrays)
+    bundle = get_bundle("india", "health")
+
+    hits = 0
+    for row in _rows():
+        found = grid.lookup(row)
+        if found is None:
+            continue
+        hits += 1
+        classes, probs, premiums = _score_row(bundle, row)
+        assert found[0] == classes
+        np.testing.assert_array_equal(found[1], probs)
+        np.testing.assert_array_equal(found[2], premiums)
+
+    assert hits > 50
+    assert grid.stats()["hits"] == hits
+
+
+def test_grid_misses_off_grid_values_unless_within_tolerance(arrays):
+    row = {"country": "india", "policytype": "health", "age": 36.0, "sumassured": 2.4e6,
+           "smokerdrinker": "no", "diseases": "asthma"}
+    assert ScoreGrid(arrays).lookup(row) is None
+
+    snapped = dict(arrays)
+    snapped["meta"] = np.asarray(str(arrays["meta"]).replace('"tolerance": {}', '"tolerance": {"sumassured": 5e5}'))
+    found = ScoreGrid(snapped).lookup(row)
+    expected = ScoreGrid(arrays).lookup(dict(row, sumassured=2e6))
+    assert _format_result("india", *found) == _format_result("india", *expected)
+
+
+def test_stale_grid_is_ignored(arrays, tmp_path):
+    save_grid(tmp_path, arrays)
+    assert isinstance(load_grid(tmp_path), ScoreGrid)
+
+    (tmp_path / "clf.pkl").write_bytes(b"retrained")
+    st = (tmp_path / GRID_NAME).stat()
+    os.utime(tmp_path / "clf.pkl", ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert load_grid(tmp_path) is None
@@ -0,0 +1,97 @@
+import json
+import shutil
+
+import joblib
+import pandas as pd
+import pytest
+
+from scripts.recommendation.feature_store import FeatureStore
+from scripts.recommendation import incremental
+from scripts.recommendation.incremental import LOG_NAME, WARM_START_L2, continue_boosting, read_delta, update_segment
+from scripts.recommendation.registry import load_bundle
+from scripts.recommendation.train import DELTA_DIR, prepare_segment, train_one, with_deltas
+from scripts.recommendation.train_cache import load_dataset, segment
+
+
+def _setup(tmp_path, policy="vehicle", rows=300):
+    shutil.copytree(f"artifacts/india_{policy}", tmp_path / "artifacts" / f"india_{policy}")
+    df = pd.read_csv("processed/standardized_india.csv")
+    delta = df[df["policytype"].str.lower() == policy].sample(rows, random_state=7)
+    delta = delta.rename(columns={"policytier": "Policy Tier"})  # a header spelling read_delta maps back
+    delta.to_parquet(tmp_path / "delta.parquet")
+    base = segment(load_dataset("processed/standardized_india.csv"), "india", policy)
+    return base, segment(read_delta(tmp_path / "delta.parquet"), "india", policy)
+
+
+def test_update_writes_new_version_once(tmp_path):
+    base, delta = _setup(tmp_path)
+    artifacts, store = tmp_path / "artifacts", FeatureStore(tmp_path / "features")
+    before = load_bundle(artifacts / "india_vehicle", "india", "vehicle").version
+
+    report = update_segment("india", "vehicle", base, delta, artifacts=artifacts, extra_iter=20, store=store)
+    assert report["status"] == "updated", report
+    assert report["iterations"]["reg"][1] > report["iterations"]["reg"][0]
+    assert report["after"]["accuracy"] >= report["before"]["accuracy"]
+    assert report["after"]["r2"] >= report["before"]["r2"]
+
+    bundle = load_bundle(artifacts / "india_vehicle", "india", "vehicle")
+    assert bundle.version != before
+    grown = joblib.load(artifacts / "india_vehicle" / "reg.pkl")
+    assert grown.n_iter_ == report["iterations"]["reg"][1] and not grown.warm_start
+    assert grown.l2_regularization == WARM_START_L2
+    assert json.loads((artifacts / "india_vehicle" / LOG_NAME).read_text())[0]["l2_regularization"] == {
+        "clf": WARM_START_L2, "reg": WARM_START_L2}
+
+    again = update_segment("india", "vehicle", base, delta, artifacts=artifacts, extra_iter=20, store=store)
+    assert again["status"] == "applied"
+    assert len(json.loads((artifacts / "india_vehicle" / LOG_NAME).read_text())) == 1
+
+
+def test_regression_or_dry_run_writes_nothing(tmp_path):
+    base, delta = _setup(tmp_path, policy="travel", rows=120)
+    outdir = tmp_path / "artifacts" / "india_travel"
+    stamps = {p.name: p.stat().st_mtime_ns for p in outdir.iterdir()}
+    store = FeatureStore(tmp_path / "features")
+
+    rejected = update_segment("india", "travel", base, delta, artifacts=tmp_path / "artifacts",
+                              extra_iter=5, tolerance=-1.0, store=store)
+    assert rejected["status"] == "rejected" and rejected["updated"] == []
+    dry = update_segment("india", "travel", base, delta, artifacts=tmp_path / "artifacts",
+                         extra_iter=5, store=store, dry_run=True)
+    assert dry["status"] == "updated" and "version" not in dry
+    assert {p.name: p.stat().st_mtime_ns for p in outdir.iterdir()} == stamps
+
+
+def test_applied_rows_are_kept_for_later_updates_and_retrains(tmp_path):
+    base, first = _setup(tmp_path)
+    second = segment(pd.read_csv("processed/standardized_india.csv"), "india", "vehicle").sample(200, random_state=11)
+    artifacts, store = tmp_path / "artifacts", FeatureStore(tmp_path / "features")
+    outdir = artifacts / "india_vehicle"
+
+    one = update_segment("india", "vehicle", base, first, artifacts=artifacts, extra_iter=5, tolerance=1.0, store=store)
+    kept = sorted((outdir / DELTA_DIR).glob("*.parquet"))
+    assert [p.name for p in kept] == [f"0001-{one['delta']}.parquet"]
+    assert len(pd.read_parquet(kept[0])) == len(first)
+
+    two = update_segment("india", "vehicle", base, second, artifacts=artifacts, extra_iter=5, tolerance=1.0, store=store)
+    assert two["status"] == "updated" and two["earlier_deltas"] == 1
+    assert two["train_rows"] + two["holdout_rows"] == one["train_rows"] + one["holdout_rows"] + len(second)
+    assert len(list((outdir / DELTA_DIR).glob("*.parquet"))) == 2
+
+    train_one("india", load_dataset("processed/standardized_india.csv"), "vehicle", artifacts=artifacts, store=store)
+    assert all(entry["folded"] for entry in json.loads((outdir / LOG_NAME).read_text()))
+    retrained = store.encoded(prepare_segment("india", "vehicle", with_deltas(base, outdir)))
+    assert len(retrained.yct) + len(retrained.yce) == len(base) + len(first) + len(second)
+
+    # the retrain read both deltas: they are base rows for the next update
+    three = update_segment("india", "vehicle", base, second.head(50).assign(age=30), artifacts=artifacts,
+                           extra_iter=5, tolerance=1.0, store=store, dry_run=True)
+    assert three["earlier_deltas"] == 0
+    assert three["train_rows"] + three["holdout_rows"] == len(retrained.yct) + len(retrained.yce) + 50
+
+
+def test_continue_boosting_refuses_unknown_sklearn(monkeypatch):
+    reg = joblib.load("artifacts/india_vehicle/reg.pkl")
+    monkeypatch.setattr(incremental.sklearn, "__version__", "1.5.0")
+    with pytest.raises(RuntimeError, match="1.5.0"):
+        continue_boosting(reg, None, None, 5)
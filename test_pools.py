@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from scripts.api import serve
+from scripts.api.pools import BlockingPool
+from scripts.recommendation.predict import predict
+
+HEALTH = {"age": 35, "sumassured": 500000, "smokerdrinker": "No", "diseases": "none"}
+
+
+def test_slow_call_does_not_block_the_loop():
+    pool = BlockingPool("test", workers=2)
+
+    async def main():
+        pool.start()
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+        t0 = time.perf_counter()
+        await pool.run(sum, [1, 2, 3])
+        fast = time.perf_counter() - t0
+        await slow
+        return fast
+
+    try:
+        assert asyncio.run(main()) < 0.25
+    finally:
+        pool.shutdown()
+
+
+def test_pending_calls_are_bounded():
+    pool = BlockingPool("test", workers=1, max_pending=2)
+    running = []
+
+    def work(i):
+        running.append(i)
+        time.sleep(0.05)
+        return i
+
+    async def main():
+        pool.start()
+        return await asyncio.gather(*(pool.run(work, i) for i in range(6)))
+
+    try:
+        assert asyncio.run(main()) == list(range(6))
+        assert sorted(running) == list(range(6))
+    finally:
+        pool.shutdown()
+
+
+def test_process_pool_scores_with_warm_models():
+    pool = BlockingPool("test", kind="process", workers=1, warm=True)
+
+    async def main():
+        pool.start()
+        return await pool.run(predict, "INDIA", "HEALTH", HEALTH)
+
+    try:
+        assert asyncio.run(main()) == predict("INDIA", "HEALTH", HEALTH)
+    finally:
+        pool.shutdown()
+
+
+def test_recommend_endpoint_runs_through_pools(monkeypatch):
+    monkeypatch.setattr(serve, "explain_recommendation",
+                        lambda **kw: {"why_recommended": kw["prediction"]["recommended_tier"]})
+    with TestClient(serve.app) as client:
+        resp = client.post("/recommend", json=dict(HEALTH, country="IN", policytype="HEALTH"))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["explanation"]["why_recommended"] == body["prediction"]["recommended_tier"]
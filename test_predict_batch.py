@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from scripts.recommendation.cascade import CASCADE
+from scripts.recommendation.predict import predict, predict_batch
+
+INPUTS = {
+    "health": ["age", "sumassured", "smokerdrinker", "diseases"],
+    "life": ["age", "sumassured", "smokerdrinker", "diseases"],
+    "vehicle": ["age", "priceofvehicle", "ageofvehicle", "typeofvehicle"],
+    "house": ["age", "propertyvalue", "propertyage", "propertytype", "propertysizesqfeet"],
+    "travel": ["age", "sumassured", "destinationcountry", "tripdurationdays", "existingmedicalcondition",
+               "healthcoverage", "baggagecoverage", "tripcancellationcoverage", "accidentcoverage"],
+}
+UNKNOWN = {"smokerdrinker": "sometimes", "diseases": "gout", "typeofvehicle": "hovercraft",
+           "propertytype": "houseboat", "destinationcountry": "Atlantis", "healthcoverage": "Platinum",
+           "existingmedicalcondition": "maybe"}
+
+
+def _profiles(country, policy, n=24):
+    df = pd.read_csv(f"processed/standardized_{country}.csv")
+    df = df.rename(columns={"propertysize": "propertysizesqfeet"})
+    df = df[df["policytype"] == policy].head(n).reset_index(drop=True)[INPUTS[policy]].astype(object)
+    for i in range(len(df)):
+        col = INPUTS[policy][i % len(INPUTS[policy])]
+        if i % 3 == 0:
+            df.loc[i, col] = None                         # missing field
+        elif i % 3 == 1 and col in UNKNOWN:
+            df.loc[i, col] = UNKNOWN[col]                 # category the encoder never saw
+    return df
+
+
+@pytest.mark.parametrize("country", ["india", "australia"])
+@pytest.mark.parametrize("policy", list(INPUTS))
+@pytest.mark.parametrize("drop", [None, -1])
+def test_predict_batch_matches_predict(country, policy, drop, monkeypatch):
+    monkeypatch.setattr(CASCADE, "enabled", False)
+    df = _profiles(country, policy)
+    if drop is not None:
+        df = df.drop(columns=INPUTS[policy][drop])  # a field no profile has
+    scored = predict_batch(country, policy, df)
+    assert list(scored.index) == list(df.index)
+
+    for i, row in df.iterrows():
+        expected = predict(country, policy, {k: v for k, v in row.items() if not pd.isna(v)})
+        got = scored.loc[i]
+        assert got["recommended_tier"] == expected["recommended_tier"], (i, row.to_dict())
+        assert {c: got[f"confidence_{c}"] for c in expected["confidence"]} == expected["confidence"]
+        assert {t: got[f"premium_{t}"] for t in expected["all_tiers"]} == expected["all_tiers"]
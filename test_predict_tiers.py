@@ -0,0 +1,81 @@
+import importlib
+import json
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from scripts.recommendation.cache import PREDICTION_CACHE
+from scripts.recommendation.cascade import CASCADE
+from scripts.recommendation.common import preprocess
+from scripts.recommendation.pricing import TIERS
+from scripts.recommendation.registry import load_bundle
+from scripts.recommendation.train import POLICY_FEATURES, _encode, _fit_encoder, prepare_segment, save_bundle
+from scripts.recommendation.train_cache import load_dataset, segment
+
+predict_mod = importlib.import_module("scripts.recommendation.predict")  # the package re-exports predict()
+
+
+@pytest.fixture(scope="module", params=["india", "australia"])
+def tier_artifacts(request, tmp_path_factory):
+    """A vehicle artifact dir whose regressor was trained with policytier as a feature."""
+    country = request.param
+    outdir = tmp_path_factory.mktemp("artifacts") / f"{country}_vehicle"
+    shutil.copytree(f"artifacts/{country}_vehicle", outdir)
+
+    seg = prepare_segment(country, "vehicle", segment(load_dataset(f"processed/standardized_{country}.csv"),
+                                                      country, "vehicle"))
+    X = seg.Xtr.assign(policytier=seg.yct.str.capitalize())
+    enc = _fit_encoder(X)
+    reg = HistGradientBoostingRegressor(max_iter=40, random_state=0).fit(_encode(X, enc), seg.yrt)
+    joblib.dump(reg, outdir / "reg.pkl")
+    joblib.dump(enc, outdir / "encoder_reg.pkl")
+    (outdir / "features_reg.json").write_text(json.dumps(seg.features))
+
+    features_cls = json.loads((outdir / "features_cls.json").read_text())
+    save_bundle(outdir, joblib.load(outdir / "clf.pkl"), reg, joblib.load(outdir / "encoder_cls.pkl"), enc,
+                features_cls, seg.features)
+    return country, outdir, seg.Xte
+
+
+def _per_tier_loop(country, data_norm, clf, reg, enc_cls, enc_reg):
+    """predict() before it scored all tiers in one call: preprocess + reg.predict per tier."""
+    features = POLICY_FEATURES["vehicle"]
+    row = pd.DataFrame([data_norm])[features]
+    X_cls, _ = preprocess(row, enc_cls, features_list=features)
+    confidence = {c: round(float(p), 4) for c, p in zip(clf.classes_, clf.predict_proba(X_cls)[0])}
+    all_tiers = {}
+    for t in TIERS:
+        X_reg, _ = preprocess(row.assign(policytier=t), enc_reg, features_list=features + ["policytier"])
+        all_tiers[t] = round(float(reg.predict(X_reg)[0]), 2)
+    return {"recommended_tier": clf.predict(X_cls)[0],
+            "all_tiers": predict_mod.convert_output_for_country(country, all_tiers),
+            "confidence": confidence}
+
+
+@pytest.mark.parametrize("prefer_flat", [True, False])
+def test_stacked_tier_premiums_match_per_tier_loop(tier_artifacts, prefer_flat, monkeypatch):
+    country, outdir, holdout = tier_artifacts
+    bundle = load_bundle(outdir, country, "vehicle", prefer_flat=prefer_flat)
+    assert bundle.reg_tier_col == "policytier"
+    monkeypatch.setattr(predict_mod, "get_bundle", lambda c, p: bundle)
+    monkeypatch.setattr(CASCADE, "enabled", False)
+    PREDICTION_CACHE.clear()
+
+    clf, reg = joblib.load(outdir / "clf.pkl"), joblib.load(outdir / "reg.pkl")
+    enc_cls, enc_reg = joblib.load(outdir / "encoder_cls.pkl"), joblib.load(outdir / "encoder_reg.pkl")
+    profiles = holdout.head(40).drop(columns=["country", "policytype"]).to_dict("records")
+    profiles += [{"age": 40, "priceofvehicle": 900000, "ageofvehicle": 3, "typeofvehicle": "hovercraft"},
+                 {"age": 25}]
+
+    spread = []
+    for data in profiles:
+        got = predict_mod.predict(country, "vehicle", data)
+        expected = _per_tier_loop(country, predict_mod._normalize_input(country, "vehicle", data),
+                                  clf, reg, enc_cls, enc_reg)
+        assert got == expected, data
+        spread.append(np.ptp(list(got["all_tiers"].values())))
+    assert max(spread) > 0  # the tier feature moves the premium
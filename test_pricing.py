@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from scripts.recommendation.pricing import ENGINE, PremiumEngine, Tariff
+
+rng = np.random.default_rng(0)
+N = 500
+
+
+def test_vehicle_vectorized_matches_scalar():
+    price = rng.choice([5e4, 8e5, 3e6], N)
+    age = rng.integers(-1, 10, N)
+    vtype = rng.choice(["car", "2Wheeler", "luxry", "commercial", "bike"], N)
+    idv, prem = ENGINE.vehicle(price, age, vtype)
+    expected = np.array([ENGINE.vehicle_one(p, a, t) for p, a, t in zip(price, age, vtype)])
+    np.testing.assert_array_equal(idv, expected[:, 0])
+    np.testing.assert_array_equal(prem, expected[:, 1])
+
+
+def test_property_vectorized_matches_scalar():
+    value = rng.choice([5e5, 5e6, 5e7], N)
+    age = rng.integers(-2, 40, N)
+    ptype = rng.choice(["villa", "House", "apartment", "castle"], N)
+    size = rng.choice([500.0, 2500.0, 6000.0], N)
+    got = ENGINE.property(value, age, ptype, size)
+    expected = [ENGINE.property_one(v, a, t, s) for v, a, t, s in zip(value, age, ptype, size)]
+    np.testing.assert_allclose(got, expected, rtol=0, atol=0.01)
+
+
+def test_travel_vectorized_matches_scalar():
+    duration = rng.integers(1, 40, N)
+    cov = {c: rng.choice(["basic", "Gold", "premium", "unknown"], N)
+           for c in ("healthcoverage", "baggagecoverage", "accidentcoverage")}
+    medical = rng.choice(["Yes", "No"], N)
+    cancel = rng.choice(["yes", "no"], N)
+    got = ENGINE.travel(duration, cov, medical, cancel)
+    expected = [ENGINE.travel_one(d, {c: cov[c][i] for c in cov}, medical[i], cancel[i])
+                for i, d in enumerate(duration)]
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_tariff_changes_reprice():
+    engine = PremiumEngine(Tariff().with_changes(travel_daily_rate=150.0))
+    assert engine.travel_one(10, {}, "no", "no") == pytest.approx(1500.0)
+    assert ENGINE.travel_one(10, {}, "no", "no") == pytest.approx(1000.0)
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from scripts.api import serve
+from scripts.recommendation.cache import EXPLANATION_CACHE
+
+
+def _health(age):
+    return {"country": "INDIA", "policytype": "HEALTH", "age": age, "sumassured": 500000,
+            "smokerdrinker": "No", "diseases": "none"}
+
+
+def test_fan_out_keeps_order_dedupes_and_isolates_failures(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_explain(user_input, prediction, **kw):
+        with lock:
+            calls.append(user_input["age"])
+        time.sleep(0.2)
+        if user_input["age"] == 66:
+            raise RuntimeError("LLM down")
+        return {"why_recommended": f"age {user_input['age']}"}
+
+    monkeypatch.setattr(serve, "explain_recommendation", fake_explain)
+    monkeypatch.setattr(serve, "MULTI_EXPLAIN_CONCURRENCY", 3)
+    EXPLANATION_CACHE.clear()
+
+    policies = [_health(30), _health(45), _health(30), _health(66),
+                {"country": "INDIA", "policytype": "VEHICLE", "age": 40, "priceofvehicle": 800000,
+                 "ageofvehicle": 2, "typeofvehicle": "car"}]
+    with TestClient(serve.app) as client:
+        t0 = time.perf_counter()
+        resp = client.post("/recommend_multiple", json={"policies": policies})
+        elapsed = time.perf_counter() - t0
+
+    assert resp.status_code == 200
+    reasons = [r["explanation"]["why_recommended"] for r in resp.json()["results"]]
+    assert reasons == ["age 30", "age 45", "age 30", "age 40"]
+    assert sorted(calls) == [30, 40, 45, 66]  # the duplicate profile is explained once
+    assert elapsed < 0.2 * len(calls)
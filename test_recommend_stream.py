@@ -0,0 +1,54 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from scripts.api import serve
+from scripts.recommendation.predict import predict
+
+HEALTH = {"country": "IN", "policytype": "health", "age": "35", "sumassured": 500000,
+          "smokerdrinker": "No", "diseases": "none"}
+VEHICLE = {"country": "AU", "policytype": "VEHICLE", "age": 40, "priceofvehicle": 30000,
+           "ageofvehicle": 2, "typeofvehicle": "car"}
+
+
+def _post(client, lines, **params):
+    body = "".join(line + "\n" for line in lines)
+    resp = client.post("/recommend_stream", params=params, content=body.encode("utf-8"))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_stream_scores_in_order_with_per_line_errors():
+    lines = [json.dumps(HEALTH), "", "{not json", json.dumps(dict(HEALTH, country="FR")),
+             json.dumps(VEHICLE), json.dumps(HEALTH), "x" * (serve.STREAM_MAX_LINE_BYTES + 10)]
+    with TestClient(serve.app) as client:
+        out = _post(client, lines, batch_size=2)
+
+    assert [r["line"] for r in out] == [1, 3, 4, 5, 6, 7]
+    assert "error" in out[1] and "error" in out[2] and "error" in out[5]
+    expected_health = predict("INDIA", "HEALTH", serve.prepare_recommend_input(
+        serve.to_dict_safe(serve.RecommendRequest(**HEALTH)))[2])
+    assert out[0]["prediction"] == expected_health == out[4]["prediction"]
+    assert out[3]["prediction"]["recommended_tier"]
+    assert "explanation" not in out[0]
+
+
+def test_stream_adds_explanations_on_request(monkeypatch):
+    monkeypatch.setattr(serve, "explain_recommendation",
+                        lambda **kw: {"why_recommended": kw["prediction"]["recommended_tier"]})
+    with TestClient(serve.app) as client:
+        out = _post(client, [json.dumps(VEHICLE)], explain="true")
+    assert out[0]["explanation"]["why_recommended"] == out[0]["prediction"]["recommended_tier"]
+
+
+def test_stream_rejects_oversized_upload(monkeypatch):
+    monkeypatch.setattr(serve, "STREAM_MAX_UPLOAD_BYTES", 1000)
+    body = "".join(json.dumps(HEALTH) + "\n" for _ in range(20)).encode("utf-8")
+    with TestClient(serve.app) as client:
+        declared = client.post("/recommend_stream", content=body)
+        chunked = client.post("/recommend_stream", content=iter([body[:600], body[600:]]))
+        small = _post(client, [json.dumps(HEALTH)])
+    assert declared.status_code == 413 and chunked.status_code == 413
+    assert "larger than 1000 bytes" in declared.json()["detail"]
+    assert small[0]["prediction"]["recommended_tier"]
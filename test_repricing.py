@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.recommendation.predict import _normalize_frame, predict_batch
+from scripts.recommendation.pricing import PremiumEngine, Tariff
+from scripts.recommendation.repricing import PortfolioSimulator, load_book
+
+POLICIES = ["health", "vehicle", "house", "travel", "life"]
+
+
+@pytest.fixture(scope="module")
+def book():
+    df = load_book(["processed/standardized_india.csv", "processed/standardized_australia.csv"])
+    return pd.concat([df[df["policytype"] == p].groupby("country").head(50) for p in POLICIES])
+
+
+@pytest.fixture(scope="module")
+def sim(book):
+    return PortfolioSimulator(book)
+
+
+def test_baseline_matches_predict_batch(book, sim):
+    table = sim.simulate({})
+    assert (table["premium_delta"] == 0).all()
+    assert table["rows"].sum() == len(book)
+
+    for (country, policy), g in book.groupby(["country", "policytype"]):
+        scored = predict_batch(country.lower(), policy, g.rename(columns={"propertysize": "propertysizesqfeet"}))
+        quoted = [row[f"premium_{row['recommended_tier'].capitalize()}"] for _, row in scored.iterrows()]
+        got = table[(table["country"] == country.lower()) & (table["policytype"] == policy)]
+        assert got["premium_before"].sum() == pytest.approx(sum(quoted), abs=0.05)
+
+
+def test_tier_multiplier_only_moves_that_tier(sim):
+    table = sim.simulate({"tier_multiplier": {"Gold": 1.32}})
+    gold = table["tier"] == "Gold"
+    np.testing.assert_allclose(table.loc[gold, "premium_after"], table.loc[gold, "premium_before"] * 1.1, rtol=1e-4)
+    assert (table.loc[~gold, "premium_delta"] == 0).all()
+    assert (table["formula_delta"].fillna(0) == 0).all()
+
+
+def test_formula_changes_reprice_only_their_policy(book, sim):
+    changes = {"vehicle_base_premium": {"car": 0.05}}
+    table = sim.simulate(changes)
+    assert (table.loc[table["policytype"] != "vehicle", "formula_delta"].fillna(0) == 0).all()
+
+    engine = PremiumEngine(Tariff().with_changes(vehicle_base_premium={**Tariff().vehicle_base_premium, "car": 0.05}))
+    vehicles = book[(book["policytype"] == "vehicle") & (book["country"].str.lower() == "india")]
+    X = _normalize_frame("india", "vehicle", vehicles)
+    expected = engine.vehicle(X["priceofvehicle"], X["ageofvehicle"], X["typeofvehicle"])[1].sum()
+    got = table[(table["country"] == "india") & (table["policytype"] == "vehicle")]["formula_after"].sum()
+    assert got == pytest.approx(expected, abs=0.05)
+
+
+def test_unknown_field_is_rejected(sim):
+    with pytest.raises(ValueError):
+        sim.simulate({"gold_multiplier": 2})
+    assert (sim.simulate(Tariff())["premium_delta"] == 0).all()
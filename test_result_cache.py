@@ -0,0 +1,90 @@
+import importlib
+import shutil
+
+from scripts.recommendation.cache import PREDICTION_CACHE, ResultCache, canonical
+from scripts.recommendation.common import ARTIFACTS
+from scripts.recommendation.registry import ModelRegistry
+
+# the package re-exports the predict() function under the module's name
+predict_mod = importlib.import_module("scripts.recommendation.predict")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry_and_counters():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, max_entries=8, clock=clock)
+    cache.put("a", {"x": 1})
+    assert cache.get("a") == {"x": 1}
+    clock.now = 10.0
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_values_are_copied_in_and_out():
+    cache = ResultCache()
+    value = {"all_tiers": {"Gold": 1.0}}
+    cache.put("k", value)
+    value["all_tiers"]["Gold"] = 2.0
+    got = cache.get("k")
+    got["all_tiers"]["Gold"] = 3.0
+    assert cache.get("k") == {"all_tiers": {"Gold": 1.0}}
+
+
+def test_disabled_cache_never_stores():
+    cache = ResultCache(ttl=0)
+    assert cache.get_or_compute("k", lambda: 1) == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_canonical_ignores_key_order_and_number_type():
+    assert canonical({"age": 30, "b": [1, "x"]}) == canonical({"b": (1.0, "x"), "age": 30.0})
+    assert canonical({"v": float("nan")}) == canonical({"v": None})
+    assert canonical({"v": "Yes"}) != canonical({"v": "yes"})
+
+
+def test_predict_hits_cache_for_equivalent_profiles():
+    PREDICTION_CACHE.clear()
+    data = {"age": 35, "sumassured": 500000, "smokerdrinker": "No", "diseases": "none"}
+    first = predict_mod.predict("INDIA", "HEALTH", data)
+    first["all_tiers"]["Gold"] = -1.0  # callers may mutate their copy
+
+    again = predict_mod.predict("INDIA", "HEALTH", dict(data, age=35.0, name="someone else"))
+    assert again["all_tiers"]["Gold"] != -1.0
+    stats = PREDICTION_CACHE.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_registry_reload_invalidates_cached_predictions(tmp_path, monkeypatch):
+    shutil.copytree(ARTIFACTS / "india_health", tmp_path / "india_health")
+    registry = ModelRegistry(tmp_path, check_interval=0.0)
+    registry.add_reload_listener(predict_mod._drop_cached_predictions)
+    monkeypatch.setattr(predict_mod, "get_bundle", registry.get)
+
+    PREDICTION_CACHE.clear()
+    data = {"age": 35, "sumassured": 500000, "smokerdrinker": "No", "diseases": "none"}
+    predict_mod.predict("INDIA", "HEALTH", data)
+    assert PREDICTION_CACHE.stats()["size"] == 1
+
+    (tmp_path / "india_health" / "notes.txt").write_text("retrained")
+    predict_mod.predict("INDIA", "HEALTH", data)
+    stats = PREDICTION_CACHE.stats()
+    assert stats["hits"] == 0 and stats["size"] == 1
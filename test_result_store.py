@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from scripts.api import warm_store
+from scripts.recommendation.cache import PREDICTION_CACHE, ResultCache
+from scripts.recommendation.predict import predict
+from scripts.recommendation.store import ResultStore
+
+HEALTH = {"country": "IN", "policytype": "HEALTH", "age": 40, "sumassured": 500000,
+          "smokerdrinker": "No", "diseases": "asthma"}
+TRAVEL = {"country": "AU", "policytype": "TRAVEL", "age": 30, "sumassured": 1000000,
+          "destinationcountry": "Japan", "tripdurationdays": 10}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _put_from_child(path):
+    store = ResultStore(path)
+    store.put("predictions", ("child", b"\x01"), {"tier": "Gold"})
+    store.close()
+
+
+def test_entries_are_shared_across_instances_and_processes(tmp_path):
+    path = tmp_path / "results.sqlite"
+    writer = ResultStore(path, flush_interval=0.05)
+    writer.put("predictions", ("india", b"\x00\x01", 1.5), {"recommended_tier": "gold", "all_tiers": {"Gold": 1.25}})
+    writer.put("predictions", ("bad",), {"value": object()})
+    writer.flush()
+
+    reader = ResultStore(path)
+    assert reader.get("predictions", ("india", b"\x00\x01", 1.5)) == {"recommended_tier": "gold",
+                                                                      "all_tiers": {"Gold": 1.25}}
+    assert reader.get("explanations", ("india", b"\x00\x01", 1.5)) is None
+    assert writer.stats()["skipped"] == 1
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    child = multiprocessing.get_context("fork").Process(target=_put_from_child, args=(path,))
+    child.start()
+    child.join(30)
+    assert reader.get("predictions", ("child", b"\x01")) == {"tier": "Gold"}
+    writer.close()
+
+
+def test_writes_are_batched_and_old_entries_expire(tmp_path):
+    clock = FakeClock()
+    store = ResultStore(tmp_path / "results.sqlite", max_age=60, flush_interval=0.2, clock=clock)
+    for i in range(50):
+        store.put("predictions", ("k", i), i)
+    store.flush()
+    assert store.stats()["written"] == 50
+    assert store.stats()["batches"] < 5
+    assert store.get("predictions", ("k", 7)) == 7
+
+    clock.now += 61
+    assert store.get("predictions", ("k", 7)) is None
+    ResultStore(tmp_path / "results.sqlite", max_age=60, clock=clock)  # prunes on open
+    assert len(store) == 0
+    store.close()
+
+
+def test_cache_reads_through_to_the_store(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite")
+    first = ResultCache(ttl=60, store=store, namespace="predictions")
+    first.put(("a",), {"x": [1, 2]})
+    store.flush()
+
+    restarted = ResultCache(ttl=60, store=ResultStore(tmp_path / "results.sqlite"), namespace="predictions")
+    got = restarted.get(("a",))
+    assert got == {"x": [1, 2]}
+    got["x"].append(3)
+    assert restarted.get(("a",)) == {"x": [1, 2]}
+    stats = restarted.stats()
+    assert (stats["hits"], stats["misses"], stats["store"]["hits"]) == (1, 1, 1)
+    store.close()
+
+
+def test_warm_store_replays_the_hottest_profiles(tmp_path, monkeypatch):
+    history = tmp_path / "history.jsonl"
+    history.write_text("\n".join([json.dumps(HEALTH)] * 3 + [json.dumps(TRAVEL), "{not json", "{}"]) + "\n")
+    store = ResultStore(tmp_path / "results.sqlite")
+    monkeypatch.setattr(PREDICTION_CACHE, "store", store)
+
+    summary = warm_store.warm([str(history)], top=1, log=lambda *_: None)
+    assert summary == {"requests": 6, "rejected": 2, "profiles": 2, "scored": 1, "failed": 0, "explained": 0}
+    assert len(store) == 1
+
+    # a fresh worker answers the hot profile from the store
+    PREDICTION_CACHE.clear()
+    expected = predict("INDIA", "HEALTH", {k: v for k, v in HEALTH.items() if k not in ("country", "policytype")})
+    assert PREDICTION_CACHE.stats()["store"]["hits"] == 1
+    assert expected["recommended_tier"]
+    store.close()
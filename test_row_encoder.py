@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.recommendation.common import ARTIFACTS, load_artifacts, load_feature_list, preprocess
+from scripts.recommendation.registry import load_bundle
+
+ARTIFACT_DIRS = sorted(p.name for p in ARTIFACTS.iterdir() if (p / "encoder_cls.pkl").exists())
+
+DATASETS = {
+    "india": "processed/standardized_india.csv",
+    "australia": "processed/standardized_australia.csv",
+}
+
+
+def _sample_rows(country, policy, features, n=200):
+    """Real rows for this (country, policy) plus unknown and missing values."""
+    df = pd.read_csv(DATASETS[country])
+    df.columns = df.columns.str.lower().str.strip()
+    df = df[(df["country"].str.lower() == country) & (df["policytype"].str.lower() == policy)]
+    df = df.reindex(columns=features).head(n)
+
+    rows = []
+    for rec in df.to_dict("records"):
+        rows.append({k: (v.lower() if isinstance(v, str) else v) for k, v in rec.items()})
+
+    odd = dict(rows[0])
+    for k, v in odd.items():
+        odd[k] = "__never_seen__" if isinstance(v, str) else None
+    rows.append(odd)
+    return rows
+
+
+def _frame(rows, features, cat_features):
+    df = pd.DataFrame(rows, columns=features)
+    for c in features:
+        if c in cat_features:
+            df[c] = df[c].astype(object)
+        else:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+@pytest.mark.parametrize("name", ARTIFACT_DIRS)
+@pytest.mark.parametrize("which", ["cls", "reg"])
+def test_row_encoder_matches_preprocess(name, which):
+    country, policy = name.split("_", 1)
+    path = ARTIFACTS / name
+    bundle = load_bundle(path, country, policy)
+    row_enc = bundle.row_cls if which == "cls" else bundle.row_reg
+    encoder = load_artifacts(path, f"encoder_{which}")
+    features = load_feature_list(path, f"features_{which}.json")
+
+    rows = _sample_rows(country, policy, features)
+    expected, _ = preprocess(_frame(rows, features, row_enc.cat_features), encoder, features_list=features)
+
+    got_many = row_enc.encode_many(rows)
+    got_single = np.vstack([row_enc.encode(r) for r in rows])
+    got_frame = row_enc.encode_frame(_frame(rows, features, row_enc.cat_features))
+
+    assert got_many.shape == expected.shape
+    np.testing.assert_array_equal(got_many, expected)
+    np.testing.assert_array_equal(got_single, expected)
+    np.testing.assert_array_equal(got_frame, expected)
+
+
+def test_row_encoder_reuses_output_buffer():
+    bundle = load_bundle(ARTIFACTS / "india_health", "india", "health")
+    out = np.empty((1, bundle.row_cls.width))
+    first = {"age": 30.0, "sumassured": 5e5, "smokerdrinker": "yes", "diseases": "asthma",
+             "country": "india", "policytype": "health"}
+    second = dict(first, smokerdrinker="no")
+
+    bundle.row_cls.encode(first, out=out)
+    bundle.row_cls.encode(second, out=out)
+    np.testing.assert_array_equal(out, bundle.row_cls.encode(second))
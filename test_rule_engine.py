@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.recommendation.rule_engine import (
+    RULES, RULES_PATH, TIER_LABELS, RuleBook, RulePlan, apply_rules, apply_rules_frame,
+)
+
+RULE_COLUMNS = {
+    "age": "Age",
+    "country": "Country",
+    "policytype": "ProductType",
+    "sumassured": "SumInsured",
+    "smokerdrinker": "SmokerDrinker",
+    "diseases": "HealthIssues",
+    "annualpremium": "AnnualPremium",
+    "priceofvehicle": "PriceOfVehicle",
+    "ageofvehicle": "AgeOfVehicle",
+    "typeofvehicle": "TypeOfVehicle",
+    "propertyvalue": "PropertyValue",
+    "propertyage": "PropertyAge",
+    "propertytype": "PropertyType",
+    "propertysize": "PropertySizeSqFeet",
+    "existingmedicalcondition": "ExistingMedicalCondition",
+    "healthcoverage": "HealthCoverage",
+    "baggagecoverage": "BaggageCoverage",
+    "tripcancellationcoverage": "TripCancellationCoverage",
+    "accidentcoverage": "AccidentCoverage",
+}
+
+
+def _scalar(df):
+    return [apply_rules(r) for r in df.to_dict("records")]
+
+
+@pytest.mark.parametrize("country", ["india", "australia"])
+def test_frame_matches_scalar_on_dataset(country):
+    df = pd.read_csv(f"processed/standardized_{country}.csv").rename(columns=RULE_COLUMNS)
+    df = df.sample(frac=1.0, random_state=0)
+    got = apply_rules_frame(df)
+    assert got.index.equals(df.index)
+    assert got.tolist() == _scalar(df)
+
+
+def test_frame_matches_scalar_on_edge_values():
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = pd.DataFrame({
+        "Country": rng.choice(["India", "AUSTRALIA", "nz"], n),
+        "ProductType": rng.choice(["health", "life", "Vehicle", "travel", "house", "pet"], n),
+        "Age": rng.integers(0, 90, n),
+        "SumInsured": rng.choice([0.0, 1500000.0, 1500001.0, 2000001.0, np.nan], n),
+        "AnnualPremium": rng.choice([0.0, 50000.0, 50001.0, 100001.0, 150001.0], n),
+        "SmokerDrinker": rng.choice(["Yes", "no", None], n),
+        "HealthIssues": rng.choice(["none", "None", "asthma", None], n),
+        "PriceOfVehicle": rng.choice([0.0, 4000.0, 20000.0, 250000.0, 2e6, -5.0, np.nan], n),
+        "AgeOfVehicle": rng.choice([0.2, 0.7, 1.0, 3.9, 4.0, 9.0], n),
+        "TypeOfVehicle": rng.choice(["Luxury", "truck", "bike", "car"], n),
+        "tripdurationdays": rng.integers(1, 40, n),
+        "ExistingMedicalCondition": rng.choice(["Yes", "No"], n),
+        "BaggageCoverage": rng.choice(["Yes", "No"], n),
+        "TripCancellationCoverage": rng.choice(["yes", "no"], n),
+        "AccidentCoverage": rng.choice(["Yes", "No"], n),
+        "PropertyValue": rng.choice([1e5, 3e5, 2e6, 1e7, 3e7, np.nan], n),
+        "PropertyAge": rng.integers(0, 60, n),
+        "PropertySizeSqFeet": rng.choice([500.0, 900.0, 1500.0, 2500.0, 5000.0], n),
+        "PropertyType": rng.choice(["villa", "flat"], n),
+    })
+    assert apply_rules_frame(df).tolist() == _scalar(df)
+
+
+@pytest.mark.parametrize("country", ["india", "australia"])
+def test_branch_matches_evaluate(country):
+    df = pd.read_csv(f"processed/standardized_{country}.csv").rename(columns=RULE_COLUMNS)
+    for (c, product), rule in RULES.get().rules.items():
+        g = df[(df["Country"].str.lower() == c) & (df["ProductType"].str.lower() == product)]
+        if g.empty:
+            continue
+        branch = rule.branch_frame(g)
+        rows = g.to_dict("records")
+        assert branch.tolist() == [rule.branch(r) for r in rows]
+        assert TIER_LABELS[rule.branch_tiers[branch]].tolist() == [rule.evaluate(r) for r in rows]
+
+
+def test_frame_defaults_missing_columns():
+    df = pd.DataFrame({"Country": ["india", "india"], "ProductType": ["health", "travel"]})
+    assert apply_rules_frame(df).tolist() == _scalar(df) == ["Basic", None]
+
+
+def test_rule_thresholds_from_table():
+    rows = [
+        ({"Country": "India", "ProductType": "vehicle", "PriceOfVehicle": 210000, "AgeOfVehicle": 0,
+          "TypeOfVehicle": "car"}, "Basic"),
+        ({"Country": "India", "ProductType": "vehicle", "PriceOfVehicle": 300000, "AgeOfVehicle": 1,
+          "TypeOfVehicle": "car"}, "Standard"),
+        ({"Country": "Australia", "ProductType": "vehicle", "PriceOfVehicle": 40000, "AgeOfVehicle": 9,
+          "TypeOfVehicle": "car"}, "Gold"),
+        ({"Country": "India", "ProductType": "health", "Age": 61, "SmokerDrinker": "Yes"}, "Premium"),
+        ({"Country": "Australia", "ProductType": "travel", "BaggageCoverage": "Yes",
+          "HealthCoverage": "Yes", "ExistingMedicalCondition": "Yes"}, "Gold"),
+        ({"Country": "India", "ProductType": "house", "PropertyValue": 5e7, "PropertySizeSqFeet": 5000},
+         "Premium"),
+    ]
+    assert [apply_rules(r) for r, _ in rows] == [label for _, label in rows]
+    assert apply_rules_frame(pd.DataFrame([r for r, _ in rows])).tolist() == [label for _, label in rows]
+
+
+def _write_rules(path, spec):
+    path.write_text(json.dumps(spec))
+    st = path.stat()
+    # make sure the change is visible even on coarse mtime filesystems
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_rulebook_hot_reloads_and_keeps_last_good_plan(tmp_path):
+    spec = json.loads(RULES_PATH.read_text())
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(spec))
+    book = RuleBook(path, check_interval=0.0)
+    row = {"Country": "India", "ProductType": "vehicle", "PriceOfVehicle": 300000, "AgeOfVehicle": 0,
+           "TypeOfVehicle": "car"}
+    assert book.get().evaluate(row) == "Standard"
+
+    spec["version"] = "test"
+    spec["rules"]["india/vehicle"]["tiers"][0]["when"][1][2] = 400000
+    _write_rules(path, spec)
+    plan = book.get()
+    assert plan.version == "test"
+    assert plan.evaluate(row) == "Basic"
+    assert plan.evaluate_frame(pd.DataFrame([row])).tolist() == ["Basic"]
+
+    path.write_text("{ not json")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 2 * 10**9))
+    assert book.get() is plan
+
+
+@pytest.mark.parametrize("when", [["age", "~", 1], ["nope", ">", 1], ["age", ">", [1]], ["all"]])
+def test_invalid_rule_tables_are_rejected(when):
+    spec = json.loads(RULES_PATH.read_text())
+    spec["rules"]["india/health"]["tiers"][0]["when"] = when
+    with pytest.raises(ValueError):
+        RulePlan(spec)
@@ -0,0 +1,85 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.recommendation.predict import predict_batch
+from scripts.recommendation.score_book import DONE_DIR, score_book
+
+POLICIES = ["health", "vehicle", "house", "travel", "life"]
+
+
+@pytest.fixture
+def book(tmp_path):
+    frames = []
+    for csv in ("processed/standardized_india.csv", "processed/standardized_australia.csv"):
+        df = pd.read_csv(csv)
+        df.columns = df.columns.str.lower().str.strip()
+        frames.append(pd.concat([df[df["policytype"] == p].head(40) for p in POLICIES]))
+    df = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0).reset_index(drop=True)
+    df.loc[0, "policytype"] = "pet"    # no model: skipped, not fatal
+
+    path = tmp_path / "book.parquet"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=64)
+    return path, df
+
+
+def _expected(df):
+    df = df.rename(columns={"propertysize": "propertysizesqfeet"})
+    parts = []
+    for (c, p), g in df[df["policytype"] != "pet"].groupby(["country", "policytype"]):
+        out = predict_batch(c.lower(), p, g)
+        out.insert(0, "row_id", g.index)
+        parts.append(out)
+    return pd.concat(parts).set_index("row_id").sort_index()
+
+
+def _read(out):
+    scored = pd.read_parquet(out)
+    return scored.drop(columns=["country", "policytype"]).set_index("row_id").sort_index()
+
+
+def test_score_book_matches_predict_batch(book, tmp_path):
+    path, df = book
+    out = tmp_path / "scored"
+
+    scored, skipped = score_book([str(path)], str(out), workers=2, log=lambda msg: None)
+
+    assert (scored, skipped) == (len(df) - 1, 1)
+    expected = _expected(df)
+    got = _read(out)[expected.columns]
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_score_book_resumes_missing_chunks(book, tmp_path):
+    path, df = book
+    out = tmp_path / "scored"
+    score_book([str(path)], str(out), workers=1, log=lambda msg: None)
+
+    markers = sorted((out / DONE_DIR).iterdir())
+    markers[1].unlink()
+    scored, _ = score_book([str(path)], str(out), workers=1, log=lambda msg: None)
+
+    assert scored == 64
+    assert len(_read(out)) == len(df) - 1
+
+
+def test_single_row_group_is_sliced_and_resumed_per_slice(book, tmp_path):
+    _, df = book
+    path = tmp_path / "one_group.parquet"
+    df.to_parquet(path, index=False)  # pandas writes one row group
+    assert pq.ParquetFile(path).metadata.num_row_groups == 1
+
+    out = tmp_path / "scored"
+    scored, skipped = score_book([str(path)], str(out), workers=2, batch_rows=50, log=lambda msg: None)
+    assert (scored, skipped) == (len(df) - 1, 1)
+    markers = sorted((out / DONE_DIR).iterdir())
+    assert len(markers) == -(-len(df) // 50)
+
+    expected = _expected(df)
+    pd.testing.assert_frame_equal(_read(out)[expected.columns], expected, check_dtype=False)
+
+    markers[2].unlink()
+    rescored, _ = score_book([str(path)], str(out), workers=1, batch_rows=50, log=lambda msg: None)
+    assert rescored == 50  # the "pet" row is in the first slice
+    assert len(_read(out)) == len(df) - 1
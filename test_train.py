@@ -0,0 +1,42 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from scripts.recommendation.feature_store import FeatureStore
+from scripts.recommendation.train import (
+    _encode, load_dataset, policy_frames, prepare_segment, train_one, train_parallel,
+)
+
+
+def _small_csv(tmp_path):
+    df = pd.read_csv("processed/standardized_india.csv")
+    small = df[df["policytype"].str.lower().isin(["vehicle", "house"])].groupby("policytype").head(60)
+    path = tmp_path / "india.csv"
+    small.to_csv(path, index=False)
+    return str(path)
+
+
+def test_policy_frames_match_per_policy_filters():
+    df = load_dataset("processed/standardized_australia.csv")
+    frames = policy_frames(df, "AUSTRALIA")
+    for policy, frame in frames.items():
+        expected = df[(df["country"].str.lower() == "australia") & (df["policytype"].str.lower() == policy)]
+        assert frame.index.equals(expected.index)
+
+
+def test_parallel_training_matches_train_one(tmp_path):
+    csv = _small_csv(tmp_path)
+    store = FeatureStore(tmp_path / "features")
+    timings = train_parallel({"india": csv}, cpus=2, artifacts=tmp_path / "parallel", store=store)
+    assert sorted((t["policy"], t["model"]) for t in timings) == [
+        ("house", "clf"), ("house", "reg"), ("vehicle", "clf"), ("vehicle", "reg")]
+
+    df = load_dataset(csv)
+    train_one("india", df, "vehicle", artifacts=tmp_path / "sequential", store=FeatureStore(tmp_path / "fresh"))
+    seg = prepare_segment("india", "vehicle", policy_frames(df, "india")["vehicle"])
+    for model, encoder in (("clf", "encoder_cls"), ("reg", "encoder_reg")):
+        a, b = (joblib.load(tmp_path / run / "india_vehicle" / f"{model}.pkl") for run in ("parallel", "sequential"))
+        X = _encode(seg.Xte, joblib.load(tmp_path / "parallel" / "india_vehicle" / f"{encoder}.pkl"))
+        score = (lambda m: m.predict_proba(X)) if model == "clf" else (lambda m: m.predict(X))
+        np.testing.assert_allclose(score(a), score(b), rtol=1e-12, atol=1e-12)
+    assert (tmp_path / "parallel" / "india_house" / "model.bundle").exists()
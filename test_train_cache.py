@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from scripts.recommendation import train_cache
+from scripts.recommendation.train import POLICY_FEATURES, policy_frames, prepare_segment
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "standardized_india.csv"
+    shutil.copy("processed/standardized_india.csv", path)
+    return path
+
+
+def test_cache_holds_the_same_rows_typed_and_partitioned(csv):
+    train_cache.build_cache(csv)
+    cached = train_cache.load_cache(csv)
+    parsed = train_cache.read_csv(csv)
+
+    assert isinstance(cached["policytype"].dtype, pd.CategoricalDtype)
+    assert cached["age"].dtype == parsed["age"].dtype
+    restored = cached.sort_index()
+    restored = restored.astype({c: object for c in restored.columns if isinstance(restored[c].dtype, pd.CategoricalDtype)})
+    pd.testing.assert_frame_equal(restored, parsed)
+
+    for policy in POLICY_FEATURES:
+        expected = train_cache.segment(parsed, "India", policy)
+        got = train_cache.segment(cached, "India", policy)
+        assert got.index.equals(expected.index)
+    assert train_cache.segment(cached, "india", "pet").empty
+    assert train_cache.segment(cached.head(10), "india", "vehicle").index.equals(
+        train_cache.segment(parsed.loc[cached.head(10).index], "india", "vehicle").index)
+
+
+def test_training_inputs_do_not_depend_on_the_source(csv):
+    train_cache.build_cache(csv)
+    parsed = policy_frames(train_cache.read_csv(csv), "india")
+    cached = policy_frames(train_cache.load_dataset(csv), "india")
+    for policy in ("travel", "house"):
+        a, b = prepare_segment("india", policy, parsed[policy]), prepare_segment("india", policy, cached[policy])
+        pd.testing.assert_frame_equal(a.Xtr, b.Xtr)
+        pd.testing.assert_series_equal(a.yct, b.yct)
+        pd.testing.assert_series_equal(a.yre, b.yre)
+
+
+def test_stale_cache_is_ignored_and_rebuilt(csv):
+    train_cache.build_cache(csv)
+    newer = csv.stat().st_mtime_ns + 10**9
+    os.utime(csv, ns=(newer, newer))
+    assert train_cache.load_cache(csv) is None
+    assert "partitions" not in train_cache.load_dataset(csv).attrs
+    assert "partitions" in train_cache.load_dataset(csv, build=True).attrs
@@ -0,0 +1,68 @@
+import joblib
+import numpy as np
+import pytest
+
+from scripts.recommendation.common import ARTIFACTS
+from scripts.recommendation.train import export_flat_trees
+from scripts.recommendation.tree_eval import FlatTreeModel, score_unique, split_points
+
+ARTIFACT_DIRS = sorted(p.name for p in ARTIFACTS.iterdir() if (p / "clf.pkl").exists())
+
+
+def _inputs(n_features, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n, n_features)) > 0.5).astype(float)
+    X[:, 0] = rng.integers(18, 80, n)
+    X[:, 1] = rng.lognormal(13, 1.5, n)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("name", ARTIFACT_DIRS)
+def test_flat_trees_match_sklearn(name):
+    clf = joblib.load(ARTIFACTS / name / "clf.pkl")
+    reg = joblib.load(ARTIFACTS / name / "reg.pkl")
+    flat_clf = FlatTreeModel(export_flat_trees(clf))
+    flat_reg = FlatTreeModel(export_flat_trees(reg))
+
+    X = _inputs(clf.n_features_in_)
+    np.testing.assert_array_equal(flat_clf.raw_predict(X), clf._raw_predict(X))
+    np.testing.assert_allclose(flat_clf.predict_proba(X), clf.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(flat_clf.predict(X), clf.predict(X))
+    np.testing.assert_array_equal(flat_reg.predict(X), reg.predict(X))
+
+
+def test_walk_is_bounded_by_max_depth():
+    clf = joblib.load(ARTIFACTS / ARTIFACT_DIRS[0] / "clf.pkl")
+    arrays = export_flat_trees(clf)
+    assert int(arrays["max_depth"]) == max(int(p.nodes["depth"].max()) for it in clf._predictors for p in it)
+
+    X = _inputs(clf.n_features_in_)
+    full = FlatTreeModel(arrays)
+    assert full.is_leaf[full._leaves(X)].all()
+    short = FlatTreeModel(dict(arrays, max_depth=np.array(int(arrays["max_depth"]) - 1)))
+    assert not short.is_leaf[short._leaves(X)].all()
+
+
+def test_flat_trees_reject_wrong_width():
+    clf = joblib.load(ARTIFACTS / ARTIFACT_DIRS[0] / "clf.pkl")
+    flat = FlatTreeModel(export_flat_trees(clf))
+    with pytest.raises(ValueError):
+        flat.predict(np.zeros((1, clf.n_features_in_ + 1)))
+
+
+@pytest.mark.parametrize("name", ARTIFACT_DIRS[:3])
+def test_score_unique_matches_full_scoring(name):
+    clf = joblib.load(ARTIFACTS / name / "clf.pkl")
+    reg = joblib.load(ARTIFACTS / name / "reg.pkl")
+    flat_clf = FlatTreeModel(export_flat_trees(clf))
+
+    # repeated rows, values nudged inside their threshold interval, and exact thresholds
+    X = _inputs(clf.n_features_in_, n=200)
+    X = np.vstack([X, X, X + 1e-9])
+    ages = split_points(clf)[0]
+    X[:len(ages), 0] = ages
+
+    for model in (clf, flat_clf):
+        np.testing.assert_array_equal(score_unique(model, X, "predict_proba"), model.predict_proba(X))
+    np.testing.assert_array_equal(score_unique(reg, X), reg.predict(X))
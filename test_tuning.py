@@ -0,0 +1,67 @@
+import json
+
+import joblib
+import pandas as pd
+
+from scripts.recommendation.feature_store import FeatureStore
+from scripts.recommendation.train import CLASSIFIER_PARAMS, TUNING_NAME, load_dataset, train_one
+from scripts.recommendation.tuning import choose, pareto_front, rung_rows, tune
+
+
+def _small_csv(tmp_path):
+    df = pd.read_csv("processed/standardized_india.csv")
+    small = df[df["policytype"].str.lower() == "travel"].head(500)
+    path = tmp_path / "india.csv"
+    small.to_csv(path, index=False)
+    return str(path)
+
+
+def test_rung_rows_grow_by_eta_to_all_rows():
+    assert rung_rows(1600, 27, 3, 100) == [178, 534, 1600]
+    assert rung_rows(1600, 27, 3, 300) == [300, 534, 1600]
+    assert rung_rows(1600, 2, 3, 100) == [1600]
+
+
+def test_choose_cheapest_front_member_not_worse_than_baseline():
+    base = {"max_iter": 300}
+    results = [
+        {"params": base, "score": 0.95, "latency_us": 400.0},
+        {"params": {"a": 1}, "score": 0.97, "latency_us": 300.0},
+        {"params": {"a": 2}, "score": 0.96, "latency_us": 100.0},
+        {"params": {"a": 3}, "score": 0.90, "latency_us": 50.0},
+        {"params": {"a": 4}, "score": 0.96, "latency_us": 500.0},
+    ]
+    assert [r["params"] for r in pareto_front(results)] == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert choose(results, base)["params"] == {"a": 2}
+    assert choose(results[:1] + results[3:], base)["params"] == base
+
+
+def test_tune_writes_config_that_training_uses(tmp_path):
+    csv = _small_csv(tmp_path)
+    artifacts, store = tmp_path / "artifacts", FeatureStore(tmp_path / "features")
+    reports = tune({"india": csv}, cpus=2, budget=300, candidates=4, eta=2, min_rows=100,
+                   artifacts=artifacts, store=store, log=lambda *_: None)
+    assert list(reports) == [("india", "travel")]
+
+    saved = json.loads((artifacts / "india_travel" / TUNING_NAME).read_text())
+    for kind in ("clf", "reg"):
+        base, chosen = saved[kind]["baseline"], saved[kind]["chosen"]
+        assert saved["chosen"][kind] == chosen["params"]
+        assert chosen["params"] == base["params"] or (
+            chosen["score"] >= base["score"] and chosen["latency_us"] < base["latency_us"])
+        assert chosen["params"] in [r["params"] for r in saved[kind]["front"]] or chosen == base
+        assert "holdout" in chosen and "holdout" in base
+
+    train_one("india", load_dataset(csv), "travel", artifacts=artifacts, store=store)
+    clf = joblib.load(artifacts / "india_travel" / "clf.pkl")
+    expected = {**CLASSIFIER_PARAMS, **saved["chosen"]["clf"]}
+    assert {k: clf.get_params()[k] for k in expected} == expected
+
+
+def test_exhausted_budget_writes_nothing(tmp_path):
+    csv = _small_csv(tmp_path)
+    reports = tune({"india": csv}, cpus=1, budget=0, candidates=4, eta=2, min_rows=100,
+                   artifacts=tmp_path / "artifacts", store=FeatureStore(tmp_path / "features"),
+                   log=lambda *_: None)
+    assert reports == {}
+    assert not (tmp_path / "artifacts" / "india_travel" / TUNING_NAME).exists()
@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+from scripts.api import serve
+from scripts.recommendation.cache import PREDICTION_CACHE
+from scripts.recommendation.predict import predict
+
+HEALTH = {"country": "INDIA", "policytype": "HEALTH", "age": 40, "sumassured": 500000,
+          "smokerdrinker": "No", "diseases": "asthma"}
+VEHICLE = {"country": "AUSTRALIA", "policytype": "VEHICLE", "age": 35, "priceofvehicle": 900000,
+           "ageofvehicle": 1, "typeofvehicle": "car"}
+
+
+def _expected(profile, **changes):
+    data = serve.RecommendRequest(**profile)
+    country, policytype, data = serve.prepare_recommend_input(serve.to_dict_safe(data))
+    return predict(country, policytype, dict(data, **changes))
+
+
+def test_age_sweep_matches_single_predictions():
+    PREDICTION_CACHE.clear()
+    with TestClient(serve.app) as client:
+        resp = client.post("/what_if", json={"profile": HEALTH,
+                                             "vary": [{"feature": "age", "start": 18, "stop": 80, "steps": 63}]})
+    assert resp.status_code == 200
+    body = resp.json()
+    ages = body["axes"][0]["values"]
+    assert ages == list(range(18, 81))
+
+    for i in (0, 17, 62):
+        expected = _expected(HEALTH, age=ages[i])
+        assert body["recommended_tier"][i] == expected["recommended_tier"]
+        assert {t: body["all_tiers"][t][i] for t in expected["all_tiers"]} == expected["all_tiers"]
+        assert {c: body["confidence"][c][i] for c in expected["confidence"]} == expected["confidence"]
+
+
+def test_two_axis_sweep_returns_nested_curves():
+    with TestClient(serve.app) as client:
+        resp = client.post("/what_if", json={"profile": VEHICLE, "vary": [
+            {"feature": "priceofvehicle", "start": 500000, "stop": 1500000, "steps": 5},
+            {"feature": "typeofvehicle", "values": ["car", "2wheeler", "commercial"]},
+        ]})
+    assert resp.status_code == 200
+    premiums = resp.json()["all_tiers"]["Gold"]
+    assert [len(row) for row in premiums] == [3] * 5
+    assert premiums[4][2] == _expected(VEHICLE, priceofvehicle=1500000.0, typeofvehicle="commercial")["all_tiers"]["Gold"]
+
+
+def test_rejects_unknown_fields_and_oversized_sweeps():
+    with TestClient(serve.app) as client:
+        bad_field = client.post("/what_if", json={"profile": HEALTH, "vary": [{"feature": "priceofvehicle",
+                                                                               "values": [1, 2]}]})
+        too_big = client.post("/what_if", json={"profile": HEALTH, "vary": [
+            {"feature": "age", "start": 18, "stop": 80, "steps": 63},
+            {"feature": "sumassured", "start": 1e5, "stop": 1e7, "steps": 100},
+        ]})
+    assert bad_field.status_code == 400
+    assert too_big.status_code == 400